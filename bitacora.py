@@ -0,0 +1,69 @@
+import glob
+import json
+import os
+
+from cola_trabajo import nuevo_run_id
+
+# Bitácora de avance de una ejecución: un JSONL de solo añadir por ejecución en backup/
+# (montado como volumen en Docker). Cada producto o variación terminada añade una línea,
+# en lugar de reescribir el Excel completo del dispositivo, y permite reanudar una
+# ejecución caída sin volver a navegar lo que ya se hizo.
+DIRECTORIO_BITACORA = "backup"
+
+
+def ruta_bitacora(nombre: str, run_id: str) -> str:
+    return os.path.join(DIRECTORIO_BITACORA, f"bitacora_{nombre}_{run_id}.jsonl")
+
+
+def abrir_bitacora(nombre: str, run_id: str = None) -> dict:
+    """Abre (o crea) la bitácora de una ejecución para añadir entradas"""
+    run_id = run_id or nuevo_run_id()
+    os.makedirs(DIRECTORIO_BITACORA, exist_ok=True)
+    ruta = ruta_bitacora(nombre, run_id)
+    archivo = open(ruta, "a", encoding="utf-8")
+    if archivo.tell() > 0:
+        with open(ruta, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # Última línea cortada por la caída: las nuevas entradas empiezan en su propia línea
+                archivo.write("\n")
+    return {"run_id": run_id, "ruta": ruta, "archivo": archivo}
+
+
+def anotar(bitacora: dict, tipo: str, **datos):
+    """Añade una entrada y la lleva a disco antes de seguir (una caída no pierde lo ya anotado)"""
+    archivo = bitacora["archivo"]
+    archivo.write(json.dumps({"tipo": tipo, **datos}, ensure_ascii=False) + "\n")
+    archivo.flush()
+    os.fsync(archivo.fileno())
+
+
+def cerrar_bitacora(bitacora: dict):
+    bitacora["archivo"].close()
+
+
+def leer_bitacora(nombre: str, run_id: str) -> list:
+    """Entradas de la bitácora en orden; ignora una última línea cortada por la caída"""
+    entradas = []
+    ruta = ruta_bitacora(nombre, run_id)
+    if not os.path.exists(ruta):
+        return entradas
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                entradas.append(json.loads(linea))
+            except ValueError:
+                print(f"[BITACORA] Línea incompleta ignorada en {ruta}")
+    return entradas
+
+
+def ultima_sin_terminar(nombre: str):
+    """RUN_ID de la bitácora más reciente que no llegó a la entrada "fin", o None"""
+    rutas = sorted(glob.glob(ruta_bitacora(nombre, "*")), key=os.path.getmtime, reverse=True)
+    prefijo = len(f"bitacora_{nombre}_")
+    for ruta in rutas:
+        run_id = os.path.basename(ruta)[prefijo:-len(".jsonl")]
+        entradas = leer_bitacora(nombre, run_id)
+        if not entradas or entradas[-1]["tipo"] != "fin":
+            return run_id
+    return None
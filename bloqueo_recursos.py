@@ -0,0 +1,190 @@
+import asyncio
+from urllib.parse import urlparse
+
+# Interceptación de red: se abortan recursos que los scrapers nunca leen.
+# (Chromium ignora flags como --disable-images o --disable-css, por eso se hace con route)
+# Con route Playwright desactiva la caché HTTP, así que en los perfiles persistentes
+# (cuya caché en disco es lo que se quiere aprovechar) se bloquea con CDP Network.setBlockedURLs.
+BLOQUEO_ACTIVO = True
+TIPOS_BLOQUEADOS = {"image", "media", "font"}
+
+# Hosts de publicidad y analítica (se compara contra el final del hostname)
+HOSTS_BLOQUEADOS = [
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "facebook.net",
+    "connect.facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "adnxs.com",
+    "scorecardresearch.com",
+    "nr-data.net",
+    "newrelic.com",
+    "tiktok.com",
+    "bat.bing.com",
+    "sentry.io",
+    "dynatrace.com",
+    "optimizely.com",
+    "insider.com",
+    "useinsider.com",
+]
+
+# Configuración por retailer:
+#   bloquear_estilos: abortar también hojas de estilo
+#   permitidos: fragmentos de URL que nunca se bloquean
+CONFIG_RETAILER = {
+    "exito": {"bloquear_estilos": False, "permitidos": []},
+    "falabella": {"bloquear_estilos": False, "permitidos": []},
+    "ktronix": {"bloquear_estilos": True, "permitidos": []},  # HTML renderizado en servidor
+    "mercadolibre": {"bloquear_estilos": False, "permitidos": []},  # se hace clic en botones visibles
+}
+CONFIG_POR_DEFECTO = {"bloquear_estilos": False, "permitidos": []}
+
+# Tamaño medio estimado por tipo de recurso (bytes); una petición abortada no tiene tamaño real
+BYTES_ESTIMADOS = {
+    "image": 45000,
+    "media": 500000,
+    "font": 35000,
+    "stylesheet": 30000,
+    "script": 40000,
+}
+BYTES_ESTIMADOS_OTROS = 5000
+
+# Patrones para Network.setBlockedURLs (solo admite comodines sobre la URL, no el tipo de recurso)
+EXTENSIONES_BLOQUEADAS = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "media": ["mp4", "webm", "m3u8", "mp3", "ogg"],
+    "stylesheet": ["css"],
+}
+
+# Estadísticas por retailer: {"solicitudes": n, "bytes_estimados": b, "por_motivo": {motivo: n}}
+ESTADISTICAS_BLOQUEO = {}
+
+
+def _host_bloqueado(url: str) -> bool:
+    host = urlparse(url).hostname or ""
+    return any(host == bloqueado or host.endswith("." + bloqueado) for bloqueado in HOSTS_BLOQUEADOS)
+
+
+def motivo_bloqueo(url: str, tipo_recurso: str, config: dict):
+    """Devuelve el motivo por el que se bloquea una petición, o None si debe continuar"""
+    if any(permitido in url for permitido in config["permitidos"]):
+        return None
+    if tipo_recurso in TIPOS_BLOQUEADOS:
+        return tipo_recurso
+    if tipo_recurso == "stylesheet" and config["bloquear_estilos"]:
+        return tipo_recurso
+    if _host_bloqueado(url):
+        return "publicidad/analitica"
+    return None
+
+
+def _registrar_bloqueo(retailer: str, motivo: str, tipo_recurso: str):
+    estadisticas = ESTADISTICAS_BLOQUEO.setdefault(
+        retailer, {"solicitudes": 0, "bytes_estimados": 0, "por_motivo": {}}
+    )
+    estadisticas["solicitudes"] += 1
+    estadisticas["bytes_estimados"] += BYTES_ESTIMADOS.get(tipo_recurso, BYTES_ESTIMADOS_OTROS)
+    estadisticas["por_motivo"][motivo] = estadisticas["por_motivo"].get(motivo, 0) + 1
+
+
+async def activar_bloqueo(destino, retailer: str):
+    """Registra la interceptación en un BrowserContext o Page (ambos exponen route)"""
+    if not BLOQUEO_ACTIVO:
+        return
+    config = CONFIG_RETAILER.get(retailer, CONFIG_POR_DEFECTO)
+
+    async def manejar(route):
+        request = route.request
+        motivo = motivo_bloqueo(request.url, request.resource_type, config)
+        if motivo:
+            _registrar_bloqueo(retailer, motivo, request.resource_type)
+            try:
+                await route.abort()
+            except Exception:
+                pass
+        else:
+            try:
+                await route.continue_()
+            except Exception:
+                pass
+
+    await destino.route("**/*", manejar)
+
+
+def patrones_bloqueo(config: dict) -> list:
+    """Patrones de URL equivalentes a motivo_bloqueo para Network.setBlockedURLs.
+
+    Los tipos se aproximan por extensión y config["permitidos"] no se puede expresar
+    como excepción, así que los retailers con permitidos siguen usando route.
+    """
+    tipos = set(TIPOS_BLOQUEADOS)
+    if config["bloquear_estilos"]:
+        tipos.add("stylesheet")
+    patrones = []
+    for tipo in sorted(tipos):
+        for extension in EXTENSIONES_BLOQUEADAS.get(tipo, []):
+            patrones.append(f"*.{extension}")
+            patrones.append(f"*.{extension}?*")
+    for host in HOSTS_BLOQUEADOS:
+        patrones.append(f"*://{host}/*")
+        patrones.append(f"*://*.{host}/*")
+    return patrones
+
+
+async def _bloquear_pagina_cdp(page, retailer: str, patrones: list):
+    try:
+        cdp = await page.context.new_cdp_session(page)
+
+        def fallida(evento):
+            # blockedReason "inspector" = bloqueada por setBlockedURLs
+            if evento.get("blockedReason") != "inspector":
+                return
+            tipo = (evento.get("type") or "").lower()
+            motivo = tipo if tipo in EXTENSIONES_BLOQUEADAS else "publicidad/analitica"
+            _registrar_bloqueo(retailer, motivo, tipo)
+
+        cdp.on("Network.loadingFailed", fallida)
+        await cdp.send("Network.enable")
+        await cdp.send("Network.setBlockedURLs", {"urls": patrones})
+    except Exception as e:
+        print(f"[BLOQUEO] No se pudo activar el bloqueo CDP en una página de {retailer}: {e}")
+
+
+async def activar_bloqueo_con_cache(context, retailer: str):
+    """Bloqueo para contextos persistentes sin desactivar la caché HTTP (CDP por página).
+
+    Se aplica a las páginas abiertas y a cada página nueva del contexto. Si el
+    retailer tiene URLs permitidas se recurre a route (sin caché) para respetarlas.
+    """
+    if not BLOQUEO_ACTIVO:
+        return
+    config = CONFIG_RETAILER.get(retailer, CONFIG_POR_DEFECTO)
+    if config["permitidos"]:
+        await activar_bloqueo(context, retailer)
+        return
+    patrones = patrones_bloqueo(config)
+    for page in context.pages:
+        await _bloquear_pagina_cdp(page, retailer, patrones)
+    context.on("page", lambda page: asyncio.ensure_future(_bloquear_pagina_cdp(page, retailer, patrones)))
+
+
+def imprimir_resumen_bloqueo():
+    """Muestra las peticiones bloqueadas y los bytes ahorrados por retailer.
+
+    Los bytes son una estimación con BYTES_ESTIMADOS: una petición abortada no llega a tener tamaño.
+    """
+    for retailer, estadisticas in ESTADISTICAS_BLOQUEO.items():
+        megabytes = estadisticas["bytes_estimados"] / (1024 * 1024)
+        detalle = ", ".join(f"{motivo}={n}" for motivo, n in sorted(estadisticas["por_motivo"].items()))
+        print(f"[BLOQUEO] {retailer}: {estadisticas['solicitudes']} peticiones bloqueadas, "
+              f"~{megabytes:.1f} MB ahorrados (estimado por tipo de recurso, no medido) ({detalle})")
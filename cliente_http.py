@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from control_tasa import dominio_de, turno, registrar_resultado
+
+# Cliente HTTP sin navegador para páginas renderizadas en servidor.
+# Una sesión por hilo con conexiones keep-alive reutilizadas (requests.Session no
+# garantiza ser segura entre hilos y las descargas corren en asyncio.to_thread).
+TIMEOUT_HTTP = 15  # segundos
+CONEXIONES_POR_HOST = 8
+CABECERAS_HTTP = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-CO,es;q=0.9,en;q=0.8",
+}
+
+_local = threading.local()
+
+
+def _sesion() -> requests.Session:
+    sesion = getattr(_local, "sesion", None)
+    if sesion is None:
+        sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=CONEXIONES_POR_HOST, pool_maxsize=CONEXIONES_POR_HOST)
+        sesion.mount("http://", adaptador)
+        sesion.mount("https://", adaptador)
+        sesion.headers.update(CABECERAS_HTTP)
+        _local.sesion = sesion
+    return sesion
+
+
+def descargar_html(url: str, user_agent: str = None, timeout: float = TIMEOUT_HTTP):
+    """GET síncrono con la sesión del hilo; devuelve (estado_http, html)"""
+    cabeceras = {"User-Agent": user_agent} if user_agent else None
+    respuesta = _sesion().get(url, headers=cabeceras, timeout=timeout)
+    return respuesta.status_code, respuesta.text
+
+
+async def obtener_html(url: str, user_agent: str = None, timeout: float = TIMEOUT_HTTP):
+    """Descarga una página bajo el control de ritmo de su dominio sin bloquear el event loop.
+
+    Sirve con cualquier URL, incluida una copia guardada servida en local
+    (p. ej. python -m http.server) para probar los parsers de HTML.
+    """
+    dominio = dominio_de(url)
+    async with turno(dominio):
+        inicio = time.monotonic()
+        try:
+            estado_http, html = await asyncio.to_thread(descargar_html, url, user_agent, timeout)
+        except Exception as e:
+            registrar_resultado(dominio, error=e)
+            raise
+        registrar_resultado(dominio, estado_http=estado_http, latencia=time.monotonic() - inicio)
+        return estado_http, html
@@ -0,0 +1,163 @@
+import time
+
+import redis
+
+# Backend Redis de la cola de trabajo, para repartir una ejecución entre varias máquinas.
+# Usa solo comandos básicos y scripts Lua que reciben todas sus claves en KEYS, así sirve con
+# Redis, Valkey, KeyDB o Dragonfly (que por defecto rechaza claves no declaradas). Las claves de
+# una ejecución llevan el RUN_ID como hash tag ({run_id}) y caen en el mismo slot de Redis Cluster.
+# Claves por ejecución (prefijo scraper:{run_id}:):
+#   siguiente (contador de ids), claves (set de deduplicación),
+#   tipos / cargas / estados / trabajadores / intentos / errores (hashes id de tarea -> campo),
+#   pendientes (lista de ids), arrendadas (zset id -> vencimiento), hechas / fallidas (sets),
+#   resultados (hash id de tarea -> [retailer, registro])
+
+# Deduplicación, alta de la tarea y encolado en un solo paso: un corte a medias no deja una
+# clave marcada como publicada sin su tarea en la cola
+LUA_PUBLICAR = """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then return 0 end
+local id = redis.call('INCR', KEYS[2])
+redis.call('HSET', KEYS[3], id, ARGV[2])
+redis.call('HSET', KEYS[4], id, ARGV[3])
+redis.call('HSET', KEYS[5], id, 'pendiente')
+redis.call('HSET', KEYS[6], id, 0)
+redis.call('RPUSH', KEYS[7], id)
+return 1
+"""
+
+# Reencola las arrendadas vencidas y arrienda la siguiente pendiente en un solo paso atómico.
+# Al reencolar, la tarea vuelve a 'pendiente' y pierde su trabajador: el trabajador lento que la
+# tenía ya no puede prorrogarla ni cerrarla. Un id de la lista que ya no está pendiente (p. ej.
+# duplicado) se descarta al sacarlo.
+LUA_ARRENDAR = """
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('HSET', KEYS[3], id, 'pendiente')
+    redis.call('HDEL', KEYS[4], id)
+    redis.call('RPUSH', KEYS[1], id)
+end
+local id
+repeat
+    id = redis.call('LPOP', KEYS[1])
+    if not id then return nil end
+until redis.call('HGET', KEYS[3], id) == 'pendiente'
+redis.call('ZADD', KEYS[2], ARGV[2], id)
+redis.call('HSET', KEYS[3], id, 'arrendada')
+redis.call('HSET', KEYS[4], id, ARGV[3])
+local intentos = redis.call('HINCRBY', KEYS[5], id, 1)
+return {id, redis.call('HGET', KEYS[6], id), redis.call('HGET', KEYS[7], id), intentos}
+"""
+
+# Las operaciones sobre una tarea arrendada solo valen para el trabajador que la tiene
+LUA_PRORROGAR = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] or redis.call('HGET', KEYS[1], ARGV[1]) ~= 'arrendada' then
+    return 0
+end
+if not redis.call('ZSCORE', KEYS[3], ARGV[1]) then return 0 end
+redis.call('ZADD', KEYS[3], 'XX', ARGV[3], ARGV[1])
+return 1
+"""
+
+LUA_CERRAR = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] or redis.call('HGET', KEYS[1], ARGV[1]) ~= 'arrendada' then
+    return 0
+end
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+redis.call('HSET', KEYS[4], ARGV[1], ARGV[4])
+if ARGV[3] == 'pendiente' then
+    redis.call('RPUSH', KEYS[5], ARGV[1])
+elseif ARGV[3] == 'hecha' then
+    redis.call('SADD', KEYS[6], ARGV[1])
+else
+    redis.call('SADD', KEYS[7], ARGV[1])
+end
+return 1
+"""
+
+
+def _prefijo(run_id: str) -> str:
+    return f"scraper:{{{run_id}}}:"
+
+
+def _claves(run_id: str, *nombres) -> list:
+    prefijo = _prefijo(run_id)
+    return [prefijo + nombre for nombre in nombres]
+
+
+def conectar(url: str):
+    """url: redis://host:6379/0 (o rediss:// con TLS)"""
+    conexion = redis.Redis.from_url(url, decode_responses=True)
+    conexion.ping()
+    return {
+        "redis": conexion,
+        "publicar": conexion.register_script(LUA_PUBLICAR),
+        "arrendar": conexion.register_script(LUA_ARRENDAR),
+        "prorrogar": conexion.register_script(LUA_PRORROGAR),
+        "cerrar": conexion.register_script(LUA_CERRAR),
+    }
+
+
+def publicar(conexion, run_id: str, tipo: str, clave: str, carga: str) -> bool:
+    claves = _claves(run_id, "claves", "siguiente", "tipos", "cargas", "estados", "intentos", "pendientes")
+    return bool(conexion["publicar"](keys=claves, args=[clave, tipo, carga]))
+
+
+def arrendar(conexion, run_id: str, trabajador: str, visibilidad: float):
+    ahora = time.time()
+    claves = _claves(run_id, "pendientes", "arrendadas", "estados", "trabajadores", "intentos", "tipos", "cargas")
+    fila = conexion["arrendar"](keys=claves, args=[ahora, ahora + visibilidad, trabajador])
+    if not fila:
+        return None
+    return {"id": int(fila[0]), "tipo": fila[1], "carga": fila[2], "intentos": int(fila[3])}
+
+
+def prorrogar(conexion, run_id: str, tarea_id: int, trabajador: str, visibilidad: float) -> bool:
+    claves = _claves(run_id, "estados", "trabajadores", "arrendadas")
+    return bool(conexion["prorrogar"](keys=claves, args=[tarea_id, trabajador, time.time() + visibilidad]))
+
+
+def _cerrar(conexion, run_id: str, tarea_id: int, trabajador: str, estado: str, error: str) -> bool:
+    claves = _claves(run_id, "estados", "trabajadores", "arrendadas", "errores", "pendientes", "hechas", "fallidas")
+    return bool(conexion["cerrar"](keys=claves, args=[tarea_id, trabajador, estado, error]))
+
+
+def confirmar(conexion, run_id: str, tarea_id: int, trabajador: str) -> bool:
+    return _cerrar(conexion, run_id, tarea_id, trabajador, "hecha", "")
+
+
+def liberar(conexion, run_id: str, tarea_id: int, trabajador: str, error: str, definitivo: bool) -> bool:
+    estado = "fallida" if definitivo else "pendiente"
+    return _cerrar(conexion, run_id, tarea_id, trabajador, estado, error or "")
+
+
+def guardar_resultado(conexion, run_id: str, tarea_id: int, retailer: str, registro: str):
+    conexion["redis"].hset(_prefijo(run_id) + "resultados", tarea_id, f"{retailer}\n{registro}")
+
+
+def resultados(conexion, run_id: str) -> list:
+    guardados = conexion["redis"].hgetall(_prefijo(run_id) + "resultados")
+    return [tuple(guardados[tarea_id].split("\n", 1)) for tarea_id in sorted(guardados, key=int)]
+
+
+def resumen(conexion, run_id: str) -> dict:
+    r = conexion["redis"]
+    prefijo = _prefijo(run_id)
+    return {
+        "pendiente": r.llen(prefijo + "pendientes"),
+        "arrendada": r.zcard(prefijo + "arrendadas"),
+        "hecha": r.scard(prefijo + "hechas"),
+        "fallida": r.scard(prefijo + "fallidas"),
+    }
+
+
+def fallidas(conexion, run_id: str) -> list:
+    r = conexion["redis"]
+    prefijo = _prefijo(run_id)
+    ids = sorted(r.smembers(prefijo + "fallidas"), key=int)
+    if not ids:
+        return []
+    tipos = r.hmget(prefijo + "tipos", ids)
+    cargas = r.hmget(prefijo + "cargas", ids)
+    errores = r.hmget(prefijo + "errores", ids)
+    return list(zip(tipos, cargas, errores))
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Backend SQLite de la cola de trabajo (por defecto). Sirve para varios procesos o
+# contenedores de una misma máquina que comparten data/; para varias máquinas usar Redis.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tareas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    carga TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    trabajador TEXT,
+    vence REAL,
+    error TEXT,
+    UNIQUE (run_id, clave)
+);
+CREATE INDEX IF NOT EXISTS tareas_por_estado ON tareas (run_id, estado, vence);
+CREATE TABLE IF NOT EXISTS resultados (
+    run_id TEXT NOT NULL,
+    tarea_id INTEGER NOT NULL,
+    retailer TEXT NOT NULL,
+    registro TEXT NOT NULL,
+    PRIMARY KEY (run_id, tarea_id)
+);
+"""
+
+_lock = threading.Lock()  # la conexión se usa desde los hilos de asyncio.to_thread
+
+
+def conectar(url: str):
+    """url: sqlite:///ruta/al/archivo.db"""
+    ruta = url[len("sqlite:///"):]
+    if os.path.dirname(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None, check_same_thread=False)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA)
+    return conexion
+
+
+def publicar(conexion, run_id: str, tipo: str, clave: str, carga: str) -> bool:
+    with _lock:
+        cursor = conexion.execute(
+            "INSERT OR IGNORE INTO tareas (run_id, tipo, clave, carga) VALUES (?, ?, ?, ?)",
+            (run_id, tipo, clave, carga),
+        )
+        return cursor.rowcount == 1
+
+
+def arrendar(conexion, run_id: str, trabajador: str, visibilidad: float):
+    """Toma la tarea pendiente más antigua, o una arrendada cuyo plazo venció (trabajador caído)"""
+    ahora = time.time()
+    with _lock:
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conexion.execute(
+                "SELECT id, tipo, carga, intentos FROM tareas WHERE run_id = ? "
+                "AND (estado = 'pendiente' OR (estado = 'arrendada' AND vence < ?)) ORDER BY id LIMIT 1",
+                (run_id, ahora),
+            ).fetchone()
+            if fila is not None:
+                conexion.execute(
+                    "UPDATE tareas SET estado = 'arrendada', trabajador = ?, vence = ?, intentos = intentos + 1 "
+                    "WHERE id = ?",
+                    (trabajador, ahora + visibilidad, fila[0]),
+                )
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+    if fila is None:
+        return None
+    return {"id": fila[0], "tipo": fila[1], "carga": fila[2], "intentos": fila[3] + 1}
+
+
+def prorrogar(conexion, run_id: str, tarea_id: int, trabajador: str, visibilidad: float) -> bool:
+    with _lock:
+        cursor = conexion.execute(
+            "UPDATE tareas SET vence = ? WHERE id = ? AND estado = 'arrendada' AND trabajador = ?",
+            (time.time() + visibilidad, tarea_id, trabajador),
+        )
+        return cursor.rowcount == 1
+
+
+def confirmar(conexion, run_id: str, tarea_id: int, trabajador: str) -> bool:
+    with _lock:
+        cursor = conexion.execute(
+            "UPDATE tareas SET estado = 'hecha', vence = NULL WHERE id = ? AND estado = 'arrendada' AND trabajador = ?",
+            (tarea_id, trabajador),
+        )
+        return cursor.rowcount == 1
+
+
+def liberar(conexion, run_id: str, tarea_id: int, trabajador: str, error: str, definitivo: bool) -> bool:
+    """Devuelve la tarea a la cola para otro intento, o la marca fallida si es definitivo"""
+    with _lock:
+        cursor = conexion.execute(
+            "UPDATE tareas SET estado = ?, vence = NULL, error = ? "
+            "WHERE id = ? AND estado = 'arrendada' AND trabajador = ?",
+            ("fallida" if definitivo else "pendiente", error, tarea_id, trabajador),
+        )
+        return cursor.rowcount == 1
+
+
+def guardar_resultado(conexion, run_id: str, tarea_id: int, retailer: str, registro: str):
+    # Una tarea re-arrendada que termina dos veces sobrescribe su resultado en lugar de duplicarlo
+    with _lock:
+        conexion.execute(
+            "INSERT OR REPLACE INTO resultados (run_id, tarea_id, retailer, registro) VALUES (?, ?, ?, ?)",
+            (run_id, tarea_id, retailer, registro),
+        )
+
+
+def resultados(conexion, run_id: str) -> list:
+    with _lock:
+        return conexion.execute(
+            "SELECT retailer, registro FROM resultados WHERE run_id = ? ORDER BY tarea_id", (run_id,)
+        ).fetchall()
+
+
+def resumen(conexion, run_id: str) -> dict:
+    with _lock:
+        filas = conexion.execute(
+            "SELECT estado, COUNT(*) FROM tareas WHERE run_id = ? GROUP BY estado", (run_id,)
+        ).fetchall()
+    return dict(filas)
+
+
+def fallidas(conexion, run_id: str) -> list:
+    with _lock:
+        return conexion.execute(
+            "SELECT tipo, carga, error FROM tareas WHERE run_id = ? AND estado = 'fallida' ORDER BY id", (run_id,)
+        ).fetchall()
@@ -0,0 +1,117 @@
+import importlib
+import json
+import os
+import secrets
+from datetime import datetime
+
+# Cola de trabajo compartida para repartir una ejecución entre varios trabajadores y máquinas.
+# Cada tarea se arrienda por VISIBILIDAD_SEGUNDOS: el trabajador la prorroga mientras la procesa
+# y la confirma al terminar. Si el trabajador cae, el arriendo vence y otro la vuelve a tomar.
+# El backend se elige con COLA_URL:
+#   sqlite:///data/cola.db (por defecto) -> cola_sqlite
+#   redis://host:6379/0                   -> cola_redis (requiere el paquete redis)
+URL_COLA = os.environ.get("COLA_URL", "sqlite:///data/cola.db")
+VISIBILIDAD_SEGUNDOS = 300
+MAX_INTENTOS_TAREA = 3
+
+BACKENDS = {
+    "sqlite": "cola_sqlite",
+    "redis": "cola_redis",
+    "rediss": "cola_redis",
+}
+
+_cola = {"backend": None, "conexion": None}
+
+
+def abrir(url: str = None):
+    """Conecta con el backend de la cola (una vez por proceso)"""
+    if _cola["conexion"] is not None:
+        return
+    url = url or URL_COLA
+    esquema = url.split(":", 1)[0]
+    if esquema not in BACKENDS:
+        raise ValueError(f"Backend de cola desconocido: {url}")
+    backend = importlib.import_module(BACKENDS[esquema])
+    _cola["conexion"] = backend.conectar(url)
+    _cola["backend"] = backend
+    print(f"[COLA] Backend {esquema}: {url}")
+
+
+def _backend():
+    if _cola["conexion"] is None:
+        abrir()
+    return _cola["backend"], _cola["conexion"]
+
+
+def nuevo_run_id() -> str:
+    """Identificador de ejecución: fecha legible + sufijo aleatorio para nodos que arrancan a la vez"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(3)}"
+
+
+def publicar(run_id: str, tipo: str, carga: dict, clave: str) -> bool:
+    """Publica una tarea; devuelve False si la ejecución ya tenía una con la misma clave"""
+    backend, conexion = _backend()
+    return backend.publicar(conexion, run_id, tipo, clave, json.dumps(carga, ensure_ascii=False))
+
+
+def arrendar(run_id: str, trabajador: str):
+    """Arrienda la siguiente tarea ({"id", "tipo", "carga", "intentos"}) o devuelve None si no hay.
+
+    Las tareas que ya agotaron MAX_INTENTOS_TAREA (p. ej. siempre tumban al trabajador) se marcan fallidas.
+    """
+    backend, conexion = _backend()
+    while True:
+        tarea = backend.arrendar(conexion, run_id, trabajador, VISIBILIDAD_SEGUNDOS)
+        if tarea is None:
+            return None
+        if tarea["intentos"] > MAX_INTENTOS_TAREA:
+            backend.liberar(conexion, run_id, tarea["id"], trabajador, "intentos agotados", True)
+            continue
+        tarea["carga"] = json.loads(tarea["carga"])
+        return tarea
+
+
+def prorrogar(run_id: str, tarea: dict, trabajador: str) -> bool:
+    backend, conexion = _backend()
+    return backend.prorrogar(conexion, run_id, tarea["id"], trabajador, VISIBILIDAD_SEGUNDOS)
+
+
+def confirmar(run_id: str, tarea: dict, trabajador: str) -> bool:
+    backend, conexion = _backend()
+    return backend.confirmar(conexion, run_id, tarea["id"], trabajador)
+
+
+def liberar(run_id: str, tarea: dict, trabajador: str, error: str):
+    """Devuelve la tarea a la cola tras un error, o la marca fallida si agotó sus intentos"""
+    backend, conexion = _backend()
+    definitivo = tarea["intentos"] >= MAX_INTENTOS_TAREA
+    backend.liberar(conexion, run_id, tarea["id"], trabajador, error, definitivo)
+    return definitivo
+
+
+def guardar_resultado(run_id: str, tarea: dict, retailer: str, registro: dict):
+    backend, conexion = _backend()
+    backend.guardar_resultado(conexion, run_id, tarea["id"], retailer, json.dumps(registro, ensure_ascii=False))
+
+
+def resultados(run_id: str) -> dict:
+    """{retailer: [registros]} en el orden en que se publicaron sus tareas"""
+    backend, conexion = _backend()
+    por_retailer = {}
+    for retailer, registro in backend.resultados(conexion, run_id):
+        por_retailer.setdefault(retailer, []).append(json.loads(registro))
+    return por_retailer
+
+
+def resumen(run_id: str) -> dict:
+    """Número de tareas por estado: pendiente, arrendada, hecha, fallida"""
+    backend, conexion = _backend()
+    estados = {"pendiente": 0, "arrendada": 0, "hecha": 0, "fallida": 0}
+    estados.update(backend.resumen(conexion, run_id))
+    return estados
+
+
+def fallidas(run_id: str) -> list:
+    """[(tipo, carga, error)] de las tareas que agotaron sus intentos"""
+    backend, conexion = _backend()
+    return [(tipo, json.loads(carga), error) for tipo, carga, error in backend.fallidas(conexion, run_id)]
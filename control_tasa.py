@@ -0,0 +1,286 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from memoria_navegador import registrar_navegacion
+
+# Control adaptativo de ritmo por dominio: token bucket (peticiones/segundo) + concurrencia AIMD.
+# Mientras el dominio responde rápido y sin errores se sube la tasa y la concurrencia de forma
+# aditiva; ante 429/403/5xx o timeouts se reducen a la mitad (multiplicativo).
+CONFIG_DOMINIOS = {
+    "mercadolibre.com.co": {
+        "tasa_inicial": 1 / 20, "tasa_minima": 1 / 90, "tasa_maxima": 1 / 3,
+        "concurrencia_inicial": 1, "concurrencia_maxima": 2,
+        "latencia_objetivo": 8.0,
+    },
+    "exito.com": {
+        "tasa_inicial": 2.0, "tasa_minima": 0.2, "tasa_maxima": 8.0,
+        "concurrencia_inicial": 2, "concurrencia_maxima": 8,
+        "latencia_objetivo": 3.0,
+    },
+    "falabella.com.co": {
+        "tasa_inicial": 1.0, "tasa_minima": 0.1, "tasa_maxima": 5.0,
+        "concurrencia_inicial": 2, "concurrencia_maxima": 6,
+        "latencia_objetivo": 5.0,
+    },
+    "ktronix.com": {
+        "tasa_inicial": 2.0, "tasa_minima": 0.2, "tasa_maxima": 8.0,
+        "concurrencia_inicial": 2, "concurrencia_maxima": 8,
+        "latencia_objetivo": 3.0,
+    },
+}
+CONFIG_POR_DEFECTO = {
+    "tasa_inicial": 1.0, "tasa_minima": 0.1, "tasa_maxima": 4.0,
+    "concurrencia_inicial": 1, "concurrencia_maxima": 4,
+    "latencia_objetivo": 5.0,
+}
+CAPACIDAD_BUCKET = 1.0  # sin ráfagas: como máximo un token acumulado
+EXITOS_PARA_SUBIR = 5  # respuestas rápidas seguidas antes de sumar concurrencia
+FRACCION_INCREMENTO = 0.05  # incremento aditivo de tasa, como fracción del rango
+ESTADOS_BLOQUEO = {403, 429}  # además de cualquier 5xx (ver _estado_penaliza)
+
+# Cortocircuito por dominio: con TASA_ERROR_CIRCUITO de errores entre las últimas VENTANA_CIRCUITO
+# respuestas (y al menos MIN_PETICIONES_CIRCUITO) el circuito se abre y las peticiones al dominio
+# fallan al instante con CircuitoAbierto durante el enfriamiento. Pasado el enfriamiento entra una
+# sola petición de prueba (semiabierto): si responde bien se cierra, si falla se vuelve a abrir
+# con el enfriamiento doblado hasta ENFRIAMIENTO_MAXIMO.
+VENTANA_CIRCUITO = 20
+MIN_PETICIONES_CIRCUITO = 6
+TASA_ERROR_CIRCUITO = 0.6
+ENFRIAMIENTO_CIRCUITO = 30.0  # segundos
+ENFRIAMIENTO_MAXIMO = 300.0
+
+# Reintentos con espera exponencial y jitter completo: uniforme entre 0 y BASE * 2^intento (con tope)
+BACKOFF_BASE = 0.5  # segundos
+BACKOFF_MAXIMO = 20.0
+
+# Estado por dominio
+_estados = {}
+
+
+class CircuitoAbierto(Exception):
+    """El dominio tiene el circuito abierto: la petición no se envía"""
+
+
+def dividir_ritmo(partes: int):
+    """Reparte tasa y concurrencia de cada dominio entre varios procesos que scrapean a la vez.
+
+    Cada proceso lleva su propio estado AIMD; dividiendo los límites, la suma de todos
+    los procesos respeta el ritmo configurado por dominio. Llamar antes de la primera petición.
+    """
+    if partes <= 1:
+        return
+    for config in list(CONFIG_DOMINIOS.values()) + [CONFIG_POR_DEFECTO]:
+        for clave in ("tasa_inicial", "tasa_minima", "tasa_maxima"):
+            config[clave] = config[clave] / partes
+        for clave in ("concurrencia_inicial", "concurrencia_maxima"):
+            config[clave] = max(1, config[clave] // partes)
+
+
+def dominio_de(url: str) -> str:
+    """Devuelve el dominio configurado que corresponde a una URL (p. ej. listado.mercadolibre.com.co)"""
+    host = urlparse(url).hostname or ""
+    for dominio in CONFIG_DOMINIOS:
+        if host == dominio or host.endswith("." + dominio):
+            return dominio
+    return host
+
+
+def _estado(dominio: str) -> dict:
+    if dominio not in _estados:
+        config = CONFIG_DOMINIOS.get(dominio, CONFIG_POR_DEFECTO)
+        _estados[dominio] = {
+            "config": config,
+            "tasa": config["tasa_inicial"],
+            "tokens": CAPACIDAD_BUCKET,
+            "ultima_recarga": time.monotonic(),
+            "limite": config["concurrencia_inicial"],
+            "en_vuelo": 0,
+            "exitos_seguidos": 0,
+            "condicion": asyncio.Condition(),
+            "lock_tokens": asyncio.Lock(),
+            "circuito": "cerrado",  # cerrado | abierto | semiabierto
+            "resultados": deque(maxlen=VENTANA_CIRCUITO),  # True = error
+            "abierto_hasta": 0.0,
+            "enfriamiento": ENFRIAMIENTO_CIRCUITO,
+            "sonda_en_curso": False,
+            "rechazadas": 0,
+        }
+    return _estados[dominio]
+
+
+def circuito_abierto(dominio: str) -> bool:
+    """True si las peticiones al dominio fallarían ahora mismo sin enviarse"""
+    estado = _estado(dominio)
+    if estado["circuito"] == "abierto":
+        return time.monotonic() < estado["abierto_hasta"]
+    return estado["circuito"] == "semiabierto" and estado["sonda_en_curso"]
+
+
+def _entrar_circuito(dominio: str, estado: dict) -> bool:
+    """Deja pasar la petición o lanza CircuitoAbierto; devuelve True si es la petición de prueba"""
+    if estado["circuito"] == "abierto" and time.monotonic() >= estado["abierto_hasta"]:
+        estado["circuito"] = "semiabierto"
+        print(f"[CIRCUITO] {dominio}: enfriamiento cumplido, probando con una petición")
+    if estado["circuito"] == "cerrado":
+        return False
+    if estado["circuito"] == "semiabierto" and not estado["sonda_en_curso"]:
+        estado["sonda_en_curso"] = True
+        return True
+    estado["rechazadas"] += 1
+    raise CircuitoAbierto(f"Circuito abierto para {dominio}")
+
+
+def _abrir_circuito(dominio: str, estado: dict, motivo: str):
+    estado["circuito"] = "abierto"
+    estado["abierto_hasta"] = time.monotonic() + estado["enfriamiento"]
+    estado["sonda_en_curso"] = False
+    print(f"[CIRCUITO] {dominio}: abierto por {estado['enfriamiento']:.0f}s ({motivo})")
+
+
+def _registrar_circuito(dominio: str, estado: dict, error: bool):
+    if estado["circuito"] == "semiabierto":
+        estado["sonda_en_curso"] = False
+        if error:
+            estado["enfriamiento"] = min(ENFRIAMIENTO_MAXIMO, estado["enfriamiento"] * 2)
+            _abrir_circuito(dominio, estado, "la petición de prueba falló")
+        else:
+            estado["circuito"] = "cerrado"
+            estado["enfriamiento"] = ENFRIAMIENTO_CIRCUITO
+            estado["resultados"].clear()
+            print(f"[CIRCUITO] {dominio}: cerrado, el dominio responde de nuevo")
+        return
+    if estado["circuito"] != "cerrado":
+        return  # respuesta de una petición que entró antes de abrirse
+    estado["resultados"].append(error)
+    errores = sum(estado["resultados"])
+    if (len(estado["resultados"]) >= MIN_PETICIONES_CIRCUITO
+            and errores / len(estado["resultados"]) >= TASA_ERROR_CIRCUITO):
+        _abrir_circuito(dominio, estado, f"{errores} errores en {len(estado['resultados'])} peticiones")
+        estado["resultados"].clear()
+
+
+async def esperar_reintento(url: str, intento: int):
+    """Espera antes del reintento número intento+1 (exponencial con jitter completo).
+
+    Si el dominio tiene el circuito abierto no espera: el siguiente intento fallará al instante.
+    """
+    if circuito_abierto(dominio_de(url)):
+        return
+    await asyncio.sleep(random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** intento)))
+
+
+async def _tomar_token(estado: dict):
+    async with estado["lock_tokens"]:
+        while True:
+            ahora = time.monotonic()
+            estado["tokens"] = min(
+                CAPACIDAD_BUCKET,
+                estado["tokens"] + (ahora - estado["ultima_recarga"]) * estado["tasa"],
+            )
+            estado["ultima_recarga"] = ahora
+            if estado["tokens"] >= 1:
+                estado["tokens"] -= 1
+                return
+            await asyncio.sleep((1 - estado["tokens"]) / estado["tasa"])
+
+
+async def esperar_turno(dominio: str):
+    """Espera el siguiente token del dominio (ritmo sin ocupar un hueco de concurrencia)"""
+    await _tomar_token(_estado(dominio))
+
+
+@asynccontextmanager
+async def turno(dominio: str):
+    """Ocupa un hueco de concurrencia del dominio y espera su token antes de entrar.
+
+    Lanza CircuitoAbierto sin esperar si el dominio tiene el circuito abierto.
+    """
+    estado = _estado(dominio)
+    sonda = _entrar_circuito(dominio, estado)
+    try:
+        async with estado["condicion"]:
+            await estado["condicion"].wait_for(lambda: estado["en_vuelo"] < estado["limite"])
+            estado["en_vuelo"] += 1
+    except BaseException:
+        if sonda:
+            estado["sonda_en_curso"] = False
+        raise
+    try:
+        await _tomar_token(estado)
+        if not sonda and circuito_abierto(dominio):
+            # Se abrió mientras esperaba su turno
+            estado["rechazadas"] += 1
+            raise CircuitoAbierto(f"Circuito abierto para {dominio}")
+        yield
+    finally:
+        if sonda and estado["circuito"] == "semiabierto":
+            # La prueba terminó sin registrar resultado: otra petición puede probar
+            estado["sonda_en_curso"] = False
+        async with estado["condicion"]:
+            estado["en_vuelo"] -= 1
+            estado["condicion"].notify_all()
+
+
+def _estado_penaliza(estado_http: int) -> bool:
+    return estado_http is not None and (estado_http in ESTADOS_BLOQUEO or estado_http >= 500)
+
+
+def registrar_resultado(dominio: str, estado_http: int = None, latencia: float = None, error: Exception = None):
+    """Ajusta tasa y concurrencia del dominio según la respuesta observada (AIMD) y su circuito"""
+    estado = _estado(dominio)
+    config = estado["config"]
+    penalizar = error is not None or _estado_penaliza(estado_http)
+    _registrar_circuito(dominio, estado, penalizar)
+
+    if penalizar:
+        estado["tasa"] = max(config["tasa_minima"], estado["tasa"] / 2)
+        estado["limite"] = max(1, estado["limite"] // 2)
+        estado["exitos_seguidos"] = 0
+        motivo = f"HTTP {estado_http}" if _estado_penaliza(estado_http) else type(error).__name__
+        print(f"[RITMO] {dominio}: {motivo}, reduciendo a {estado['tasa']:.3f} req/s y concurrencia {estado['limite']}")
+        return
+
+    if latencia is not None and latencia <= config["latencia_objetivo"]:
+        paso = (config["tasa_maxima"] - config["tasa_minima"]) * FRACCION_INCREMENTO
+        estado["tasa"] = min(config["tasa_maxima"], estado["tasa"] + paso)
+        estado["exitos_seguidos"] += 1
+        if estado["exitos_seguidos"] >= EXITOS_PARA_SUBIR and estado["limite"] < config["concurrencia_maxima"]:
+            estado["limite"] += 1
+            estado["exitos_seguidos"] = 0
+    else:
+        estado["exitos_seguidos"] = 0
+
+
+async def navegar(page, url: str, **opciones):
+    """page.goto bajo el control de ritmo del dominio de la URL; registra estado HTTP y latencia"""
+    dominio = dominio_de(url)
+    registrar_navegacion(page)
+    async with turno(dominio):
+        inicio = time.monotonic()
+        try:
+            respuesta = await page.goto(url, **opciones)
+        except Exception as e:
+            registrar_resultado(dominio, error=e)
+            raise
+        registrar_resultado(dominio, estado_http=respuesta.status if respuesta else None,
+                            latencia=time.monotonic() - inicio)
+        return respuesta
+
+
+def resumen_ritmo() -> dict:
+    """Tasa, concurrencia y circuito actuales por dominio"""
+    return {dominio: {"tasa": estado["tasa"], "concurrencia": estado["limite"],
+                      "circuito": estado["circuito"], "rechazadas": estado["rechazadas"]}
+            for dominio, estado in _estados.items()}
+
+
+def imprimir_resumen_circuitos():
+    """Peticiones que no se enviaron por circuito abierto, por dominio"""
+    for dominio, estado in _estados.items():
+        if estado["rechazadas"]:
+            print(f"[CIRCUITO] {dominio}: {estado['rechazadas']} peticiones evitadas con el circuito abierto "
+                  f"(estado final: {estado['circuito']})")
@@ -0,0 +1,137 @@
+import json
+import math
+import os
+
+# Dimensionamiento automático según los límites del contenedor (cgroup v2):
+# número de navegadores del pool y páginas concurrentes por retailer a partir de
+# las CPUs y la memoria disponibles y del costo medido de cada página.
+RUTA_CGROUP = "/sys/fs/cgroup"
+ARCHIVO_COSTO = os.path.join("data", "costo_paginas.json")
+COSTO_PAGINA_MB_INICIAL = 180  # hasta tener una medición propia (memoria_navegador la guarda al cerrar)
+RESERVA_MB = 800  # Python, pandas y el driver de Playwright
+FRACCION_MEMORIA = 0.75  # margen frente al OOM killer
+PAGINAS_POR_CPU = 3  # las páginas pasan la mayor parte del tiempo esperando red
+CPUS_POR_NAVEGADOR = 2
+MAX_NAVEGADORES = 4
+MAX_PROCESOS = 4  # procesos del supervisor (supervisor.py), cada uno con su navegador
+MIN_PAGINAS_RETAILER = 1
+MAX_PAGINAS_RETAILER = 10
+SUAVIZADO_COSTO = 0.5  # peso de la medición nueva frente a la guardada
+
+# Peso relativo de cada retailer al repartir las páginas
+PESOS_RETAILER = {
+    "exito": 1.0,
+    "falabella": 1.0,  # páginas más pesadas, pero tiene el camino rápido de __NEXT_DATA__
+    "ktronix": 0.5,  # la mayoría de detalles van por HTTP sin navegador
+    "mercadolibre": 0.0,  # una sola página secuencial
+}
+
+
+def _leer(ruta: str):
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def limite_cpus() -> float:
+    """CPUs disponibles: cuota de cpu.max (cgroup v2) o, sin límite, las del host"""
+    cpu_max = _leer(os.path.join(RUTA_CGROUP, "cpu.max"))
+    if cpu_max:
+        cuota, _, periodo = cpu_max.partition(" ")
+        if cuota != "max" and periodo:
+            return int(cuota) / int(periodo)
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return float(os.cpu_count() or 1)
+
+
+def limite_memoria_mb() -> float:
+    """Memoria disponible: memory.max (cgroup v2) o, sin límite, la total del host"""
+    memoria_max = _leer(os.path.join(RUTA_CGROUP, "memory.max"))
+    if memoria_max and memoria_max != "max":
+        return int(memoria_max) / (1024 * 1024)
+    meminfo = _leer("/proc/meminfo") or ""
+    for linea in meminfo.splitlines():
+        if linea.startswith("MemTotal:"):
+            return int(linea.split()[1]) / 1024
+    return 4096.0
+
+
+def costo_pagina_mb() -> float:
+    """Costo medido de una página abierta (MB), o el inicial si aún no hay medición"""
+    try:
+        with open(ARCHIVO_COSTO, "r", encoding="utf-8") as f:
+            return float(json.load(f)["mb_por_pagina"])
+    except (OSError, ValueError, KeyError):
+        return float(COSTO_PAGINA_MB_INICIAL)
+
+
+def registrar_costo_pagina(mb_por_pagina: float):
+    """Guarda la medición de la ejecución suavizada con la anterior"""
+    if mb_por_pagina <= 0:
+        return
+    anterior = costo_pagina_mb() if os.path.exists(ARCHIVO_COSTO) else mb_por_pagina
+    nuevo = SUAVIZADO_COSTO * mb_por_pagina + (1 - SUAVIZADO_COSTO) * anterior
+    try:
+        os.makedirs(os.path.dirname(ARCHIVO_COSTO), exist_ok=True)
+        # Escritura atómica: varios procesos del supervisor pueden registrar a la vez
+        temporal = f"{ARCHIVO_COSTO}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"mb_por_pagina": round(nuevo, 1)}, f)
+        os.replace(temporal, ARCHIVO_COSTO)
+    except OSError as e:
+        print(f"[RECURSOS] No se pudo guardar el costo por página: {e}")
+
+
+def procesos_automaticos() -> int:
+    """Procesos de scraping para el supervisor: uno por CPU, acotado por MAX_PROCESOS"""
+    return max(1, min(MAX_PROCESOS, int(limite_cpus())))
+
+
+def calcular_dimensionamiento(retailers: list) -> dict:
+    """Elige navegadores y páginas por retailer según CPU, memoria y costo por página.
+
+    Devuelve {"cpus", "memoria_mb", "costo_pagina_mb", "navegadores", "paginas_totales",
+    "paginas": {retailer: n}}.
+    """
+    cpus = limite_cpus()
+    memoria_mb = limite_memoria_mb()
+    costo = costo_pagina_mb()
+
+    navegadores = max(1, min(MAX_NAVEGADORES, math.ceil(cpus / CPUS_POR_NAVEGADOR)))
+    memoria_util = memoria_mb * FRACCION_MEMORIA - RESERVA_MB
+    por_memoria = int(memoria_util // costo)
+    por_cpu = int(cpus * PAGINAS_POR_CPU)
+    paginas_totales = max(1, min(por_memoria, por_cpu))
+
+    pesos = {retailer: PESOS_RETAILER.get(retailer, 1.0) for retailer in retailers}
+    suma_pesos = sum(pesos.values()) or 1.0
+    paginas = {}
+    for retailer, peso in pesos.items():
+        if peso <= 0:
+            continue
+        cuota = int(paginas_totales * peso / suma_pesos)
+        paginas[retailer] = max(MIN_PAGINAS_RETAILER, min(MAX_PAGINAS_RETAILER, cuota))
+
+    return {
+        "cpus": cpus,
+        "memoria_mb": memoria_mb,
+        "costo_pagina_mb": costo,
+        "navegadores": navegadores,
+        "paginas_totales": paginas_totales,
+        "limitado_por": "memoria" if por_memoria < por_cpu else "cpu",
+        "paginas": paginas,
+    }
+
+
+def imprimir_dimensionamiento(dimension: dict):
+    print(f"[RECURSOS] {dimension['cpus']:.1f} CPUs, {dimension['memoria_mb']:.0f} MB, "
+          f"~{dimension['costo_pagina_mb']:.0f} MB por página")
+    print(f"[RECURSOS] {dimension['navegadores']} navegadores, {dimension['paginas_totales']} páginas "
+          f"(limitado por {dimension['limitado_por']})")
+    if dimension["paginas"]:
+        detalle = ", ".join(f"{retailer}={n}" for retailer, n in dimension["paginas"].items())
+        print(f"[RECURSOS] Páginas de detalle por retailer: {detalle}")
@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+import cola_trabajo
+import scraper_completo
+import scraper_exito
+import scraper_falabella
+import scraper_ktronix
+from config import CONDICIONES
+from pool_navegadores import iniciar_pool, cerrar_pool, nuevo_contexto, obtener_contexto_saludable, cerrar_contexto
+
+# Ejecución repartida entre varias máquinas a través de la cola de trabajo (cola_trabajo).
+#   python ejecucion_distribuida.py publicar [retailers]    -> crea la ejecución e imprime su RUN_ID
+#   python ejecucion_distribuida.py trabajar RUN_ID         -> en cada nodo, consume tareas hasta vaciar la cola
+#   python ejecucion_distribuida.py consolidar RUN_ID       -> un Excel final por retailer con el RUN_ID en el nombre
+#   python ejecucion_distribuida.py estado RUN_ID
+# Tipos de tarea: "busqueda" (dispositivo y, en MercadoLibre, condición), "producto" (URL de detalle)
+# y "variacion" (URL de variación de MercadoLibre). Las búsquedas publican sus productos y los
+# productos de MercadoLibre sus variaciones, así el trabajo se reparte en cuanto aparece.
+PAGINAS_TRABAJADOR = 4  # tareas concurrentes por trabajador, cada una en su propia página
+ESPERA_SIN_TAREAS = 5  # segundos entre consultas cuando otros nodos aún tienen tareas arrendadas
+
+# retailer -> (módulo, búsqueda inicial, detalle de producto)
+RETAILERS = {
+    "ktronix": (scraper_ktronix, scraper_ktronix.scrape_busqueda_inicial_ktronix,
+                scraper_ktronix.extraer_detalles_producto_ktronix),
+    "falabella": (scraper_falabella, scraper_falabella.scrape_busqueda_inicial_falabella,
+                  scraper_falabella.extraer_detalles_producto_falabella),
+    "exito": (scraper_exito, scraper_exito.scrape_busqueda_inicial_exito,
+              scraper_exito.extraer_detalles_producto_exito),
+    "mercadolibre": (scraper_completo, scraper_completo.scrape_busqueda_inicial,
+                     scraper_completo.extraer_detalles_producto),
+}
+
+
+def publicar_ejecucion(retailers: list, run_id: str = None) -> str:
+    """Crea la ejecución publicando una tarea de búsqueda por dispositivo (y condición en MercadoLibre)"""
+    run_id = run_id or cola_trabajo.nuevo_run_id()
+    fecha_scraping = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    publicadas = 0
+    for retailer in retailers:
+        modulo = RETAILERS[retailer][0]
+        condiciones = CONDICIONES if retailer == "mercadolibre" else [None]
+        for dispositivo in modulo.DISPOSITIVOS:
+            for condicion in condiciones:
+                carga = {"retailer": retailer, "dispositivo": dispositivo, "condicion": condicion,
+                         "fecha_scraping": fecha_scraping}
+                clave = f"busqueda:{retailer}:{dispositivo}:{condicion or ''}"
+                publicadas += cola_trabajo.publicar(run_id, "busqueda", carga, clave)
+    print(f"[COLA] Ejecución {run_id}: {publicadas} búsquedas publicadas ({', '.join(retailers)})")
+    return run_id
+
+
+async def _tarea_busqueda(run_id: str, tarea: dict, page):
+    carga = tarea["carga"]
+    retailer = carga["retailer"]
+    buscar = RETAILERS[retailer][1]
+    if retailer == "mercadolibre":
+        productos = await buscar(page, carga["dispositivo"], carga["condicion"])
+        productos = productos[:scraper_completo.MAX_PRODUCTOS_TOTAL]
+    else:
+        productos = await buscar(page, carga["dispositivo"])
+    nuevos = 0
+    for producto in productos or []:
+        carga_producto = {"retailer": retailer, "producto": producto, "fecha_scraping": carga["fecha_scraping"]}
+        nuevos += cola_trabajo.publicar(run_id, "producto", carga_producto, f"producto:{retailer}:{producto['url']}")
+    print(f"[COLA] {retailer} / {carga['dispositivo']}: {nuevos} productos publicados")
+
+
+async def _tarea_producto(run_id: str, tarea: dict, page):
+    carga = tarea["carga"]
+    retailer = carga["retailer"]
+    detalle = await RETAILERS[retailer][2](page, carga["producto"], carga["fecha_scraping"])
+    if retailer == "mercadolibre":
+        # Con la página del producto ya cargada se recolectan sus variaciones para otros trabajadores
+        variaciones = await scraper_completo.recolectar_variaciones_producto(
+            page, carga["producto"], carga["fecha_scraping"], set())
+        for variacion in variaciones:
+            clave = f"variacion:{scraper_completo.extraer_id_producto(variacion['url']) or variacion['url']}"
+            cola_trabajo.publicar(run_id, "variacion", {"retailer": retailer, "variacion": variacion,
+                                                        "fecha_scraping": carga["fecha_scraping"]}, clave)
+    cola_trabajo.guardar_resultado(run_id, tarea, retailer, detalle)
+
+
+async def _tarea_variacion(run_id: str, tarea: dict, page):
+    carga = tarea["carga"]
+    variacion = await scraper_completo.procesar_variacion_completa(page, carga["variacion"], carga["fecha_scraping"])
+    cola_trabajo.guardar_resultado(run_id, tarea, carga["retailer"], variacion)
+
+
+TAREAS = {
+    "busqueda": _tarea_busqueda,
+    "producto": _tarea_producto,
+    "variacion": _tarea_variacion,
+}
+
+
+async def _prorrogar_mientras(run_id: str, tarea: dict, trabajador: str):
+    """Mantiene el arriendo mientras la tarea se procesa"""
+    while True:
+        await asyncio.sleep(cola_trabajo.VISIBILIDAD_SEGUNDOS / 3)
+        if not await asyncio.to_thread(cola_trabajo.prorrogar, run_id, tarea, trabajador):
+            print(f"[COLA] ⚠️ Se perdió el arriendo de la tarea {tarea['id']}")
+            return
+
+
+async def _contexto(retailer: str, contextos: dict, lock: asyncio.Lock):
+    async with lock:
+        if retailer not in contextos:
+            modulo = RETAILERS[retailer][0]
+            contextos[retailer] = await nuevo_contexto(
+                retailer,
+                viewport={"width": modulo.VIEWPORT_WIDTH, "height": modulo.VIEWPORT_HEIGHT},
+                user_agent=random.choice(modulo.USER_AGENTS),
+            )
+        return contextos[retailer]
+
+
+async def _ejecutar_tarea(run_id: str, trabajador: str, tarea: dict, contextos: dict, lock: asyncio.Lock):
+    retailer = tarea["carga"]["retailer"]
+    print(f"[COLA] {trabajador}: tarea {tarea['id']} ({tarea['tipo']} {retailer}, intento {tarea['intentos']})")
+    prorroga = asyncio.create_task(_prorrogar_mientras(run_id, tarea, trabajador))
+    page = None
+    try:
+        context = await _contexto(retailer, contextos, lock)
+        page = await context.new_page()
+        await TAREAS[tarea["tipo"]](run_id, tarea, page)
+        await asyncio.to_thread(cola_trabajo.confirmar, run_id, tarea, trabajador)
+    except Exception as e:
+        definitivo = await asyncio.to_thread(cola_trabajo.liberar, run_id, tarea, trabajador, str(e))
+        print(f"[COLA] ❌ Tarea {tarea['id']} falló{' definitivamente' if definitivo else ''}: {e}")
+        # En reintentos solo se reemplaza el contexto si está roto
+        async with lock:
+            if retailer in contextos:
+                contextos[retailer] = await obtener_contexto_saludable(contextos[retailer])
+    finally:
+        prorroga.cancel()
+        if page:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+
+async def _bucle_trabajador(run_id: str, trabajador: str, contextos: dict, lock: asyncio.Lock):
+    while True:
+        tarea = await asyncio.to_thread(cola_trabajo.arrendar, run_id, trabajador)
+        if tarea is None:
+            estado = await asyncio.to_thread(cola_trabajo.resumen, run_id)
+            if not estado["pendiente"] and not estado["arrendada"]:
+                return
+            # Otras tareas en curso todavía pueden publicar productos o variaciones
+            await asyncio.sleep(ESPERA_SIN_TAREAS)
+            continue
+        await _ejecutar_tarea(run_id, trabajador, tarea, contextos, lock)
+
+
+async def trabajar(run_id: str, paginas: int = PAGINAS_TRABAJADOR):
+    """Consume tareas de la ejecución hasta que no quede ninguna pendiente ni arrendada"""
+    trabajador = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"[COLA] Trabajador {trabajador} en la ejecución {run_id} con {paginas} páginas")
+    contextos = {}
+    lock = asyncio.Lock()
+    await iniciar_pool()
+    try:
+        await asyncio.gather(*(_bucle_trabajador(run_id, trabajador, contextos, lock) for _ in range(paginas)))
+    finally:
+        for context in contextos.values():
+            await cerrar_contexto(context)
+        await cerrar_pool()
+    imprimir_estado(run_id)
+
+
+def consolidar(run_id: str) -> list:
+    """Escribe un Excel final por retailer con todos los resultados de la ejecución"""
+    directorio = "/app/output" if os.path.exists("/app/output") else "."
+    archivos = []
+    for retailer, registros in cola_trabajo.resultados(run_id).items():
+        archivo = os.path.join(directorio, f"resultados_{retailer}_final_{run_id}.xlsx")
+        pd.DataFrame(registros).to_excel(archivo, index=False)
+        print(f"[FINAL] {retailer}: {archivo} ({len(registros)} productos)")
+        archivos.append(archivo)
+    return archivos
+
+
+def imprimir_estado(run_id: str):
+    estado = cola_trabajo.resumen(run_id)
+    print(f"[COLA] Ejecución {run_id}: " + ", ".join(f"{nombre}={numero}" for nombre, numero in estado.items()))
+    for tipo, carga, error in cola_trabajo.fallidas(run_id):
+        objetivo = carga.get("dispositivo") or carga.get("producto", carga.get("variacion", {})).get("url")
+        print(f"  [FALLIDA] {tipo} {carga['retailer']}: {objetivo} ({error})")
+    return estado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reparte una ejecución de scraping entre varios nodos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    publicar = subparsers.add_parser("publicar", help="Crea una ejecución y publica sus búsquedas")
+    publicar.add_argument("retailers", nargs="*", metavar="RETAILER",
+                          help=f"Retailers a ejecutar: {', '.join(RETAILERS)} (por defecto todos)")
+    publicar.add_argument("--run-id", help="Usar este RUN_ID en lugar de generar uno")
+    trabajar_parser = subparsers.add_parser("trabajar", help="Consume tareas de una ejecución")
+    trabajar_parser.add_argument("run_id", metavar="RUN_ID")
+    trabajar_parser.add_argument("--paginas", type=int, default=PAGINAS_TRABAJADOR,
+                                 help="Tareas concurrentes en este nodo")
+    for comando, ayuda in (("consolidar", "Genera los Excel finales de una ejecución"),
+                           ("estado", "Muestra las tareas por estado")):
+        subparsers.add_parser(comando, help=ayuda).add_argument("run_id", metavar="RUN_ID")
+    args = parser.parse_args()
+
+    if args.comando == "publicar":
+        retailers = args.retailers or list(RETAILERS)
+        for nombre in retailers:
+            if nombre not in RETAILERS:
+                parser.error(f"Retailer desconocido: {nombre}")
+        print(publicar_ejecucion(retailers, args.run_id))
+    elif args.comando == "trabajar":
+        asyncio.run(trabajar(args.run_id, max(1, args.paginas)))
+    elif args.comando == "consolidar":
+        sys.exit(0 if consolidar(args.run_id) else 1)
+    else:
+        estado = imprimir_estado(args.run_id)
+        sys.exit(1 if estado["fallida"] else 0)
+
+
+if __name__ == "__main__":
+    main()
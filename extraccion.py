@@ -0,0 +1,201 @@
+import json
+import re
+
+# Extracción en una sola ida y vuelta: el recorrido del DOM se hace dentro de la página
+# con page.evaluate en lugar de un query_selector + inner_text por campo y por tarjeta.
+
+JS_EXTRAER_TARJETAS = """
+([contenedores, campos]) => {
+    let elementos = [];
+    let selectorUsado = null;
+    for (const selector of contenedores) {
+        const encontrados = document.querySelectorAll(selector);
+        if (encontrados.length) {
+            elementos = Array.from(encontrados);
+            selectorUsado = selector;
+            break;
+        }
+    }
+    const leer = (nodo, atributo) => {
+        const valor = atributo ? nodo.getAttribute(atributo) : nodo.innerText;
+        return valor && valor.trim() ? valor.trim() : null;
+    };
+    const tarjetas = elementos.map((elemento, indice) => {
+        const registro = {indice: indice};
+        try {
+            for (const [nombre, definicion] of Object.entries(campos)) {
+                let valor = null;
+                for (const selector of definicion.selectores) {
+                    const nodo = selector === ':scope' ? elemento : elemento.querySelector(selector);
+                    if (!nodo) continue;
+                    valor = leer(nodo, definicion.atributo);
+                    if (valor !== null) break;
+                }
+                registro[nombre] = valor;
+            }
+        } catch (e) {
+            registro.error = String(e);
+        }
+        return registro;
+    });
+    return {selector: selectorUsado, tarjetas: tarjetas};
+}
+"""
+
+
+def campo(*selectores, atributo=None) -> dict:
+    """Define un campo a extraer: primer selector con valor no vacío (':scope' es la propia tarjeta).
+
+    Sin atributo se lee innerText; con atributo se lee getAttribute(atributo).
+    """
+    return {"selectores": list(selectores), "atributo": atributo}
+
+
+async def extraer_tarjetas(page, contenedores, campos: dict):
+    """Extrae todas las tarjetas de un listado con un único page.evaluate.
+
+    contenedores: selector o lista de selectores candidatos (se usa el primero con resultados).
+    campos: {nombre: campo(...)}.
+    Devuelve (selector_usado, tarjetas); cada tarjeta es un dict con los campos, su 'indice'
+    y una clave 'error' si falló la extracción de esa tarjeta.
+    """
+    if isinstance(contenedores, str):
+        contenedores = [contenedores]
+    resultado = await page.evaluate(JS_EXTRAER_TARJETAS, [contenedores, campos])
+    tarjetas = resultado["tarjetas"]
+    for tarjeta in tarjetas:
+        if tarjeta.get("error"):
+            print(f"      ⚠️ Error en tarjeta {tarjeta['indice']}: {tarjeta['error']}")
+    return resultado["selector"], tarjetas
+
+
+JS_EXTRAER_DETALLE = """
+([textos, tabla]) => {
+    const leer = (nodo) => {
+        const valor = nodo.innerText || nodo.textContent;
+        return valor && valor.trim() ? valor.trim() : null;
+    };
+    const resultado = {textos: {}, filas: [], error: null};
+    try {
+        for (const [nombre, selectores] of Object.entries(textos)) {
+            let valor = null;
+            for (const selector of selectores) {
+                const nodo = document.querySelector(selector);
+                if (!nodo) continue;
+                valor = leer(nodo);
+                if (valor !== null) break;
+            }
+            resultado.textos[nombre] = valor;
+        }
+        if (tabla) {
+            for (const fila of document.querySelectorAll(tabla.filas)) {
+                const nombre = fila.querySelector(tabla.nombre);
+                const valor = fila.querySelector(tabla.valor);
+                if (nombre && valor) resultado.filas.push([leer(nombre) || '', leer(valor) || '']);
+            }
+        }
+    } catch (e) {
+        resultado.error = String(e);
+    }
+    return resultado;
+}
+"""
+
+
+async def extraer_detalle(page, textos: dict, tabla: dict = None):
+    """Lee precios, tabla de especificaciones y vendedor de una página de producto con un único page.evaluate.
+
+    textos: {nombre: selector o lista de selectores} (primer texto no vacío del documento).
+    tabla: {"filas": selector, "nombre": selector, "valor": selector} relativo a cada fila.
+    Devuelve (textos, filas) con filas como lista de [nombre, valor].
+    """
+    textos = {nombre: [selectores] if isinstance(selectores, str) else list(selectores)
+              for nombre, selectores in textos.items()}
+    resultado = await page.evaluate(JS_EXTRAER_DETALLE, [textos, tabla])
+    if resultado["error"]:
+        print(f"      ⚠️ Error en la extracción del detalle: {resultado['error']}")
+    return resultado["textos"], resultado["filas"]
+
+
+JS_PULSAR = """
+([boton, filas]) => {
+    const nodo = document.querySelector(boton);
+    if (!nodo) return null;
+    const antes = document.querySelectorAll(filas).length;
+    nodo.click();
+    return antes;
+}
+"""
+
+JS_EXPANDIDO = """
+([boton, filas, antes]) => {
+    const nodo = document.querySelector(boton);
+    return !nodo || nodo.getAttribute('aria-expanded') === 'true' || document.querySelectorAll(filas).length > antes;
+}
+"""
+
+
+async def pulsar_y_esperar(page, boton: str, filas: str, timeout: float) -> bool:
+    """Pulsa un botón que despliega una tabla y espera a que se despliegue, en lugar de una pausa fija.
+
+    Se da por desplegada cuando la tabla tiene más filas que antes del clic, el botón pasa a
+    aria-expanded="true" o desaparece. Si vence el timeout se sigue con lo que haya en la página.
+    Devuelve False si el botón no existe.
+    """
+    antes = await page.evaluate(JS_PULSAR, [boton, filas])
+    if antes is None:
+        return False
+    try:
+        await page.wait_for_function(JS_EXPANDIDO, arg=[boton, filas, antes], timeout=timeout)
+    except Exception:
+        print(f"      ⚠️ La tabla no se desplegó en {timeout / 1000:.0f}s, se lee lo que haya")
+    return True
+
+
+def mapear_filas(filas, reglas) -> dict:
+    """Asigna filas [nombre, valor] a campos: reglas es [(claves, campo)], gana la primera clave contenida en el nombre"""
+    datos = {}
+    for nombre, valor in filas:
+        for claves, campo_destino in reglas:
+            if any(clave in nombre for clave in claves):
+                datos[campo_destino] = valor
+                break
+    return datos
+
+
+def a_entero(texto):
+    """Convierte un precio con separadores ("$ 1.299.900") a int, o None si no tiene dígitos"""
+    if not texto:
+        return None
+    limpio = re.sub(r'[^\d]', '', texto)
+    return int(limpio) if limpio else None
+
+
+def porcentaje(texto):
+    """Extrae el porcentaje de un texto como "-15%" o "15% OFF", o None"""
+    match = re.search(r'(\d+)%', texto or "")
+    return int(match.group(1)) if match else None
+
+
+JS_LEER_SCRIPT = """
+(id) => {
+    const nodo = document.getElementById(id);
+    if (nodo) return nodo.textContent;
+    return window[id] ? JSON.stringify(window[id]) : null;
+}
+"""
+
+
+async def leer_json_embebido(page, id_script: str):
+    """Lee y decodifica el JSON de estado que el servidor incrusta en un <script id=...> (p. ej. __NEXT_DATA__),
+    o en la variable global window[id] si no hay script con ese id.
+
+    Devuelve None si no existe o su contenido no es JSON válido.
+    """
+    texto = await page.evaluate(JS_LEER_SCRIPT, id_script)
+    if not texto:
+        return None
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return None
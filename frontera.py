@@ -0,0 +1,90 @@
+import os
+import time
+
+# Frontera de URLs visitadas por ID canónico, compartida entre ejecuciones.
+# Se guarda como un archivo de texto ordenado por ID ("ID<TAB>epoch" por línea) en data/.
+# Solo se conservan los IDs visitados dentro de la ventana de frescura, así el archivo y
+# la memoria quedan acotados por lo visitado en esa ventana y no crecen sin límite.
+# Entre ejecuciones es opcional (FRESCURA_FRONTERA_HORAS > 0): un ID de una ejecución anterior
+# conserva su fila del listado y solo se salta la visita al detalle.
+DIRECTORIO_FRONTERA = "data"
+VENTANA_FRESCURA_HORAS = float(os.environ.get("FRESCURA_FRONTERA_HORAS", "0"))  # 0 = solo dentro de la ejecución
+
+
+def ruta_frontera(nombre: str) -> str:
+    return os.path.join(DIRECTORIO_FRONTERA, f"frontera_{nombre}.tsv")
+
+
+def _leer_vistos(ruta: str, desde: float) -> dict:
+    vistos = {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                id_visto, _, momento = linea.rstrip("\n").partition("\t")
+                try:
+                    momento = float(momento)
+                except ValueError:
+                    continue
+                if momento >= desde:
+                    vistos[id_visto] = max(momento, vistos.get(id_visto, 0))
+    except OSError:
+        pass
+    return vistos
+
+
+def cargar_frontera(nombre: str, ventana_horas: float = None) -> dict:
+    """Carga los IDs visitados dentro de la ventana de frescura"""
+    ventana_horas = VENTANA_FRESCURA_HORAS if ventana_horas is None else ventana_horas
+    ruta = ruta_frontera(nombre)
+    ventana = ventana_horas * 3600
+    previos = _leer_vistos(ruta, time.time() - ventana) if ventana > 0 else {}
+    if previos:
+        print(f"[FRONTERA] {len(previos)} IDs visitados en las últimas {ventana_horas:g} h ({ruta})")
+    return {"ruta": ruta, "ventana": ventana, "previos": previos, "ejecucion": {}, "saltados": 0}
+
+
+def visto(frontera: dict, id_visto: str) -> bool:
+    """True si el ID ya se visitó en esta ejecución (duplicado: no se vuelve a registrar)"""
+    if not id_visto:
+        return False
+    if id_visto in frontera["ejecucion"]:
+        frontera["saltados"] += 1
+        return True
+    return False
+
+
+def visto_antes(frontera: dict, id_visto: str) -> bool:
+    """True si el ID se visitó en una ejecución anterior dentro de la ventana de frescura.
+
+    Queda marcado en esta ejecución con su fecha original (no se renueva su frescura sin visitarlo),
+    así una segunda aparición en la misma ejecución cuenta como duplicado.
+    """
+    if not id_visto or id_visto not in frontera["previos"]:
+        return False
+    frontera["saltados"] += 1
+    frontera["ejecucion"].setdefault(id_visto, frontera["previos"][id_visto])
+    return True
+
+
+def marcar(frontera: dict, id_visto: str):
+    if id_visto:
+        frontera["ejecucion"][id_visto] = time.time()
+
+
+def guardar_frontera(frontera: dict):
+    """Une lo visitado en la ejecución con el archivo (otro proceso pudo escribirlo) y lo reescribe ordenado"""
+    if frontera["ventana"] <= 0 or not frontera["ejecucion"]:
+        return
+    vistos = _leer_vistos(frontera["ruta"], time.time() - frontera["ventana"])
+    for id_visto, momento in frontera["ejecucion"].items():
+        vistos[id_visto] = max(momento, vistos.get(id_visto, 0))
+    try:
+        os.makedirs(os.path.dirname(frontera["ruta"]), exist_ok=True)
+        temporal = f"{frontera['ruta']}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for id_visto in sorted(vistos):
+                f.write(f"{id_visto}\t{vistos[id_visto]:.0f}\n")
+        os.replace(temporal, frontera["ruta"])
+        print(f"[FRONTERA] {len(vistos)} IDs guardados, {frontera['saltados']} visitas duplicadas evitadas")
+    except OSError as e:
+        print(f"[FRONTERA] No se pudo guardar la frontera: {e}")
@@ -0,0 +1,197 @@
+import asyncio
+import csv
+import os
+import time
+from datetime import datetime
+
+from dimensionamiento import registrar_costo_pagina
+
+# Vigilancia de memoria de Chromium: gc.collect() y window.gc() no liberan la memoria
+# de los procesos renderer, solo cerrar la página o el contexto lo hace. Se muestrea
+# la memoria de los procesos del navegador y se reciclan páginas/contextos cuando
+# superan el umbral o un número de navegaciones.
+UMBRAL_RSS_MB = int(os.environ.get("UMBRAL_RSS_MB", "3500"))  # docker-compose limita el contenedor a 5G
+MAX_NAVEGACIONES_PAGINA = 40  # reciclar la página aunque la memoria esté bien
+MIN_NAVEGACIONES_RECICLAJE = 3  # no reciclar una página recién creada aunque el umbral siga superado
+INTERVALO_MUESTREO = 5.0  # segundos
+# La memoria medida es la de todo Chromium: por cada cruce del umbral se recicla una sola página
+# (la de más navegaciones) y no otra hasta pasado el enfriamiento y con una muestra posterior
+ENFRIAMIENTO_RECICLAJE = 2 * INTERVALO_MUESTREO  # segundos
+DIRECTORIO_LOGS = "logs"
+PROCESOS_NAVEGADOR = ("chrome", "chromium", "headless_shell")
+
+_estado = {
+    "rss_mb": 0.0,
+    "pico_mb": 0.0,
+    "paginas_en_pico": 0,
+    "procesos": 0,
+    "reciclajes": 0,
+    "tarea": None,
+    "archivo": None,
+    "inicio": None,
+    "contar_paginas": None,  # función que devuelve las páginas abiertas en el pool
+    "momento_muestra": 0.0,  # time.monotonic() de la última muestra
+    "reciclaje_memoria": None,  # time.monotonic() del último reciclaje por memoria
+}
+_navegaciones = {}  # page -> navegaciones desde que se abrió
+
+
+def _leer(ruta: str) -> str:
+    with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _procesos_hijos() -> dict:
+    """ppid -> [pid] de todos los procesos visibles en /proc"""
+    hijos = {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            stat = _leer(f"/proc/{entrada}/stat")
+        except OSError:
+            continue
+        # El nombre va entre paréntesis y puede contener espacios: ppid es el 2º campo tras ')'
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        hijos.setdefault(ppid, []).append(int(entrada))
+    return hijos
+
+
+def _memoria_proceso_kb(pid: int) -> int:
+    """PSS del proceso (reparte la memoria compartida entre renderers) o RSS si no está disponible"""
+    try:
+        for linea in _leer(f"/proc/{pid}/smaps_rollup").splitlines():
+            if linea.startswith("Pss:"):
+                return int(linea.split()[1])
+    except OSError:
+        pass
+    try:
+        paginas_residentes = int(_leer(f"/proc/{pid}/statm").split()[1])
+        return paginas_residentes * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def rss_navegadores():
+    """Memoria (MB) y número de procesos de Chromium (navegador + renderers) descendientes de este proceso.
+
+    Devuelve (None, 0) si /proc no está disponible (fuera de Linux).
+    """
+    if not os.path.isdir("/proc"):
+        return None, 0
+    hijos = _procesos_hijos()
+    pendientes = list(hijos.get(os.getpid(), []))
+    total_kb = 0
+    procesos = 0
+    while pendientes:
+        pid = pendientes.pop()
+        pendientes.extend(hijos.get(pid, []))
+        try:
+            nombre = _leer(f"/proc/{pid}/comm").strip().lower()
+        except OSError:
+            continue
+        if any(proceso in nombre for proceso in PROCESOS_NAVEGADOR):
+            total_kb += _memoria_proceso_kb(pid)
+            procesos += 1
+    return total_kb / 1024, procesos
+
+
+def registrar_navegacion(page):
+    _navegaciones[page] = _navegaciones.get(page, 0) + 1
+
+
+def olvidar_pagina(page):
+    _navegaciones.pop(page, None)
+
+
+def motivo_reciclaje(page):
+    """Motivo para reciclar la página ("memoria" o "navegaciones"), o None si puede seguir"""
+    navegaciones = _navegaciones.get(page, 0)
+    if navegaciones >= MAX_NAVEGACIONES_PAGINA:
+        return "navegaciones"
+    if _estado["rss_mb"] < UMBRAL_RSS_MB or navegaciones < MIN_NAVEGACIONES_RECICLAJE:
+        return None
+    ultimo = _estado["reciclaje_memoria"]
+    if ultimo is not None and (time.monotonic() - ultimo < ENFRIAMIENTO_RECICLAJE
+                               or _estado["momento_muestra"] <= ultimo):
+        return None  # la muestra aún no refleja lo liberado por el último reciclaje
+    if navegaciones < max(_navegaciones.values()):
+        return None  # se recicla primero la página más usada
+    return "memoria"
+
+
+def registrar_reciclaje(tipo: str, motivo: str):
+    _estado["reciclajes"] += 1
+    if motivo == "memoria":
+        _estado["reciclaje_memoria"] = time.monotonic()
+    print(f"[MEMORIA] Reciclando {tipo} por {motivo} "
+          f"({_estado['rss_mb']:.0f} MB en {_estado['procesos']} procesos de Chromium)")
+
+
+def _escribir_muestra():
+    rss_mb, procesos = rss_navegadores()
+    if rss_mb is None:
+        return False
+    paginas = _estado["contar_paginas"]() if _estado["contar_paginas"] else len(_navegaciones)
+    _estado["rss_mb"] = rss_mb
+    _estado["procesos"] = procesos
+    _estado["momento_muestra"] = time.monotonic()
+    if rss_mb >= _estado["pico_mb"]:
+        _estado["pico_mb"] = rss_mb
+        _estado["paginas_en_pico"] = paginas
+    with open(_estado["archivo"], "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow([
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            f"{time.monotonic() - _estado['inicio']:.1f}",
+            f"{rss_mb:.1f}",
+            procesos,
+            paginas,
+            _estado["reciclajes"],
+        ])
+    return True
+
+
+async def _muestrear():
+    while True:
+        try:
+            if not _escribir_muestra():
+                return
+        except Exception as e:
+            print(f"[MEMORIA] Error muestreando memoria: {e}")
+        await asyncio.sleep(INTERVALO_MUESTREO)
+
+
+def iniciar_vigilancia(contar_paginas=None):
+    """Arranca el muestreo periódico y el CSV de la curva de memoria en logs/"""
+    if _estado["tarea"] is not None:
+        return
+    _estado["contar_paginas"] = contar_paginas
+    os.makedirs(DIRECTORIO_LOGS, exist_ok=True)
+    _estado["archivo"] = os.path.join(DIRECTORIO_LOGS, f"memoria_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.csv")
+    _estado["inicio"] = time.monotonic()
+    _estado["pico_mb"] = 0.0
+    _estado["paginas_en_pico"] = 0
+    _estado["reciclajes"] = 0
+    _estado["reciclaje_memoria"] = None
+    with open(_estado["archivo"], "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["fecha", "segundos", "memoria_mb", "procesos", "paginas", "reciclajes"])
+    _estado["tarea"] = asyncio.create_task(_muestrear())
+    print(f"[MEMORIA] Umbral {UMBRAL_RSS_MB} MB, curva de memoria en {_estado['archivo']}")
+
+
+async def detener_vigilancia():
+    tarea = _estado["tarea"]
+    if tarea is None:
+        return
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+    _estado["tarea"] = None
+    _navegaciones.clear()
+    print(f"[MEMORIA] Pico de memoria de Chromium: {_estado['pico_mb']:.0f} MB con "
+          f"{_estado['paginas_en_pico']} páginas, {_estado['reciclajes']} reciclajes")
+    # Costo por página medido para dimensionar la siguiente ejecución
+    if _estado["paginas_en_pico"]:
+        registrar_costo_pagina(_estado["pico_mb"] / _estado["paginas_en_pico"])
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+import scraper_completo
+import scraper_exito
+import scraper_falabella
+import scraper_ktronix
+from dimensionamiento import calcular_dimensionamiento, imprimir_dimensionamiento
+from plazos import PLURALES, iniciar_plazo, resumen_omitidos, guardar_reporte_plazo
+from pool_navegadores import iniciar_pool, cerrar_pool
+from supervisor import supervisar
+
+# Retailers disponibles: módulo del scraper y función principal
+RETAILERS = {
+    "ktronix": (scraper_ktronix, lambda: scraper_ktronix.scrape_ktronix()),
+    "falabella": (scraper_falabella, lambda: scraper_falabella.scrape_falabella()),
+    "exito": (scraper_exito, lambda: scraper_exito.scrape_exito()),
+    "mercadolibre": (scraper_completo, lambda: scraper_completo.scrape_completo()),
+}
+
+# Páginas concurrentes de detalle por retailer (sobrescribe PAGINAS_DETALLE de cada scraper).
+# Se calculan con dimensionamiento según CPU/memoria del contenedor; --paginas los fija a mano.
+# MercadoLibre procesa productos y variaciones en secuencia sobre una sola página.
+RETAILERS_CONCURRENTES = ["ktronix", "falabella", "exito"]
+LIMITES_CONCURRENCIA = {}
+
+
+async def ejecutar_retailer(nombre: str) -> dict:
+    """Ejecuta el scraper de un retailer y devuelve su resultado sin propagar errores"""
+    modulo, funcion = RETAILERS[nombre]
+    if nombre in LIMITES_CONCURRENCIA:
+        modulo.PAGINAS_DETALLE = LIMITES_CONCURRENCIA[nombre]
+
+    inicio = time.monotonic()
+    print(f"[ORQUESTADOR] Iniciando {nombre}")
+    try:
+        archivo = await funcion()
+        exito = bool(archivo)
+        error = None if exito else "sin archivo final"
+    except Exception as e:
+        archivo = None
+        exito = False
+        error = str(e)
+        print(f"[ORQUESTADOR] ❌ {nombre} falló: {error}")
+    duracion = time.monotonic() - inicio
+    print(f"[ORQUESTADOR] {nombre} terminado en {duracion:.1f}s")
+    return {"retailer": nombre, "exito": exito, "archivo": archivo, "error": error, "duracion": duracion}
+
+
+async def orquestar(retailers: list) -> int:
+    """Ejecuta los retailers como tareas concurrentes en un solo event loop.
+
+    Devuelve 0 si todos generaron su archivo final y 1 si alguno falló.
+    """
+    print(f"[ORQUESTADOR] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Retailers: {', '.join(retailers)}")
+    print("=" * 60)
+    inicio = time.monotonic()
+
+    # Navegadores y páginas según los límites del contenedor (cgroup) y el costo medido por página
+    dimension = calcular_dimensionamiento(retailers)
+    for nombre, paginas in dimension["paginas"].items():
+        LIMITES_CONCURRENCIA.setdefault(nombre, paginas)
+    imprimir_dimensionamiento(dimension)
+
+    # Un único pool de navegadores para todos los retailers
+    await iniciar_pool(dimension["navegadores"])
+    try:
+        resultados = await asyncio.gather(*(ejecutar_retailer(nombre) for nombre in retailers))
+    finally:
+        await cerrar_pool()
+
+    print("\n" + "=" * 60)
+    print(f"[ORQUESTADOR] Resumen ({time.monotonic() - inicio:.1f}s en total)")
+    omitidos = resumen_omitidos()
+    for resultado in resultados:
+        estado = "OK" if resultado["exito"] else "ERROR"
+        detalle = resultado["archivo"] if resultado["exito"] else resultado["error"]
+        if resultado["retailer"] in omitidos:
+            # Ejecución parcial por plazo: el archivo es válido pero le falta lo omitido
+            detalle += " (omitidos por plazo: " + ", ".join(
+                f"{numero} {PLURALES[tipo]}" for tipo, numero in omitidos[resultado["retailer"]].items()) + ")"
+        print(f"  [{estado}] {resultado['retailer']}: {detalle} ({resultado['duracion']:.1f}s)")
+    guardar_reporte_plazo()
+
+    return 0 if all(resultado["exito"] for resultado in resultados) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta los scrapers de todos los retailers en paralelo")
+    parser.add_argument("retailers", nargs="*", metavar="RETAILER",
+                        help=f"Retailers a ejecutar: {', '.join(RETAILERS)} (por defecto todos)")
+    parser.add_argument("--paginas", action="append", default=[], metavar="RETAILER=N",
+                        help="Páginas concurrentes de detalle para un retailer, p. ej. --paginas exito=6")
+    parser.add_argument("--procesos", type=int, default=1, metavar="N",
+                        help="Reparte los dispositivos entre N procesos, cada uno con su navegador "
+                             "(0 = uno por CPU; por defecto 1, todo en un solo event loop)")
+    parser.add_argument("--presupuesto", type=float, default=None, metavar="MIN",
+                        help="Minutos de la ejecución: no se empieza trabajo nuevo que no quepa y se guarda "
+                             "a tiempo (por defecto PRESUPUESTO_MINUTOS, 0 = sin límite)")
+    args = parser.parse_args()
+
+    retailers = args.retailers or list(RETAILERS)
+    for nombre in retailers:
+        if nombre not in RETAILERS:
+            parser.error(f"Retailer desconocido: {nombre}")
+
+    for valor in args.paginas:
+        nombre, _, numero = valor.partition("=")
+        if nombre not in RETAILERS_CONCURRENTES or not numero.isdigit():
+            parser.error(f"Valor inválido para --paginas: {valor}")
+        LIMITES_CONCURRENCIA[nombre] = max(1, int(numero))
+
+    # Antes del supervisor: los procesos hijos heredan el plazo
+    iniciar_plazo(retailers, args.presupuesto)
+
+    if args.procesos != 1:
+        # Con varios procesos --paginas indica las páginas de detalle de cada proceso
+        sys.exit(supervisar(retailers, args.procesos or None, dict(LIMITES_CONCURRENCIA)))
+    sys.exit(asyncio.run(orquestar(retailers)))
+
+
+if __name__ == "__main__":
+    main()
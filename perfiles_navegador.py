@@ -0,0 +1,95 @@
+import json
+import os
+
+# Perfiles persistentes de Chromium y sesiones guardadas por retailer.
+# Se guardan en data/ (montado como volumen en Docker) para sobrevivir entre ejecuciones.
+#   - Perfil persistente (opcional, PERFIL_PERSISTENTE=1): user_data_dir con caché HTTP en disco,
+#     los bundles JS/CSS estáticos no se vuelven a descargar en cada ejecución.
+#   - Sesión guardada (storage_state): cookies y localStorage, p. ej. el consentimiento de cookies.
+PERFIL_PERSISTENTE = os.environ.get("PERFIL_PERSISTENTE", "0") == "1"
+GUARDAR_SESION = True
+DIRECTORIO_PERFILES = os.path.join("data", "perfiles")
+DIRECTORIO_SESIONES = os.path.join("data", "sesiones")
+TAMANO_MAXIMO_PERFIL_MB = 300
+
+# Subdirectorios del perfil que son caché y se pueden recortar sin perder la sesión
+DIRECTORIOS_CACHE = ["Cache", "Code Cache", "GPUCache", os.path.join("Service Worker", "CacheStorage")]
+
+
+def ruta_perfil(retailer: str) -> str:
+    ruta = os.path.join(DIRECTORIO_PERFILES, retailer)
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def ruta_sesion(retailer: str) -> str:
+    return os.path.join(DIRECTORIO_SESIONES, f"{retailer}.json")
+
+
+def sesion_guardada(retailer: str):
+    """Ruta del storage_state guardado del retailer, o None si no hay"""
+    ruta = ruta_sesion(retailer)
+    return ruta if GUARDAR_SESION and os.path.exists(ruta) else None
+
+
+async def guardar_sesion(context, retailer: str):
+    """Guarda cookies y localStorage del contexto (escritura atómica: otro contexto o proceso puede estar leyéndola)"""
+    if not GUARDAR_SESION:
+        return
+    try:
+        estado = await context.storage_state()
+        os.makedirs(DIRECTORIO_SESIONES, exist_ok=True)
+        ruta = ruta_sesion(retailer)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(temporal, ruta)
+    except Exception as e:
+        print(f"[PERFIL] No se pudo guardar la sesión de {retailer}: {e}")
+
+
+def _archivos_cache(ruta_perfil_retailer: str):
+    archivos = []
+    for raiz, _, nombres in os.walk(ruta_perfil_retailer):
+        relativa = os.path.relpath(raiz, ruta_perfil_retailer)
+        if not any(directorio in relativa for directorio in DIRECTORIOS_CACHE):
+            continue
+        for nombre in nombres:
+            ruta = os.path.join(raiz, nombre)
+            try:
+                info = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, ruta))
+    return archivos
+
+
+def tamano_directorio(ruta: str) -> int:
+    total = 0
+    for raiz, _, nombres in os.walk(ruta):
+        for nombre in nombres:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nombre))
+            except OSError:
+                continue
+    return total
+
+
+def recortar_perfil(retailer: str):
+    """Mantiene el perfil bajo TAMANO_MAXIMO_PERFIL_MB borrando primero los archivos de caché más antiguos"""
+    ruta = ruta_perfil(retailer)
+    limite = TAMANO_MAXIMO_PERFIL_MB * 1024 * 1024
+    tamano = tamano_directorio(ruta)
+    if tamano <= limite:
+        return
+    liberado = 0
+    for _, tamano_archivo, archivo in sorted(_archivos_cache(ruta)):
+        if tamano - liberado <= limite:
+            break
+        try:
+            os.remove(archivo)
+            liberado += tamano_archivo
+        except OSError:
+            continue
+    print(f"[PERFIL] {retailer}: perfil de {tamano / (1024 * 1024):.0f} MB, "
+          f"liberados {liberado / (1024 * 1024):.0f} MB de caché")
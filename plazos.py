@@ -0,0 +1,161 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from tiempos_carga import percentiles, anotar_duracion, MIN_MUESTRAS
+
+# Presupuesto de tiempo de la ejecución: el hueco de cron es fijo, pero la duración depende de
+# cuántos timeouts haya. Con PRESUPUESTO_MINUTOS (o --presupuesto en el orquestador) cada retailer
+# tiene un límite para empezar trabajo nuevo; lo que no cabe se anota en el reporte del plazo en
+# lugar de alargar la ejecución, y los archivos se guardan con lo que sí se hizo.
+# - Los últimos RESERVA_CIERRE_SEGUNDOS quedan para guardar los Excel y cerrar los navegadores.
+# - Cuotas relativas: el retailer con mayor cuota entre los ejecutados dispone de todo el plazo y
+#   los demás de la parte proporcional, así uno lleno de timeouts no acapara el pool hasta el final.
+# - Prioridad por valor: en la última fracción de su plazo un retailer deja de empezar primero
+#   variaciones y después productos (si su duración p95 ya no cabe); los listados pueden empezar
+#   hasta el límite del retailer, la reserva de cierre cubre lo que tarden.
+# - La duración de una tarea se mide de principio a fin con medir_tarea (carga, clics, esperas del
+#   control de ritmo, variaciones...) y se guarda como "<retailer>/<tipo>/tarea" en la ventana de
+#   latencias; el tiempo de carga de la página solo es una parte.
+# El plazo pasa a los procesos hijos del supervisor por la variable de entorno PLAZO_EJECUCION.
+PRESUPUESTO_MINUTOS = float(os.environ.get("PRESUPUESTO_MINUTOS", "0"))  # 0 = sin límite
+RESERVA_CIERRE_SEGUNDOS = 90
+CUOTAS_RETAILER = {"mercadolibre": 1.0, "falabella": 0.8, "exito": 0.6, "ktronix": 0.6}
+RESERVA_PRIORIDAD = {"producto": 0.1, "variacion": 0.25}  # fracción del plazo del retailer
+DURACION_INICIAL = {"producto": 20.0, "variacion": 20.0}  # segundos, sin duraciones medidas
+PLURALES = {"listado": "listados", "producto": "productos", "variacion": "variaciones"}
+DIRECTORIO_LOGS = "logs"
+VARIABLE_PLAZO = "PLAZO_EJECUCION"
+
+_plazo = {"inicio": None, "fin": None, "limites": {}, "minutos": None}
+_omitidos = []  # [{"retailer", "tipo", "objetivo", "momento"}] en orden
+_claves_omitidas = set()
+_estado = {"archivo": None, "avisados": set()}
+
+
+def iniciar_plazo(retailers: list, minutos: float = None):
+    """Fija el plazo de la ejecución y el límite de cada retailer (sin presupuesto no hace nada)"""
+    minutos = PRESUPUESTO_MINUTOS if minutos is None else minutos
+    if not minutos or minutos <= 0:
+        return
+    inicio = time.time()
+    fin = inicio + minutos * 60
+    trabajo = max(0.0, fin - RESERVA_CIERRE_SEGUNDOS - inicio)
+    cuota_maxima = max(CUOTAS_RETAILER.get(retailer, 1.0) for retailer in retailers)
+    limites = {retailer: inicio + trabajo * CUOTAS_RETAILER.get(retailer, 1.0) / cuota_maxima
+               for retailer in retailers}
+    _plazo.update({"inicio": inicio, "fin": fin, "limites": limites, "minutos": minutos})
+    os.environ[VARIABLE_PLAZO] = json.dumps(_plazo)
+    print(f"[PLAZO] Presupuesto {minutos:g} min, cierre a las {datetime.fromtimestamp(fin).strftime('%H:%M:%S')} "
+          f"({RESERVA_CIERRE_SEGUNDOS}s reservados para guardar)")
+    for retailer, limite in limites.items():
+        print(f"[PLAZO]   {retailer}: trabajo nuevo hasta las {datetime.fromtimestamp(limite).strftime('%H:%M:%S')}")
+
+
+def _cargar_plazo() -> bool:
+    if _plazo["inicio"] is None and os.environ.get(VARIABLE_PLAZO):
+        # Proceso hijo: hereda el plazo del proceso que lo lanzó
+        _plazo.update(json.loads(os.environ[VARIABLE_PLAZO]))
+    return _plazo["inicio"] is not None
+
+
+def _clave_tarea(retailer: str, tipo: str) -> str:
+    return f"{retailer}/{tipo}/tarea"
+
+
+def _duracion_estimada(retailer: str, tipo: str) -> float:
+    estadisticas = percentiles(_clave_tarea(retailer, tipo))
+    if not estadisticas or estadisticas["muestras"] < MIN_MUESTRAS:
+        return DURACION_INICIAL[tipo]
+    return estadisticas["p95"]
+
+
+@contextmanager
+def medir_tarea(retailer: str, tipo: str):
+    """Mide la duración completa de una tarea empezada (también si falla) para estimar las siguientes"""
+    inicio = time.monotonic()
+    try:
+        yield
+    finally:
+        anotar_duracion(_clave_tarea(retailer, tipo), time.monotonic() - inicio)
+
+
+def puede_empezar(retailer: str, tipo: str, objetivo: str) -> bool:
+    """True si queda tiempo para empezar una tarea ("listado", "producto" o "variacion") del retailer.
+
+    Si no queda, la anota como omitida (objetivo: dispositivo o URL) y devuelve False.
+    """
+    if not _cargar_plazo():
+        return True
+    limite = _plazo["limites"].get(retailer, _plazo["fin"] - RESERVA_CIERRE_SEGUNDOS)
+    restante = limite - time.time()
+    if tipo == "listado":
+        if restante > 0:
+            return True
+    elif restante - RESERVA_PRIORIDAD[tipo] * (limite - _plazo["inicio"]) >= _duracion_estimada(retailer, tipo):
+        return True
+    if (retailer, tipo) not in _estado["avisados"]:
+        _estado["avisados"].add((retailer, tipo))
+        print(f"[PLAZO] {retailer}: sin tiempo para empezar {PLURALES[tipo]}, se omiten desde ahora")
+    _anotar_omitido({"retailer": retailer, "tipo": tipo, "objetivo": objetivo,
+                     "momento": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+    return False
+
+
+def _anotar_omitido(omitido: dict):
+    clave = (omitido["retailer"], omitido["tipo"], omitido["objetivo"])
+    if clave not in _claves_omitidas:
+        _claves_omitidas.add(clave)
+        _omitidos.append(omitido)
+
+
+def tomar_omitidos() -> list:
+    """Devuelve y vacía las omisiones de este proceso (el supervisor las junta en el padre)"""
+    omitidos = list(_omitidos)
+    _omitidos.clear()
+    return omitidos
+
+
+def agregar_omitidos(omitidos: list):
+    for omitido in omitidos:
+        _anotar_omitido(omitido)
+
+
+def resumen_omitidos() -> dict:
+    """{retailer: {tipo: número de tareas omitidas}}"""
+    resumen = {}
+    for omitido in _omitidos:
+        por_tipo = resumen.setdefault(omitido["retailer"], {})
+        por_tipo[omitido["tipo"]] = por_tipo.get(omitido["tipo"], 0) + 1
+    return resumen
+
+
+def guardar_reporte_plazo():
+    """Escribe el reporte del plazo (límites y todo lo omitido) en logs/ y devuelve su ruta"""
+    if not _cargar_plazo() and not _omitidos:
+        return None
+    if _estado["archivo"] is None:
+        os.makedirs(DIRECTORIO_LOGS, exist_ok=True)
+        _estado["archivo"] = os.path.join(
+            DIRECTORIO_LOGS, f"plazo_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.json")
+    reporte = {
+        "presupuesto_minutos": _plazo["minutos"],
+        "fin": datetime.fromtimestamp(_plazo["fin"]).isoformat(timespec="seconds") if _plazo["fin"] else None,
+        "limites": {retailer: datetime.fromtimestamp(limite).isoformat(timespec="seconds")
+                    for retailer, limite in _plazo["limites"].items()},
+        "omitidos_por_retailer": resumen_omitidos(),
+        "omitidos": _omitidos,
+    }
+    try:
+        with open(_estado["archivo"], "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"[PLAZO] No se pudo guardar el reporte: {e}")
+        return None
+    for retailer, por_tipo in reporte["omitidos_por_retailer"].items():
+        print(f"[PLAZO] {retailer}: omitidos por plazo "
+              + ", ".join(f"{numero} {PLURALES[tipo]}" for tipo, numero in por_tipo.items()))
+    print(f"[PLAZO] Reporte del plazo: {_estado['archivo']}")
+    return _estado["archivo"]
@@ -0,0 +1,393 @@
+import asyncio
+import os
+from playwright.async_api import async_playwright
+from bloqueo_recursos import activar_bloqueo, activar_bloqueo_con_cache, imprimir_resumen_bloqueo
+from memoria_navegador import iniciar_vigilancia, detener_vigilancia, motivo_reciclaje, registrar_reciclaje, olvidar_pagina
+from dimensionamiento import calcular_dimensionamiento
+from selectores_aprendidos import guardar_selectores
+from tiempos_carga import imprimir_resumen_tiempos, guardar_latencias
+from control_tasa import imprimir_resumen_circuitos
+from perfiles_navegador import PERFIL_PERSISTENTE, ruta_perfil, recortar_perfil, sesion_guardada, guardar_sesion
+
+# Configuración del pool de navegadores
+NUM_NAVEGADORES = None  # Instancias de Chromium compartidas; None = según las CPUs del contenedor
+TIMEOUT_SALUD = 5000  # milisegundos para la verificación de salud de un contexto
+ARGS_CHROMIUM = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor,TranslateUI',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-extensions',
+    '--disable-sync',
+    '--disable-default-apps',
+    '--disable-background-networking',
+    '--disable-domain-reliability',
+]
+
+# Estado del pool (uno por proceso)
+_pool = {
+    "playwright": None,
+    "navegadores": [],
+    "siguiente": 0,
+    "usuarios": 0,
+    "persistentes": {},  # retailer -> {"context": ..., "usuarios": n} con PERFIL_PERSISTENTE
+}
+_opciones_contextos = {}  # context -> (retailer, opciones) para poder reemplazarlo
+_sesiones_restauradas = set()  # contextos que arrancaron con cookies/perfil de una ejecución anterior
+_lock = None
+
+
+def _obtener_lock():
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+def _contar_paginas() -> int:
+    return sum(len(context.pages) for context in list(_opciones_contextos))
+
+
+async def _lanzar_navegador():
+    return await _pool["playwright"].chromium.launch(headless=True, args=ARGS_CHROMIUM)
+
+
+async def iniciar_pool(num_navegadores: int = None):
+    """Inicia el driver de Playwright y lanza los navegadores una sola vez por ejecución.
+
+    Cada scraper llama a iniciar_pool/cerrar_pool; el pool solo se cierra cuando
+    el último usuario lo libera, de modo que varios scrapers lo pueden compartir.
+    """
+    async with _obtener_lock():
+        _pool["usuarios"] += 1
+        if _pool["playwright"] is not None:
+            return
+        num_navegadores = num_navegadores or NUM_NAVEGADORES or calcular_dimensionamiento([])["navegadores"]
+        if PERFIL_PERSISTENTE:
+            # Cada retailer lanza su propio Chromium con su user_data_dir
+            num_navegadores = 0
+        print(f"[POOL] Lanzando {num_navegadores} instancias de Chromium...")
+        _pool["playwright"] = await async_playwright().start()
+        for _ in range(num_navegadores):
+            _pool["navegadores"].append(await _lanzar_navegador())
+        print(f"[POOL] Pool de navegadores listo")
+        iniciar_vigilancia(contar_paginas=_contar_paginas)
+
+
+async def cerrar_pool():
+    """Libera el pool; cierra navegadores y driver cuando no quedan usuarios."""
+    async with _obtener_lock():
+        _pool["usuarios"] = max(0, _pool["usuarios"] - 1)
+        if _pool["usuarios"] > 0 or _pool["playwright"] is None:
+            return
+        for retailer in list(_pool["persistentes"]):
+            await _cerrar_persistente(retailer)
+        for navegador in _pool["navegadores"]:
+            try:
+                await navegador.close()
+            except Exception:
+                pass
+        try:
+            await _pool["playwright"].stop()
+        except Exception:
+            pass
+        _pool["navegadores"] = []
+        _pool["playwright"] = None
+        _pool["siguiente"] = 0
+        print("[POOL] Pool de navegadores cerrado")
+        await detener_vigilancia()
+        imprimir_resumen_bloqueo()
+        guardar_selectores()
+        imprimir_resumen_tiempos()
+        guardar_latencias()
+        imprimir_resumen_circuitos()
+
+
+async def _obtener_navegador():
+    """Devuelve el siguiente navegador del pool (round robin), relanzándolo solo si se desconectó."""
+    if _pool["playwright"] is None:
+        raise RuntimeError("El pool de navegadores no está iniciado (llamar a iniciar_pool)")
+    async with _obtener_lock():
+        indice = _pool["siguiente"] % len(_pool["navegadores"])
+        _pool["siguiente"] += 1
+        navegador = _pool["navegadores"][indice]
+        if not navegador.is_connected():
+            print(f"[POOL] Navegador {indice} desconectado, relanzando...")
+            navegador = await _lanzar_navegador()
+            _pool["navegadores"][indice] = navegador
+        return navegador
+
+
+async def nuevo_contexto(retailer: str, **opciones):
+    """Crea un BrowserContext aislado para un retailer o dispositivo.
+
+    Las opciones se pasan tal cual a browser.new_context (user_agent, viewport, locale...).
+    Si hay una sesión guardada del retailer se carga como storage_state. Con
+    PERFIL_PERSISTENTE todos los dispositivos del retailer comparten un contexto
+    persistente (user_data_dir con caché en disco).
+    """
+    if PERFIL_PERSISTENTE:
+        return await _contexto_persistente(retailer, opciones)
+    navegador = await _obtener_navegador()
+    opciones_contexto = dict(opciones)
+    sesion = sesion_guardada(retailer)
+    if sesion and "storage_state" not in opciones_contexto:
+        opciones_contexto["storage_state"] = sesion
+    context = await navegador.new_context(**opciones_contexto)
+    # Abortar imágenes, fuentes, media y rastreadores en todas las páginas del contexto
+    await activar_bloqueo(context, retailer)
+    _opciones_contextos[context] = (retailer, opciones)
+    if sesion:
+        _sesiones_restauradas.add(context)
+    return context
+
+
+async def _contexto_persistente(retailer: str, opciones: dict):
+    async with _obtener_lock():
+        persistente = _pool["persistentes"].get(retailer)
+        if persistente is None:
+            if _pool["playwright"] is None:
+                raise RuntimeError("El pool de navegadores no está iniciado (llamar a iniciar_pool)")
+            recortar_perfil(retailer)
+            ruta = ruta_perfil(retailer)
+            perfil_existente = bool(os.listdir(ruta))
+            print(f"[POOL] Abriendo perfil persistente de {retailer} ({ruta})")
+            context = await _pool["playwright"].chromium.launch_persistent_context(
+                ruta, headless=True, args=ARGS_CHROMIUM, **opciones
+            )
+            # route desactivaría la caché HTTP del perfil: se bloquea vía CDP
+            await activar_bloqueo_con_cache(context, retailer)
+            _opciones_contextos[context] = (retailer, opciones)
+            if perfil_existente:
+                _sesiones_restauradas.add(context)
+            persistente = {"context": context, "usuarios": 0}
+            _pool["persistentes"][retailer] = persistente
+        persistente["usuarios"] += 1
+        return persistente["context"]
+
+
+async def _cerrar_persistente(retailer: str):
+    persistente = _pool["persistentes"].pop(retailer, None)
+    if not persistente:
+        return
+    context = persistente["context"]
+    _opciones_contextos.pop(context, None)
+    _sesiones_restauradas.discard(context)
+    try:
+        await context.close()
+    except Exception:
+        pass
+    recortar_perfil(retailer)
+
+
+def _es_persistente(context) -> bool:
+    return any(p["context"] is context for p in _pool["persistentes"].values())
+
+
+def sesion_restaurada(context) -> bool:
+    """True si el contexto arrancó con la sesión o el perfil de una ejecución anterior (p. ej. cookies aceptadas)"""
+    return context in _sesiones_restauradas
+
+
+async def contexto_saludable(context) -> bool:
+    """Comprueba que el contexto y su navegador siguen respondiendo."""
+    try:
+        # Los contextos persistentes no tienen un Browser asociado
+        if context.browser is not None and not context.browser.is_connected():
+            return False
+        if context.pages:
+            await asyncio.wait_for(context.pages[0].evaluate("1"), timeout=TIMEOUT_SALUD / 1000)
+        else:
+            page = await asyncio.wait_for(context.new_page(), timeout=TIMEOUT_SALUD / 1000)
+            await page.close()
+        return True
+    except Exception:
+        return False
+
+
+async def cerrar_contexto(context):
+    """Cierra un contexto ignorando errores (el navegador sigue vivo en el pool).
+
+    Antes de cerrarlo guarda su sesión para la siguiente ejecución. Un contexto
+    persistente no se cierra: solo se liberan sus páginas hasta cerrar_pool.
+    """
+    if not context:
+        return
+    if _es_persistente(context):
+        retailer, _ = _opciones_contextos[context]
+        persistente = _pool["persistentes"][retailer]
+        persistente["usuarios"] = max(0, persistente["usuarios"] - 1)
+        if persistente["usuarios"] == 0:
+            for page in list(context.pages):
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+        return
+    retailer, _ = _opciones_contextos.pop(context, (None, None))
+    _sesiones_restauradas.discard(context)
+    if retailer:
+        await guardar_sesion(context, retailer)
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+
+async def reemplazar_contexto(context):
+    """Sustituye un contexto roto por uno nuevo con las mismas opciones, sin tocar el navegador."""
+    retailer, opciones = _opciones_contextos[context]
+    print(f"[POOL] Reemplazando contexto de {retailer}")
+    if _es_persistente(context):
+        async with _obtener_lock():
+            await _cerrar_persistente(retailer)
+        return await nuevo_contexto(retailer, **opciones)
+    await cerrar_contexto(context)
+    return await nuevo_contexto(retailer, **opciones)
+
+
+async def obtener_contexto_saludable(context):
+    """Devuelve el mismo contexto si pasa la verificación de salud, o uno reemplazado si no."""
+    if await contexto_saludable(context):
+        return context
+    return await reemplazar_contexto(context)
+
+
+async def _cerrar_pagina(page):
+    olvidar_pagina(page)
+    try:
+        await page.close()
+    except Exception:
+        pass
+
+
+async def reciclar_pagina(page, motivo: str):
+    """Cierra la página (libera su renderer) y abre otra en el mismo contexto."""
+    registrar_reciclaje("página", motivo)
+    context = page.context
+    await _cerrar_pagina(page)
+    return await context.new_page()
+
+
+async def reciclar_contexto(context, page, motivo: str):
+    """Sustituye página y contexto por unos nuevos con las mismas opciones; devuelve (context, page)."""
+    registrar_reciclaje("contexto", motivo)
+    await _cerrar_pagina(page)
+    context = await reemplazar_contexto(context)
+    return context, await context.new_page()
+
+
+async def reciclar_si_hace_falta(context, page):
+    """Recicla el contexto de un flujo de una sola página si superó el umbral de memoria o de navegaciones."""
+    motivo = motivo_reciclaje(page)
+    if not motivo:
+        return context, page
+    return await reciclar_contexto(context, page, motivo)
+
+
+async def procesar_en_paginas(context, elementos, procesar, num_paginas: int, en_error=None, bajo_demanda: bool = False):
+    """Procesa elementos con un pool acotado de páginas del mismo contexto.
+
+    Cada uno de los num_paginas trabajadores toma elementos de una asyncio.Queue y llama
+    a procesar(page, elemento). Los resultados se devuelven en el orden de entrada.
+    Con bajo_demanda=True se llama a procesar(obtener_pagina, elemento) y la página del
+    trabajador solo se abre cuando un elemento hace await obtener_pagina() (p. ej. al
+    escalar desde un camino HTTP); si ninguno lo necesita no se abre ninguna.
+    Una página que supera el umbral de memoria o de navegaciones se recicla entre elementos.
+    Si procesar lanza una excepción, se usa en_error(elemento, excepcion) como resultado.
+    """
+    resultados = [None] * len(elementos)
+    if not elementos:
+        return resultados
+    
+    cola = asyncio.Queue()
+    for indice, elemento in enumerate(elementos):
+        cola.put_nowait((indice, elemento))
+    
+    async def trabajador():
+        estado = {"page": None if bajo_demanda else await context.new_page()}
+        
+        async def obtener_pagina():
+            if estado["page"] is None:
+                estado["page"] = await context.new_page()
+            return estado["page"]
+        
+        try:
+            while True:
+                try:
+                    indice, elemento = cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    resultados[indice] = await procesar(obtener_pagina if bajo_demanda else estado["page"], elemento)
+                except Exception as e:
+                    resultados[indice] = en_error(elemento, e) if en_error else elemento
+                # La cola sigue igual: la página nueva continúa con el siguiente elemento
+                if estado["page"] is None:
+                    continue
+                motivo = motivo_reciclaje(estado["page"])
+                if motivo:
+                    estado["page"] = await reciclar_pagina(estado["page"], motivo)
+        finally:
+            if estado["page"] is not None:
+                await _cerrar_pagina(estado["page"])
+    
+    num_paginas = max(1, min(num_paginas, len(elementos)))
+    await asyncio.gather(*(trabajador() for _ in range(num_paginas)))
+    return resultados
+
+
+async def paginar_listado(page, urls: list, cargar, num_paginas: int):
+    """Carga las páginas de un listado con varias páginas concurrentes del contexto de page.
+
+    urls: URL de cada página del listado en orden. La primera se carga en page y, si trae
+    resultados, las siguientes se reparten entre num_paginas páginas nuevas del mismo contexto
+    (el ritmo por dominio lo sigue imponiendo control_tasa.navegar).
+    cargar(page, numero, url) devuelve (productos, es_ultima). Con un listado vacío o marcado como
+    último no se lanzan páginas posteriores y se descartan las que ya estaban en curso.
+    Devuelve los productos concatenados en orden de página.
+    """
+    resultados = {}
+    fin = {"pagina": len(urls) + 1}  # primera página que ya no forma parte del listado
+
+    async def cargar_pagina(pagina_trabajo, numero):
+        try:
+            productos, es_ultima = await cargar(pagina_trabajo, numero, urls[numero - 1])
+        except Exception as e:
+            print(f"    ❌ Error en página {numero} del listado: {e}")
+            productos, es_ultima = [], True
+        resultados[numero] = productos
+        if not productos:
+            fin["pagina"] = min(fin["pagina"], numero)
+        elif es_ultima:
+            fin["pagina"] = min(fin["pagina"], numero + 1)
+
+    await cargar_pagina(page, 1)
+    pendientes = iter(range(2, len(urls) + 1))
+
+    async def trabajador():
+        pagina_trabajo = None
+        try:
+            for numero in pendientes:
+                if numero >= fin["pagina"]:
+                    return
+                if pagina_trabajo is None:
+                    pagina_trabajo = await page.context.new_page()
+                await cargar_pagina(pagina_trabajo, numero)
+        finally:
+            if pagina_trabajo is not None:
+                await _cerrar_pagina(pagina_trabajo)
+
+    if fin["pagina"] > 2:
+        num_paginas = max(1, min(num_paginas, len(urls) - 1))
+        await asyncio.gather(*(trabajador() for _ in range(num_paginas)))
+
+    productos = []
+    for numero in range(1, fin["pagina"]):
+        productos.extend(resultados.get(numero, []))
+    return productos
@@ -154,20 +154,12 @@ PY
   set -e
 fi
 
-# 6) Ejecutar scrapers (Éxito y Falabella)
-run_scraper() {
-  local name="$1"
-  local script="$2"
-  echo -e "${B}==> [$(date '+%H:%M:%S')] Ejecutando scraper ${name}${NC}"
-  $(command -v python || command -v python3) "$script" || {
-    echo -e "${R}Scraper ${name} falló, continuando con el pipeline...${NC}"
-  }
-  echo -e "${G}OK${NC} Scraper ${name} finalizado"
+# 6) Ejecutar scrapers (Ktronix, Falabella y Éxito en paralelo en un solo proceso)
+echo -e "${B}==> [$(date '+%H:%M:%S')] Ejecutando scrapers en paralelo (orquestador)${NC}"
+$(command -v python || command -v python3) "orquestador.py" ktronix falabella exito || {
+  echo -e "${R}Uno o más scrapers fallaron, continuando con el pipeline...${NC}"
 }
-
-run_scraper "Ktronix" "scraper_ktronix.py"
-run_scraper "Falabella" "scraper_falabella.py"
-run_scraper "Éxito" "scraper_exito.py"
+echo -e "${G}OK${NC} Scrapers finalizados"
 
 # 7) Verificación y limpieza de productos
 # Este script genera archivos en carpeta data: *_limpio.xlsx e *_invalidos.xlsx
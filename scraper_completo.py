@@ -4,9 +4,15 @@ import pandas as pd
 import time
 import random
 from datetime import datetime
-from playwright.async_api import async_playwright
+from frontera import cargar_frontera, visto, visto_antes, marcar, guardar_frontera
+from bitacora import abrir_bitacora, anotar, cerrar_bitacora, leer_bitacora, ultima_sin_terminar
+from pool_navegadores import iniciar_pool, cerrar_pool, nuevo_contexto, obtener_contexto_saludable, cerrar_contexto, reciclar_si_hace_falta, paginar_listado
 from typing import List, Dict, Optional
-from config import DISPOSITIVOS, CONDICIONES, MAX_PAGINAS, USER_AGENT, VIEWPORT_WIDTH, VIEWPORT_HEIGHT, TIMEOUT_PRODUCTOS, DELAY_ENTRE_BUSQUEDAS
+from control_tasa import esperar_reintento
+from plazos import puede_empezar, medir_tarea
+from tiempos_carga import cargar_con_reintentos
+from extraccion import extraer_tarjetas, campo, extraer_detalle, mapear_filas, a_entero, porcentaje, leer_json_embebido, pulsar_y_esperar
+from config import DISPOSITIVOS, CONDICIONES, MAX_PAGINAS, USER_AGENT, VIEWPORT_WIDTH, VIEWPORT_HEIGHT
 
 # Lista de user-agents de escritorio populares
 USER_AGENTS = [
@@ -17,6 +23,61 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.4 Safari/605.1.15"
 ]
 
+# Selectores del listado de MercadoLibre
+MERCADOLIBRE_CONFIG = {
+    "listing": {
+        "container": "div.poly-card",
+        "title": "a.poly-component__title",
+        "price": "span.andes-money-amount__fraction",
+        "rating": "span.poly-reviews__rating"
+    },
+    "product_page": {
+        "title": "h1.ui-pdp-title",
+        # Precio actual (con descuento si existe) en la segunda línea; fallbacks al precio principal
+        "price_current": [
+            "div.ui-pdp-price__second-line span.andes-money-amount__fraction",
+            "span.andes-money-amount__fraction[style*='font-size:36']",
+            "span.andes-money-amount__fraction"
+        ],
+        "price_original": "s.andes-money-amount__fraction",
+        "discount": "span.andes-money-amount__discount",
+        "rating": "span.ui-pdp-review__rating",
+        "specs_button": 'button[data-testid="action-collapsable-target"]',
+        "specs_row": "tr.andes-table__row",
+        "spec_name": "th .andes-table__header__container",
+        "spec_value": "td .andes-table__column--value",
+        "seller": "h2.ui-seller-data-header__title",
+        "seller_products": ".ui-seller-data-header__products",
+        "seller_status": ".ui-seller-data-status__default-info"
+    }
+}
+
+# Marcadores de página de producto lista para extraer: título o precio actual
+MARCADORES_PRODUCTO = [MERCADOLIBRE_CONFIG["product_page"]["title"]] + MERCADOLIBRE_CONFIG["product_page"]["price_current"]
+
+# Encabezado de la tabla de especificaciones -> campo del producto
+REGLAS_ESPECIFICACIONES_MERCADOLIBRE = [
+    (("Memoria interna",), 'memoria_interna'),
+    (("Memoria RAM",), 'memoria_ram'),
+    (("Capacidad máxima de la tarjeta de memoria",), 'capacidad_maxima_tarjeta'),
+    (("Con ranura para tarjeta de memoria",), 'ranura_tarjeta_memoria'),
+    (("Color",), 'color'),
+]
+
+# Límites para controlar memoria y tiempo (productos por búsqueda y variaciones por ejecución)
+MAX_PRODUCTOS_TOTAL = 15
+MAX_VARIACIONES_TOTAL = 200
+PAGINAS_LISTADO = 2  # Páginas del listado cargadas a la vez cuando MAX_PAGINAS > 1
+TIMEOUT_CARGA_INICIAL = 90000  # Timeout de carga sin latencias observadas; con ellas, p95 y p99 en el reintento
+INTENTOS_CARGA = 2  # Cada intento espera su turno en el ritmo del dominio (lento en MercadoLibre)
+TIMEOUT_CARACTERISTICAS = 6000  # Máximo para que se despliegue la tabla de características tras el clic
+TIMEOUT_VARIACIONES = 3000  # Máximo para que aparezca el selector de variaciones
+
+# Campos del detalle que se copian al producto según lo que se haya abierto en la página
+CAMPOS_PRECIO = ('precio_actual', 'precio_original', 'porcentaje_descuento')
+CAMPOS_MEMORIA = ('memoria_interna', 'memoria_ram', 'capacidad_maxima_tarjeta', 'ranura_tarjeta_memoria', 'color')
+CAMPOS_VENDEDOR = ('vendedor', 'productos_vendedor', 'evaluacion_vendedor')
+
 def get_url_mercadolibre(dispositivo_formateado, condicion):
     base = f"https://listado.mercadolibre.com.co/celulares-telefonos/celulares-smartphones/samsung/{condicion}/5g/{dispositivo_formateado}_NoIndex_True"
     if condicion == "nuevo":
@@ -65,7 +126,7 @@ def extraer_id_producto(url: str) -> Optional[str]:
     return None
 
 
-def guardar_archivo_dispositivo(dispositivo: str, productos: list, fecha_scraping: str, es_backup: bool = False):
+def guardar_archivo_dispositivo(dispositivo: str, productos: list, fecha_scraping: str):
     """Guarda un archivo Excel por dispositivo"""
     if not productos:
         print(f"    ⚠️ No hay productos para guardar del dispositivo {dispositivo}")
@@ -75,16 +136,7 @@ def guardar_archivo_dispositivo(dispositivo: str, productos: list, fecha_scrapin
         # Crear nombre de archivo seguro
         nombre_dispositivo = dispositivo.replace(" ", "_").replace("/", "_").lower()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        if es_backup:
-            # Para backups: crear carpeta backup si no existe
-            import os
-            if not os.path.exists("backup"):
-                os.makedirs("backup")
-            nombre_archivo = f"backup/backup_{nombre_dispositivo}_{timestamp}.xlsx"
-        else:
-            # Para archivos normales: carpeta principal
-            nombre_archivo = f"resultados_{nombre_dispositivo}_{timestamp}.xlsx"
+        nombre_archivo = f"resultados_{nombre_dispositivo}_{timestamp}.xlsx"
         
         # Crear DataFrame y guardar
         df = pd.DataFrame(productos)
@@ -98,58 +150,97 @@ def guardar_archivo_dispositivo(dispositivo: str, productos: list, fecha_scrapin
         return None
 
 
-async def extraer_precios_producto(page) -> Dict:
+async def extraer_datos_producto(page) -> Dict:
     """
-    Extrae precios del producto, manejando descuentos
+    Extrae precios (manejando descuentos), tabla de especificaciones y vendedor
+    en un solo page.evaluate
     """
-    precios = {
-        'precio_actual': None,
-        'precio_original': None,
-        'porcentaje_descuento': None
+    pagina = MERCADOLIBRE_CONFIG["product_page"]
+    textos, filas = await extraer_detalle(page, {
+        "nombre": pagina["title"],
+        "precio_actual": pagina["price_current"],
+        "precio_original": pagina["price_original"],
+        "descuento": pagina["discount"],
+        "calificacion": pagina["rating"],
+        "vendedor": pagina["seller"],
+        "productos_vendedor": pagina["seller_products"],
+        "evaluacion_vendedor": pagina["seller_status"],
+    }, tabla={
+        "filas": pagina["specs_row"],
+        "nombre": pagina["spec_name"],
+        "valor": pagina["spec_value"],
+    })
+    
+    datos = {
+        'nombre': textos["nombre"],
+        'precio_actual': a_entero(textos["precio_actual"]),
+        'precio_original': a_entero(textos["precio_original"]),
+        'porcentaje_descuento': porcentaje(textos["descuento"]),
+        'calificacion': None,
+        'memoria_interna': None,
+        'memoria_ram': None,
+        'capacidad_maxima_tarjeta': None,
+        'ranura_tarjeta_memoria': None,
+        'color': None,
+        'vendedor': None,
+        'productos_vendedor': textos["productos_vendedor"],
+        'evaluacion_vendedor': textos["evaluacion_vendedor"]
     }
+    if textos["calificacion"]:
+        match = re.search(r'(\d+[,.]?\d*)', textos["calificacion"])
+        if match:
+            datos['calificacion'] = float(match.group(1).replace(',', '.'))
+    if textos["vendedor"]:
+        datos['vendedor'] = textos["vendedor"].replace("Vendido por ", "").strip()
     
-    try:
-        # Buscar precio actual (con descuento si existe) - buscar en la segunda línea
-        precio_actual_element = await page.query_selector('div.ui-pdp-price__second-line span.andes-money-amount__fraction')
-        if not precio_actual_element:
-            # Fallback: buscar cualquier precio principal
-            precio_actual_element = await page.query_selector('span.andes-money-amount__fraction[style*="font-size:36"]')
-        if not precio_actual_element:
-            precio_actual_element = await page.query_selector('span.andes-money-amount__fraction')
-        
-        if precio_actual_element:
-            precio_texto = await precio_actual_element.inner_text()
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            precios['precio_actual'] = int(precio_limpio) if precio_limpio else None
-        
-        # Buscar precio original (tachado) - buscar en el elemento <s>
-        precio_original_element = await page.query_selector('s.andes-money-amount__fraction')
-        if precio_original_element:
-            precio_texto = await precio_original_element.inner_text()
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            precios['precio_original'] = int(precio_limpio) if precio_limpio else None
-        
-        # Buscar porcentaje de descuento
-        descuento_element = await page.query_selector('span.andes-money-amount__discount')
-        if descuento_element:
-            descuento_texto = await descuento_element.inner_text()
-            match = re.search(r'(\d+)%', descuento_texto)
-            if match:
-                precios['porcentaje_descuento'] = int(match.group(1))
-        
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo precios: {str(e)}")
-    return precios
+    if filas:
+        print(f"        📋 Procesando {len(filas)} filas de especificaciones...")
+    datos.update(mapear_filas(filas, REGLAS_ESPECIFICACIONES_MERCADOLIBRE))
+    return datos
+
+def restaurar_desde_bitacora(entradas: list) -> dict:
+    """Reconstruye el estado de scrape_completo a partir de las entradas de su bitácora"""
+    estado = {
+        "fecha_scraping": None,
+        "todos_productos": [],
+        "todas_variaciones": [],
+        "productos_por_dispositivo": {dispositivo: [] for dispositivo in DISPOSITIVOS},
+        "busquedas": {},  # (dispositivo, condicion) -> productos del listado
+        "conteo_busquedas": {},  # (dispositivo, condicion) -> productos procesados
+        "productos_hechos": set(),  # URLs
+        "variaciones_hechas": set(),  # URLs
+    }
+    for entrada in entradas:
+        tipo = entrada["tipo"]
+        if tipo == "inicio":
+            estado["fecha_scraping"] = entrada["fecha_scraping"]
+        elif tipo == "busqueda":
+            estado["busquedas"][(entrada["dispositivo"], entrada["condicion"])] = entrada["productos"]
+        elif tipo == "producto":
+            busqueda = (entrada["dispositivo"], entrada["condicion"])
+            estado["conteo_busquedas"][busqueda] = estado["conteo_busquedas"].get(busqueda, 0) + 1
+            estado["productos_hechos"].add(entrada["url"])
+            estado["todos_productos"].append(entrada["registro"])
+            estado["todas_variaciones"].extend(entrada["variaciones"])
+            if not entrada.get("error"):
+                estado["productos_por_dispositivo"].setdefault(entrada["dispositivo"], []).append(entrada["registro"])
+        elif tipo == "variacion":
+            estado["variaciones_hechas"].add(entrada["url"])
+            estado["todos_productos"].append(entrada["registro"])
+    return estado
 
-async def scrape_completo():
+
+async def scrape_completo(reanudar=None):
     """
     Scraper completo que integra búsqueda inicial, detalles y variaciones
+
+    reanudar: RUN_ID de una ejecución anterior (o True para la última sin terminar) cuya
+    bitácora se usa para saltar búsquedas, productos y variaciones ya terminados.
     """
     
     todos_productos = []  # Array para productos principales
     todas_variaciones = []  # Array para almacenar todas las variaciones
-    productos_procesados = set()  # Para evitar duplicados
-    variaciones_recolectadas = set()  # Para evitar duplicados en recolección
+    variaciones_recolectadas = set()  # IDs de variaciones ya recolectadas (evita duplicados en recolección)
     total_busquedas = len(DISPOSITIVOS) * len(CONDICIONES)
     busqueda_actual = 0
     fecha_scraping = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -158,109 +249,103 @@ async def scrape_completo():
     productos_por_dispositivo = {}
     for dispositivo in DISPOSITIVOS:
         productos_por_dispositivo[dispositivo] = []
+    busquedas_guardadas = {}
+    conteo_busquedas = {}
+    productos_hechos = set()
+    variaciones_hechas = set()
+    
+    # Bitácora JSONL de la ejecución: cada producto/variación terminado queda anotado
+    run_id = ultima_sin_terminar("mercadolibre") if reanudar is True else reanudar
+    if reanudar and not run_id:
+        print("⚠️ No hay ninguna ejecución sin terminar para reanudar, empezando una nueva")
+    entradas = leer_bitacora("mercadolibre", run_id) if run_id else []
+    if entradas:
+        estado = restaurar_desde_bitacora(entradas)
+        fecha_scraping = estado["fecha_scraping"] or fecha_scraping
+        todos_productos = estado["todos_productos"]
+        todas_variaciones = estado["todas_variaciones"]
+        productos_por_dispositivo.update(estado["productos_por_dispositivo"])
+        busquedas_guardadas = estado["busquedas"]
+        conteo_busquedas = estado["conteo_busquedas"]
+        productos_hechos = estado["productos_hechos"]
+        variaciones_hechas = estado["variaciones_hechas"]
+        variaciones_recolectadas.update(extraer_id_producto(variacion['url']) for variacion in todas_variaciones)
+        print(f"♻️ Reanudando ejecución {run_id}: {len(productos_hechos)} productos, "
+              f"{len(variaciones_hechas)} variaciones y {len(busquedas_guardadas)} búsquedas ya hechas")
+    bitacora = abrir_bitacora("mercadolibre", run_id)
+    if not entradas:
+        anotar(bitacora, "inicio", run_id=bitacora["run_id"], fecha_scraping=fecha_scraping)
+    print(f"📒 Bitácora: {bitacora['ruta']}")
+    
+    # IDs ya visitados en esta ejecución o en las anteriores dentro de la ventana de frescura
+    frontera = cargar_frontera("mercadolibre")
+    for url in productos_hechos | variaciones_hechas:
+        marcar(frontera, extraer_id_producto(url))
     
     print(f"🚀 Iniciando scraper completo para {len(DISPOSITIVOS)} dispositivos y {len(CONDICIONES)} condiciones")
     print(f"📊 Total de búsquedas a realizar: {total_busquedas}")
     print("🚀 MODO COMPLETO: Procesando todos los productos disponibles")
-    print("⏱️ Delays de 10-15 minutos entre modelos y condiciones")
+    print("⏱️ Ritmo adaptativo por dominio (control_tasa) en lugar de delays fijos")
     print("=" * 60)
     
-    async with async_playwright() as p:
+    await iniciar_pool()
+    try:
         user_agent = random.choice(USER_AGENTS)
         viewport_width = random.randint(1200, 1920)
         viewport_height = random.randint(700, 1080)
         print(f"🖥️ User-Agent usado: {user_agent}")
         print(f"🖥️ Viewport: {viewport_width}x{viewport_height}")
         
-        # Límites para controlar memoria y tiempo
-        MAX_PRODUCTOS_TOTAL = 15
-        MAX_VARIACIONES_TOTAL = 200
-        productos_procesados_count = 0
-        variaciones_procesadas_count = 0
+        variaciones_procesadas_count = len(variaciones_hechas)
         
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                f'--user-agent={user_agent}',
-                f'--window-size={viewport_width},{viewport_height}',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-gpu',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor',
-                '--memory-pressure-off',
-                '--max_old_space_size=2048',  # Reducido de 4096 a 2048
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--disable-features=TranslateUI',
-                '--disable-ipc-flooding-protection',
-                '--disable-extensions',
-                '--disable-plugins',
-                '--disable-images',  # Deshabilitar imágenes para ahorrar memoria
-                '--disable-javascript',  # Deshabilitar JS si no es necesario
-                '--disable-css',
-                '--disable-fonts',
-                '--disable-default-apps',
-                '--disable-sync',
-                '--disable-translate',
-                '--disable-logging',
-                '--disable-dev-tools',
-                '--disable-component-extensions-with-background-pages',
-                '--disable-background-networking',
-                '--disable-default-apps',
-                '--disable-extensions-except',
-                '--disable-plugins-discovery',
-                '--disable-hang-monitor',
-                '--disable-prompt-on-repost',
-                '--disable-domain-reliability',
-                '--disable-features=AudioServiceOutOfProcess',
-                '--disable-features=VizDisplayCompositor',
-                '--disable-features=TranslateUI',
-                '--disable-features=BlinkGenPropertyTrees',
-                '--disable-features=CalculateNativeWinOcclusion',
-                '--disable-features=GlobalMediaControls',
-                '--disable-features=MediaRouter',
-                '--disable-features=OptimizationHints',
-                '--disable-features=PasswordGeneration',
-                '--disable-features=PreloadMediaEngagementData',
-                '--disable-features=Translate',
-                '--disable-features=WebUIDarkMode',
-                '--disable-features=WebUIDarkModeV2',
-                '--disable-features=WebUIDarkModeV3',
-                '--disable-features=WebUIDarkModeV4',
-                '--disable-features=WebUIDarkModeV5',
-                '--disable-features=WebUIDarkModeV6',
-                '--disable-features=WebUIDarkModeV7',
-                '--disable-features=WebUIDarkModeV8',
-                '--disable-features=WebUIDarkModeV9',
-                '--disable-features=WebUIDarkModeV10'
-            ]
+        # Contexto aislado sobre un navegador ya lanzado del pool
+        context = await nuevo_contexto(
+            "mercadolibre",
+            user_agent=user_agent,
+            viewport={"width": viewport_width, "height": viewport_height}
         )
+        page = await context.new_page()
         
-        page = await browser.new_page()
-        await page.set_viewport_size({"width": viewport_width, "height": viewport_height})
+        # PASO 1 de todas las búsquedas antes que cualquier detalle: los listados son lo que más
+        # aporta por segundo y, si el plazo de la ejecución se acaba, lo que se omite es lo de menos valor
+        for dispositivo in DISPOSITIVOS:
+            for condicion in CONDICIONES:
+                if (dispositivo, condicion) in busquedas_guardadas:
+                    continue
+                if not puede_empezar("mercadolibre", "listado", f"{dispositivo} ({condicion})"):
+                    continue
+                try:
+                    productos_busqueda = await scrape_busqueda_inicial(page, dispositivo, condicion)
+                except Exception as e:
+                    # Se reintenta en el recorrido por dispositivo
+                    print(f"❌ Error en búsqueda {dispositivo} ({condicion}): {str(e)}")
+                    continue
+                busquedas_guardadas[(dispositivo, condicion)] = productos_busqueda
+                anotar(bitacora, "busqueda", dispositivo=dispositivo, condicion=condicion,
+                       productos=productos_busqueda)
         
         for dispositivo in DISPOSITIVOS:
             print(f"\n📱 PROCESANDO DISPOSITIVO: {dispositivo}")
             print("=" * 50)
-            if busqueda_actual > 1:
-                    delay_minutos = random.uniform(7, 15)  # 10-15 minutos entre modelos
-                    print(f"⏳ Esperando {delay_minutos:.1f} minutos entre búsquedas...")
-                    await asyncio.sleep(delay_minutos * 60)  # Convertir a segundos
-                
+            
             for condicion in CONDICIONES:
                 busqueda_actual += 1
                 print(f"\n🔍 Búsqueda {busqueda_actual}/{total_busquedas}: {dispositivo} - {condicion}")
-                
-                # Delay entre modelos y condiciones - MODO COMPLETO
+                productos_procesados_count = conteo_busquedas.get((dispositivo, condicion), 0)
                 
                 # Reintentos para cada búsqueda
                 for intento_busqueda in range(3):
                     try:
-                        # PASO 1: Búsqueda inicial
-                        productos_busqueda = await scrape_busqueda_inicial(page, dispositivo, condicion)
+                        # PASO 1: Búsqueda inicial (al reanudar, el listado sale de la bitácora)
+                        if (dispositivo, condicion) in busquedas_guardadas:
+                            productos_busqueda = busquedas_guardadas[(dispositivo, condicion)]
+                        elif not puede_empezar("mercadolibre", "listado", f"{dispositivo} ({condicion})"):
+                            break
+                        else:
+                            productos_busqueda = await scrape_busqueda_inicial(page, dispositivo, condicion)
+                            busquedas_guardadas[(dispositivo, condicion)] = productos_busqueda
+                            anotar(bitacora, "busqueda", dispositivo=dispositivo, condicion=condicion,
+                                   productos=productos_busqueda)
                         
                         if productos_busqueda:
                             print(f"✅ Encontrados {len(productos_busqueda)} productos en búsqueda inicial")
@@ -272,64 +357,74 @@ async def scrape_completo():
                                     print(f"  ⚠️ Límite de {MAX_PRODUCTOS_TOTAL} productos alcanzado, saltando productos restantes")
                                     break
                                 
-                                print(f"  🔍 Procesando producto {i+1}/{len(productos_busqueda)} ({productos_procesados_count + 1}/{MAX_PRODUCTOS_TOTAL}): {producto['nombre'][:50]}...")
-                                print(f"    🔗 URL: {producto['url']}")
+                                # Ya terminado en esta ejecución (reintento de la búsqueda o reanudación)
+                                if producto['url'] in productos_hechos:
+                                    continue
                                 
-                                # Verificar si ya procesamos este producto - COMENTADO TEMPORALMENTE
-                                # id_producto = extraer_id_producto(producto['url'])
-                                # if id_producto in productos_procesados:
-                                #     print(f"    ⚠️ Producto ya procesado, saltando")
-                                #     continue
+                                # Deduplicación por ID canónico, dentro de la ejecución y entre ejecuciones
+                                id_producto = extraer_id_producto(producto['url'])
+                                if visto(frontera, id_producto):
+                                    print(f"  ⚠️ Producto {id_producto} ya procesado, saltando")
+                                    continue
                                 
-                                # productos_procesados.add(id_producto)
+                                # Visitado en una ejecución reciente: se conserva la fila del listado sin el detalle
+                                detalle_reciente = visto_antes(frontera, id_producto)
+                                if detalle_reciente:
+                                    print(f"  ⚠️ Detalle de {id_producto} visitado en una ejecución reciente, se conserva el listado")
                                 
-                                # Delay entre productos individuales - MODO COMPLETO
-                                await asyncio.sleep(random.uniform(30, 60))  # 30-60 segundos entre productos
+                                # Fuera del plazo: queda con los datos del listado y en el reporte
+                                if detalle_reciente or not puede_empezar("mercadolibre", "producto", producto['url']):
+                                    producto['fecha_scraping'] = fecha_scraping
+                                    todos_productos.append(producto)
+                                    productos_por_dispositivo[dispositivo].append(producto)
+                                    productos_hechos.add(producto['url'])
+                                    continue
                                 
-                                try:
-                                    # PASO 3: Recolectar variaciones ANTES de extraer detalles
-                                    variaciones_producto = await recolectar_variaciones_producto(page, producto, fecha_scraping, variaciones_recolectadas)
-                                    if variaciones_producto:
-                                        print(f"    ✅ Recolectadas {len(variaciones_producto)} variaciones")
-                                        todas_variaciones.extend(variaciones_producto)
-                                    else:
-                                        print(f"    ⚠️ No se encontraron variaciones")
-                                    
-                                    # Extraer detalles del producto
-                                    producto_con_detalles = await extraer_detalles_producto(page, producto, fecha_scraping)
-                                    todos_productos.append(producto_con_detalles)
-                                    productos_por_dispositivo[dispositivo].append(producto_con_detalles)
-                                    productos_procesados_count += 1
-                                    
-                                    print(f"    📊 Productos procesados: {productos_procesados_count}/{MAX_PRODUCTOS_TOTAL}")
+                                with medir_tarea("mercadolibre", "producto"):
+                                    # window.gc() no libera el renderer: reciclar contexto por memoria/navegaciones
+                                    context, page = await reciclar_si_hace_falta(context, page)
                                     
-                                    # Guardar archivo por dispositivo cada 5 productos (backup de seguridad)
-                                    if len(productos_por_dispositivo[dispositivo]) % 5 == 0:
-                                        guardar_archivo_dispositivo(dispositivo, productos_por_dispositivo[dispositivo], fecha_scraping, es_backup=True)
+                                    print(f"  🔍 Procesando producto {i+1}/{len(productos_busqueda)} ({productos_procesados_count + 1}/{MAX_PRODUCTOS_TOTAL}): {producto['nombre'][:50]}...")
+                                    print(f"    🔗 URL: {producto['url']}")
                                     
-                                    # Delay después de procesar cada producto
-                                    # await asyncio.sleep(random.uniform(30, 80))  # 1-1.5 minutos después de cada producto
-                                    
-                                    # Limpieza de memoria después de cada producto
+                                    variaciones_producto = []
                                     try:
-                                        await page.evaluate("window.gc && window.gc()")
-                                    except:
-                                        pass
-                                    
-                                except Exception as e:
-                                    print(f"    ❌ Error procesando producto: {str(e)}")
-                                    producto['fecha_scraping'] = fecha_scraping
-                                    todos_productos.append(producto)
-                                    productos_procesados_count += 1
-                                    continue
+                                        # PASO 3: Recolectar variaciones ANTES de extraer detalles
+                                        variaciones_producto = await recolectar_variaciones_producto(page, producto, fecha_scraping, variaciones_recolectadas)
+                                        if variaciones_producto:
+                                            print(f"    ✅ Recolectadas {len(variaciones_producto)} variaciones")
+                                            todas_variaciones.extend(variaciones_producto)
+                                        else:
+                                            print(f"    ⚠️ No se encontraron variaciones")
+                                        
+                                        # Extraer detalles del producto
+                                        producto_con_detalles = await extraer_detalles_producto(page, producto, fecha_scraping)
+                                        todos_productos.append(producto_con_detalles)
+                                        productos_por_dispositivo[dispositivo].append(producto_con_detalles)
+                                        productos_procesados_count += 1
+                                        
+                                        print(f"    📊 Productos procesados: {productos_procesados_count}/{MAX_PRODUCTOS_TOTAL}")
+                                        
+                                        # Una línea por producto en la bitácora en lugar de reescribir el Excel del dispositivo
+                                        productos_hechos.add(producto['url'])
+                                        marcar(frontera, id_producto)
+                                        anotar(bitacora, "producto", dispositivo=dispositivo, condicion=condicion,
+                                               url=producto['url'], id_producto=producto_con_detalles.get('id_producto'),
+                                               registro=producto_con_detalles, variaciones=variaciones_producto or [])
+                                        
+                                    except Exception as e:
+                                        print(f"    ❌ Error procesando producto: {str(e)}")
+                                        producto['fecha_scraping'] = fecha_scraping
+                                        todos_productos.append(producto)
+                                        productos_procesados_count += 1
+                                        productos_hechos.add(producto['url'])
+                                        anotar(bitacora, "producto", dispositivo=dispositivo, condicion=condicion,
+                                               url=producto['url'], id_producto=producto.get('id_producto'),
+                                               registro=producto, variaciones=variaciones_producto or [], error=str(e))
+                                        continue
                         else:
                             print(f"⚠️ No se encontraron productos para {dispositivo} ({condicion})")
                         
-                        # Delay entre búsquedas
-                        if busqueda_actual < total_busquedas:
-                            print(f"⏳ Esperando {DELAY_ENTRE_BUSQUEDAS} segundos...")
-                            await asyncio.sleep(DELAY_ENTRE_BUSQUEDAS)
-                        
                         # Si llegamos aquí, la búsqueda fue exitosa
                         break
                         
@@ -339,63 +434,14 @@ async def scrape_completo():
                             print(f"❌ Error en búsqueda {dispositivo} ({condicion}): {str(e)}")
                             continue
                         else:
-                            # Reiniciar navegador en caso de error
+                            # Reemplazar solo el contexto si está roto; el navegador sigue en el pool
                             try:
-                                await browser.close()
+                                await page.close()
                             except:
                                 pass
-                            browser = await p.chromium.launch(
-                                headless=True,
-                                args=[
-                                    f'--user-agent={user_agent}',
-                                    f'--window-size={viewport_width},{viewport_height}',
-                                    '--disable-dev-shm-usage',
-                                    '--no-sandbox',
-                                    '--disable-setuid-sandbox',
-                                    '--disable-gpu',
-                                    '--disable-web-security',
-                                    '--disable-features=VizDisplayCompositor',
-                                    '--memory-pressure-off',
-                                    '--max_old_space_size=2048',  # Reducido de 4096 a 2048
-                                    '--disable-background-timer-throttling',
-                                    '--disable-backgrounding-occluded-windows',
-                                    '--disable-renderer-backgrounding',
-                                    '--disable-features=TranslateUI',
-                                    '--disable-ipc-flooding-protection',
-                                    '--disable-extensions',
-                                    '--disable-plugins',
-                                    '--disable-images',
-                                    '--disable-javascript',
-                                    '--disable-css',
-                                    '--disable-fonts',
-                                    '--disable-default-apps',
-                                    '--disable-sync',
-                                    '--disable-translate',
-                                    '--disable-logging',
-                                    '--disable-dev-tools',
-                                    '--disable-component-extensions-with-background-pages',
-                                    '--disable-background-networking',
-                                    '--disable-extensions-except',
-                                    '--disable-plugins-discovery',
-                                    '--disable-hang-monitor',
-                                    '--disable-prompt-on-repost',
-                                    '--disable-domain-reliability',
-                                    '--disable-features=AudioServiceOutOfProcess',
-                                    '--disable-features=BlinkGenPropertyTrees',
-                                    '--disable-features=CalculateNativeWinOcclusion',
-                                    '--disable-features=GlobalMediaControls',
-                                    '--disable-features=MediaRouter',
-                                    '--disable-features=OptimizationHints',
-                                    '--disable-features=PasswordGeneration',
-                                    '--disable-features=PreloadMediaEngagementData',
-                                    '--disable-features=Translate',
-                                    '--disable-features=WebUIDarkMode'
-                                ]
-                            )
-                            page = await browser.new_page()
-                            await page.set_viewport_size({"width": viewport_width, "height": viewport_height})
-                            await asyncio.sleep(5)  # Esperar antes de reintentar
-                productos_procesados_count = 0
+                            context = await obtener_contexto_saludable(context)
+                            page = await context.new_page()
+                            await esperar_reintento("https://listado.mercadolibre.com.co", intento_busqueda)
             # Guardar archivo del dispositivo al terminar todas sus condiciones
             if productos_por_dispositivo[dispositivo]:
                 print(f"\n💾 Guardando archivo del dispositivo {dispositivo}...")
@@ -417,40 +463,65 @@ async def scrape_completo():
             for i, variacion in enumerate(todas_variaciones):
                 # Verificar límite de variaciones
                 
-                print(f"  🔍 Procesando variación {i+1}/{len(todas_variaciones)} ({variaciones_procesadas_count + 1}/{MAX_VARIACIONES_TOTAL})")
-                print(f"    🔗 URL: {variacion['url']}")
-                
-                # Verificar si ya procesamos esta variación - COMENTADO TEMPORALMENTE
-                # id_variacion = extraer_id_producto(variacion['url'])
-                # if id_variacion in productos_procesados:
-                #     print(f"    ⚠️ Variación ya procesada, saltando")
-                #     continue
-                
-                # productos_procesados.add(id_variacion)
+                # Ya terminada en esta ejecución (reanudación)
+                if variacion['url'] in variaciones_hechas:
+                    continue
                 
-                # Delay entre variaciones - MODO COMPLETO
-                await asyncio.sleep(random.uniform(60, 90))  # 1-1.5 minutos entre variaciones
+                # Variación alcanzada desde otro padre, ya procesada como producto o en otra ejecución reciente
+                id_variacion = extraer_id_producto(variacion['url'])
+                if visto(frontera, id_variacion):
+                    print(f"  ⚠️ Variación {id_variacion} ya procesada, saltando")
+                    continue
                 
-                try:
-                    # Procesar variación como producto completamente independiente
-                    variacion_procesada = await procesar_variacion_completa(page, variacion, fecha_scraping)
-                    todos_productos.append(variacion_procesada)
-                    variaciones_procesadas_count += 1
-                    
-                    print(f"    📊 Variaciones procesadas: {variaciones_procesadas_count}/{MAX_VARIACIONES_TOTAL}")
-                    
-                    # Delay después de procesar cada variación - MODO COMPLETO
-                    await asyncio.sleep(random.uniform(60, 90))  # 1-1.5 minutos después de cada variación
-                    
-                except Exception as e:
-                    print(f"    ❌ Error procesando variación: {str(e)}")
+                # Visitada en una ejecución reciente: queda con los datos recolectados, sin visitar el detalle
+                if visto_antes(frontera, id_variacion):
+                    print(f"  ⚠️ Variación {id_variacion} visitada en una ejecución reciente, sin detalle")
                     variacion['fecha_scraping'] = fecha_scraping
                     variacion['es_variacion'] = True
                     todos_productos.append(variacion)
-                    variaciones_procesadas_count += 1
+                    variaciones_hechas.add(variacion['url'])
                     continue
+                
+                # Las variaciones son lo primero que deja de empezar cuando se acerca el plazo
+                if not puede_empezar("mercadolibre", "variacion", variacion['url']):
+                    continue
+                
+                with medir_tarea("mercadolibre", "variacion"):
+                    # Las corridas largas de variaciones son las que acumulan memoria
+                    context, page = await reciclar_si_hace_falta(context, page)
+                    
+                    print(f"  🔍 Procesando variación {i+1}/{len(todas_variaciones)} ({variaciones_procesadas_count + 1}/{MAX_VARIACIONES_TOTAL})")
+                    print(f"    🔗 URL: {variacion['url']}")
+                    
+                    try:
+                        # Procesar variación como producto completamente independiente
+                        variacion_procesada = await procesar_variacion_completa(page, variacion, fecha_scraping)
+                        todos_productos.append(variacion_procesada)
+                        variaciones_procesadas_count += 1
+                        variaciones_hechas.add(variacion['url'])
+                        marcar(frontera, id_variacion)
+                        anotar(bitacora, "variacion", url=variacion['url'],
+                               id_producto=variacion_procesada.get('id_producto'), registro=variacion_procesada)
+                        
+                        print(f"    📊 Variaciones procesadas: {variaciones_procesadas_count}/{MAX_VARIACIONES_TOTAL}")
+                        
+                    except Exception as e:
+                        print(f"    ❌ Error procesando variación: {str(e)}")
+                        variacion['fecha_scraping'] = fecha_scraping
+                        variacion['es_variacion'] = True
+                        todos_productos.append(variacion)
+                        variaciones_procesadas_count += 1
+                        variaciones_hechas.add(variacion['url'])
+                        anotar(bitacora, "variacion", url=variacion['url'], id_producto=None,
+                               registro=variacion, error=str(e))
+                        continue
         
-        await browser.close()
+        await cerrar_contexto(context)
+        anotar(bitacora, "fin")
+    finally:
+        cerrar_bitacora(bitacora)
+        guardar_frontera(frontera)
+        await cerrar_pool()
     
     # Guardar archivos por dispositivo
     print(f"\n💾 Guardando archivos por dispositivo...")
@@ -471,6 +542,7 @@ async def scrape_completo():
             print(f"📊 Total de productos (incluyendo variaciones): {len(todos_productos)}")
             print(f"💾 Archivo completo guardado: resultados_completos.xlsx")
             print(f"📁 Archivos por dispositivo guardados: {len(archivos_guardados)}")
+            return "resultados_completos.xlsx"
         except PermissionError:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             nuevo_archivo = f"resultados_completos_{timestamp}.xlsx"
@@ -479,8 +551,10 @@ async def scrape_completo():
             print(f"📊 Total de productos (incluyendo variaciones): {len(todos_productos)}")
             print(f"💾 Archivo completo guardado: {nuevo_archivo}")
             print(f"📁 Archivos por dispositivo guardados: {len(archivos_guardados)}")
+            return nuevo_archivo
     else:
         print("❌ No se encontraron productos")
+        return None
 
 async def scrape_busqueda_inicial(page, dispositivo: str, condicion: str) -> List[Dict]:
     """
@@ -491,101 +565,138 @@ async def scrape_busqueda_inicial(page, dispositivo: str, condicion: str) -> Lis
     
     print(f"  🔗 URL: {url}")
     
-    productos = []
-    pagina_actual = 1
+    # Las páginas siguientes se conocen de antemano por su desplazamiento _Desde_ (50 por página)
+    base, _, filtro = url.partition("#")
+    urls = [url] + [f"{base}_Desde_{(numero - 1) * 50 + 1}" + (f"#{filtro}" if filtro else "")
+                    for numero in range(2, MAX_PAGINAS + 1)]
     
-    while pagina_actual <= MAX_PAGINAS:
-        if pagina_actual == 1:
-            url_pagina = url
-        else:
-            url_pagina = f"{url}_Desde_{(pagina_actual-1)*50+1}"
+    async def cargar(pagina, numero, url_pagina):
+        return await cargar_pagina_listado(pagina, numero, url_pagina, dispositivo, condicion)
+    
+    return await paginar_listado(page, urls, cargar, PAGINAS_LISTADO)
+
+async def cargar_pagina_listado(page, numero: int, url_pagina: str, dispositivo: str, condicion: str):
+    """Carga una página del listado; devuelve (productos, es_ultima)"""
+    try:
+        # Una sola navegación por intento hasta el título o la tarjeta (networkidle no llega con los
+        # anuncios), empezando por el que ganó la última vez
+        listing = MERCADOLIBRE_CONFIG["listing"]
+        if not await cargar_con_reintentos(page, url_pagina, "mercadolibre/listado",
+                                           [listing["title"], listing["container"]], TIMEOUT_CARGA_INICIAL,
+                                           INTENTOS_CARGA):
+            print(f"    ❌ No se encontraron elementos de productos")
+            return [], True
         
-        try:
-            timeout = random.randint(60000, 120000)  # Aumentado a 1-2 minutos
-            await page.goto(url_pagina, wait_until="networkidle", timeout=timeout)
-            
-            try:
-                await page.wait_for_selector("a.poly-component__title", timeout=TIMEOUT_PRODUCTOS)
-            except:
-                try:
-                    await page.wait_for_selector("div.poly-card", timeout=10000)
-                except:
-                    print(f"    ❌ No se encontraron elementos de productos")
-                    break
-            
-            productos_pagina = await extraer_productos_pagina(page, condicion, dispositivo)
-            
-            if not productos_pagina:
-                break
-            
-            productos.extend(productos_pagina)
-            print(f"    📊 Encontrados {len(productos_pagina)} productos en página {pagina_actual}")
-            
-            siguiente_btn = await page.query_selector('a[title="Siguiente"]')
-            if not siguiente_btn:
-                break
-            
-            # Delay aleatorio entre páginas - MODO COMPLETO
-            await asyncio.sleep(random.uniform(5.0, 10.0))
-            pagina_actual += 1
-            
-        except Exception as e:
-            print(f"    ❌ Error en página {pagina_actual}: {str(e)}")
-            break
+        productos_pagina = await extraer_productos_pagina(page, condicion, dispositivo)
+        
+        if not productos_pagina:
+            return [], True
+        
+        print(f"    📊 Encontrados {len(productos_pagina)} productos en página {numero}")
+        
+        siguiente_btn = await page.query_selector('a[title="Siguiente"]')
+        return productos_pagina, not siguiente_btn
+        
+    except Exception as e:
+        print(f"    ❌ Error en página {numero}: {str(e)}")
+        return [], True
+
+def parsear_resultado_mercadolibre(resultado: Dict) -> Dict:
+    """Extrae nombre, URL, precio y calificación de un resultado del estado del listado.
+
+    Soporta el formato polycard (metadata + components) y el formato plano anterior.
+    """
+    poly = resultado.get("polycard") or resultado
+    metadata = poly.get("metadata") or {}
+    componentes = {componente.get("type"): componente for componente in poly.get("components") or []}
     
-    return productos
+    url = metadata.get("url") or resultado.get("permalink")
+    if url and not url.startswith("http"):
+        url = f"https://{url.lstrip('/')}"
+    
+    titulo = componentes.get("title", {}).get("title", {})
+    precio = componentes.get("price", {}).get("price", {}).get("current_price", {})
+    reviews = componentes.get("reviews", {}).get("reviews", {})
+    
+    precio_valor = precio.get("value") or (resultado.get("price") or {}).get("amount")
+    calificacion = reviews.get("rating_average") or (resultado.get("reviews") or {}).get("rating_average")
+    return {
+        'nombre': titulo.get("text") or resultado.get("title"),
+        'url': url,
+        'precio': int(precio_valor) if precio_valor else None,
+        'calificacion': float(calificacion) if calificacion else None,
+    }
+
+async def extraer_productos_estado(page, condicion: str, dispositivo: str) -> Optional[List[Dict]]:
+    """Lee los productos del estado __PRELOADED_STATE__ del listado; None si no está disponible"""
+    try:
+        estado = await leer_json_embebido(page, "__PRELOADED_STATE__")
+    except Exception as e:
+        print(f"    ⚠️ No se pudo leer el estado del listado: {str(e)}")
+        return None
+    if not estado:
+        return None
+    
+    pagina = estado.get("pageState", estado)
+    resultados = pagina.get("initialState", {}).get("results")
+    if not resultados:
+        return None
+    
+    productos = []
+    for resultado in resultados:
+        try:
+            producto = parsear_resultado_mercadolibre(resultado)
+        except (AttributeError, TypeError, ValueError):
+            continue
+        producto['id_producto'] = extraer_id_producto(producto['url'])
+        producto['condicion'] = condicion
+        producto['dispositivo'] = dispositivo
+        if producto['url'] and (producto['nombre'] or producto['precio']):
+            productos.append(producto)
+    return productos or None
 
 async def extraer_productos_pagina(page, condicion: str, dispositivo: str) -> List[Dict]:
-    """Extrae todos los productos de una página"""
+    """Extrae todos los productos de una página: primero del estado embebido, si no de las poly-cards"""
+    productos = await extraer_productos_estado(page, condicion, dispositivo)
+    if productos:
+        return productos
+    
+    # Fallback: todas las tarjetas en un solo page.evaluate
     productos = []
+    listing = MERCADOLIBRE_CONFIG["listing"]
     
-    elementos_producto = await page.query_selector_all("div.poly-card")
+    _, tarjetas = await extraer_tarjetas(page, listing["container"], {
+        "nombre": campo(listing["title"]),
+        "url": campo(listing["title"], atributo="href"),
+        "precio": campo(listing["price"]),
+        "calificacion": campo(listing["rating"]),
+    })
     
-    for elemento in elementos_producto:
-        try:
-            producto = {}
-            
-            titulo_element = await elemento.query_selector("a.poly-component__title")
-            if titulo_element:
-                producto['nombre'] = await titulo_element.inner_text()
-                producto['url'] = await titulo_element.get_attribute("href")
-            else:
-                producto['nombre'] = None
-                producto['url'] = None
-            
-            precio_element = await elemento.query_selector("span.andes-money-amount__fraction")
-            if precio_element:
-                precio_texto = await precio_element.inner_text()
-                precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-                producto['precio'] = int(precio_limpio) if precio_limpio else None
-            else:
-                producto['precio'] = None
-            
-            calificacion_element = await elemento.query_selector("span.poly-reviews__rating")
-            if calificacion_element:
-                calificacion_texto = await calificacion_element.inner_text()
-                match = re.search(r'Calificación\s+(\d+[,.]?\d*)\s+de\s+5', calificacion_texto)
-                if match:
-                    calificacion = match.group(1).replace(',', '.')
-                    producto['calificacion'] = float(calificacion)
-                else:
-                    numero_match = re.search(r'(\d+[,.]?\d*)', calificacion_texto)
-                    if numero_match:
-                        calificacion = numero_match.group(1).replace(',', '.')
-                        producto['calificacion'] = float(calificacion)
-                    else:
-                        producto['calificacion'] = None
-            else:
-                producto['calificacion'] = None
-            
-            producto['condicion'] = condicion
-            producto['dispositivo'] = dispositivo
-            
-            if producto['nombre'] or producto['precio']:
-                productos.append(producto)
-                
-        except Exception as e:
+    for tarjeta in tarjetas:
+        if tarjeta.get('error'):
             continue
+        producto = {}
+        producto['nombre'] = tarjeta['nombre']
+        producto['url'] = tarjeta['url']
+        
+        precio_limpio = re.sub(r'[^\d]', '', tarjeta['precio'] or '')
+        producto['precio'] = int(precio_limpio) if precio_limpio else None
+        
+        producto['calificacion'] = None
+        calificacion_texto = tarjeta['calificacion']
+        if calificacion_texto:
+            match = re.search(r'Calificación\s+(\d+[,.]?\d*)\s+de\s+5', calificacion_texto)
+            if not match:
+                match = re.search(r'(\d+[,.]?\d*)', calificacion_texto)
+            if match:
+                producto['calificacion'] = float(match.group(1).replace(',', '.'))
+        
+        producto['id_producto'] = extraer_id_producto(producto['url'])
+        producto['condicion'] = condicion
+        producto['dispositivo'] = dispositivo
+        
+        if producto['nombre'] or producto['precio']:
+            productos.append(producto)
     
     return productos
 
@@ -600,28 +711,20 @@ async def extraer_detalles_producto(page, producto: Dict, fecha_scraping: str) -
     producto['fecha_scraping'] = fecha_scraping
     
     try:
-        timeout = random.randint(60000, 120000)  # Aumentado a 1-2 minutos
-        await page.goto(url, wait_until="networkidle", timeout=timeout)
-        
-        # Extraer precios actualizados
-        precios = await extraer_precios_producto(page)
-        producto.update(precios)
+        if not await cargar_con_reintentos(page, url, "mercadolibre/producto", MARCADORES_PRODUCTO,
+                                           TIMEOUT_CARGA_INICIAL, INTENTOS_CARGA):
+            raise Exception("No apareció el título ni el precio del producto")
         
-        # Buscar botón de características
-        boton_caracteristicas = await page.query_selector('button[data-testid="action-collapsable-target"]')
+        # Desplegar características: se espera a que la tabla tenga filas, no una pausa fija
+        pagina = MERCADOLIBRE_CONFIG["product_page"]
+        boton_caracteristicas = await pulsar_y_esperar(page, pagina["specs_button"], pagina["specs_row"],
+                                                       TIMEOUT_CARACTERISTICAS)
         
+        # Precios, especificaciones y vendedor en una sola llamada
+        datos = await extraer_datos_producto(page)
+        producto.update({campo_precio: datos[campo_precio] for campo_precio in CAMPOS_PRECIO})
         if boton_caracteristicas:
-            await boton_caracteristicas.click()
-            await asyncio.sleep(random.uniform(3.0, 6.0))  # Aumentado para modo completo
-            
-            tabla_memoria = await page.query_selector('div.ui-vpp-striped-specs__table')
-            
-            if tabla_memoria:
-                datos_memoria = await extraer_datos_memoria(page)
-                producto.update(datos_memoria)
-            
-            datos_vendedor = await extraer_datos_vendedor(page)
-            producto.update(datos_vendedor)
+            producto.update({clave: datos[clave] for clave in CAMPOS_MEMORIA + CAMPOS_VENDEDOR})
         
     except Exception as e:
         print(f"    ⚠️ Error extrayendo detalles: {str(e)}")
@@ -635,8 +738,11 @@ async def recolectar_variaciones_producto(page, producto: Dict, fecha_scraping:
     variaciones = []
     url = producto['url']
     try:
-        await asyncio.sleep(3.0)
-        contenedor_variaciones = await page.query_selector('div.ui-pdp-variations')
+        try:
+            contenedor_variaciones = await page.wait_for_selector('div.ui-pdp-variations', state="attached",
+                                                                  timeout=TIMEOUT_VARIACIONES)
+        except Exception:
+            contenedor_variaciones = None
         if not contenedor_variaciones:
             print(f"    ⚠️ No se encontró contenedor de variaciones")
             return []
@@ -656,8 +762,13 @@ async def recolectar_variaciones_producto(page, producto: Dict, fecha_scraping:
                     href = f"https://www.mercadolibre.com.co{href}"
                 urls_variaciones.add(href)
                 print(f"    🔗 URL variación: {href}")
-        # Crear objetos de variación SOLO con la URL (sin filtrar por ID)
+        # Crear objetos de variación SOLO con la URL; las ya recolectadas desde otro padre se omiten
         for url_variacion in urls_variaciones:
+            id_variacion = extraer_id_producto(url_variacion)
+            if id_variacion:
+                if id_variacion in variaciones_recolectadas:
+                    continue
+                variaciones_recolectadas.add(id_variacion)
             variacion = {
                 'url': url_variacion,
                 'fecha_scraping': fecha_scraping,
@@ -680,30 +791,31 @@ async def procesar_variacion_completa(page, variacion: Dict, fecha_scraping: str
     print(f"    🔗 URL de la variación: {url}")
     
     try:
-        # Reducir timeout y usar domcontentloaded en lugar de networkidle
-        timeout = random.randint(60000, 90000)  # Aumentado a 1-1.5 minutos para modo completo
-        await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
-        
-        # Espera adicional - MODO COMPLETO
-        await asyncio.sleep(random.uniform(3.0, 6.0))
-        
-        # Extraer datos básicos del producto
-        nombre_element = await page.query_selector('h1.ui-pdp-title')
-        if nombre_element:
-            variacion['nombre'] = await nombre_element.inner_text()
+        # Una navegación por intento hasta el título o el precio, sin esperas fijas
+        if not await cargar_con_reintentos(page, url, "mercadolibre/variacion", MARCADORES_PRODUCTO,
+                                           TIMEOUT_CARGA_INICIAL, INTENTOS_CARGA):
+            raise Exception("No apareció el título ni el precio de la variación")
         
-        # Extraer precios actualizados
-        precios = await extraer_precios_producto(page)
-        variacion.update(precios)
+        # Desplegar características: se espera a que la tabla tenga filas, no una pausa fija
+        boton_caracteristicas = False
+        try:
+            pagina = MERCADOLIBRE_CONFIG["product_page"]
+            boton_caracteristicas = await pulsar_y_esperar(page, pagina["specs_button"], pagina["specs_row"],
+                                                           TIMEOUT_CARACTERISTICAS)
+            if boton_caracteristicas:
+                print(f"    🔍 Extrayendo características de la variación...")
+            else:
+                print(f"    ⚠️ No se encontró botón de características")
+        except Exception as e:
+            print(f"    ⚠️ Error abriendo características: {str(e)}")
         
-        # Extraer calificación si existe
-        calificacion_element = await page.query_selector('span.ui-pdp-review__rating')
-        if calificacion_element:
-            calificacion_texto = await calificacion_element.inner_text()
-            match = re.search(r'(\d+[,.]?\d*)', calificacion_texto)
-            if match:
-                calificacion = match.group(1).replace(',', '.')
-                variacion['calificacion'] = float(calificacion)
+        # Nombre, precios, calificación, memoria y vendedor en una sola llamada
+        datos = await extraer_datos_producto(page)
+        if datos['nombre']:
+            variacion['nombre'] = datos['nombre']
+        variacion.update({campo_precio: datos[campo_precio] for campo_precio in CAMPOS_PRECIO})
+        if datos['calificacion'] is not None:
+            variacion['calificacion'] = datos['calificacion']
         
         # Establecer condición por defecto como "nuevo"
         variacion['condicion'] = "nuevo"
@@ -717,31 +829,13 @@ async def procesar_variacion_completa(page, variacion: Dict, fecha_scraping: str
             else:
                 variacion['dispositivo'] = "samsung galaxy s24 5g defecto"
         
-        # Buscar botón de características con timeout más corto
-        try:
-            boton_caracteristicas = await page.query_selector('button[data-testid="action-collapsable-target"]')
-            
-            if boton_caracteristicas:
-                print(f"    🔍 Extrayendo características de la variación...")
-                await boton_caracteristicas.click()
-                await asyncio.sleep(random.uniform(3.0, 6.0))  # Aumentado para modo completo
-                
-                tabla_memoria = await page.query_selector('div.ui-vpp-striped-specs__table')
-                
-                if tabla_memoria:
-                    print(f"    📊 Extrayendo datos de memoria y especificaciones...")
-                    datos_memoria = await extraer_datos_memoria(page)
-                    variacion.update(datos_memoria)
-                    print(f"    ✅ Datos de memoria extraídos: {datos_memoria}")
-                
-                print(f"    👤 Extrayendo datos del vendedor...")
-                datos_vendedor = await extraer_datos_vendedor(page)
-                variacion.update(datos_vendedor)
-                print(f"    ✅ Datos del vendedor extraídos: {datos_vendedor}")
-            else:
-                print(f"    ⚠️ No se encontró botón de características")
-        except Exception as e:
-            print(f"    ⚠️ Error extrayendo características: {str(e)}")
+        if boton_caracteristicas:
+            datos_memoria = {clave: datos[clave] for clave in CAMPOS_MEMORIA}
+            variacion.update(datos_memoria)
+            print(f"    ✅ Datos de memoria extraídos: {datos_memoria}")
+            datos_vendedor = {clave: datos[clave] for clave in CAMPOS_VENDEDOR}
+            variacion.update(datos_vendedor)
+            print(f"    ✅ Datos del vendedor extraídos: {datos_vendedor}")
         
         # Asegurar que tenga el ID del producto
         variacion['id_producto'] = id_variacion
@@ -755,76 +849,14 @@ async def procesar_variacion_completa(page, variacion: Dict, fecha_scraping: str
         variacion['dispositivo'] = "samsung galaxy s24 5g"  # Por defecto
         return variacion
 
-async def extraer_datos_memoria(page) -> Dict:
-    """Extrae los datos de memoria y color de la tabla"""
-    datos = {
-        'memoria_interna': None,
-        'memoria_ram': None,
-        'capacidad_maxima_tarjeta': None,
-        'ranura_tarjeta_memoria': None,
-        'color': None
-    }
-    
-    try:
-        filas = await page.query_selector_all('tr.andes-table__row')
-        print(f"        📋 Procesando {len(filas)} filas de especificaciones...")
-        
-        for fila in filas:
-            encabezado_element = await fila.query_selector('th .andes-table__header__container')
-            if encabezado_element:
-                encabezado = await encabezado_element.inner_text()
-                
-                valor_element = await fila.query_selector('td .andes-table__column--value')
-                if valor_element:
-                    valor = await valor_element.inner_text()
-                    
-                    if "Memoria interna" in encabezado:
-                        datos['memoria_interna'] = valor
-                    elif "Memoria RAM" in encabezado:
-                        datos['memoria_ram'] = valor
-                    elif "Capacidad máxima de la tarjeta de memoria" in encabezado:
-                        datos['capacidad_maxima_tarjeta'] = valor
-                    elif "Con ranura para tarjeta de memoria" in encabezado:
-                        datos['ranura_tarjeta_memoria'] = valor
-                    elif "Color" in encabezado:
-                        datos['color'] = valor
-                        
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo datos de memoria: {str(e)}")
-    
-    return datos
-
-async def extraer_datos_vendedor(page) -> Dict:
-    """Extrae los datos del vendedor"""
-    datos = {
-        'vendedor': None,
-        'productos_vendedor': None,
-        'evaluacion_vendedor': None
-    }
-    
-    try:
-        vendedor_element = await page.query_selector('h2.ui-seller-data-header__title')
-        if vendedor_element:
-            vendedor_texto = await vendedor_element.inner_text()
-            datos['vendedor'] = vendedor_texto.replace("Vendido por ", "").strip()
-        
-        productos_element = await page.query_selector('.ui-seller-data-header__products')
-        if productos_element:
-            productos_texto = await productos_element.inner_text()
-            datos['productos_vendedor'] = productos_texto.strip()
-        
-        evaluacion_element = await page.query_selector('.ui-seller-data-status__default-info')
-        if evaluacion_element:
-            evaluacion_texto = await evaluacion_element.inner_text()
-            datos['evaluacion_vendedor'] = evaluacion_texto.strip()
-            
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo datos del vendedor: {str(e)}")
-    
-    return datos
-
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Scraper completo de MercadoLibre")
+    parser.add_argument("--resume", nargs="?", const=True, default=None, metavar="RUN_ID",
+                        help="Reanuda desde la bitácora de backup/ (sin RUN_ID, la última ejecución sin terminar)")
+    args = parser.parse_args()
+    
     print("🚀 Iniciando scraper completo integrado...")
     print("=" * 60)
     
-    asyncio.run(scrape_completo()) 
\ No newline at end of file
+    asyncio.run(scrape_completo(reanudar=args.resume)) 
\ No newline at end of file
@@ -4,9 +4,13 @@ import pandas as pd
 import random
 import gc
 import os
-import shutil
 from datetime import datetime
-from playwright.async_api import async_playwright
+from urllib.parse import unquote_plus
+from control_tasa import esperar_reintento
+from plazos import puede_empezar, medir_tarea
+from tiempos_carga import cargar_pagina, timeout_carga
+from extraccion import extraer_tarjetas, campo, extraer_detalle, mapear_filas, a_entero
+from pool_navegadores import iniciar_pool, cerrar_pool, nuevo_contexto, obtener_contexto_saludable, cerrar_contexto, procesar_en_paginas, paginar_listado
 
 # Configuración
 DISPOSITIVOS = [
@@ -21,6 +25,9 @@ VIEWPORT_WIDTH = 1920
 VIEWPORT_HEIGHT = 1080
 TIMEOUT_PRODUCTOS = 5000   # Más agresivo: reducido de 7000 a 5000
 DELAY_ENTRE_BUSQUEDAS = 0.5   # Más rápido: reducido de 1 a 0.5
+PAGINAS_DETALLE = 4  # Páginas concurrentes para detalles de producto
+PAGINAS_LISTADO = 3  # Páginas del listado cargadas a la vez cuando MAX_PAGINAS > 1
+TIMEOUT_API_BUSQUEDA = 4000  # ms de espera por la respuesta JSON de búsqueda antes de usar el DOM
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0",
@@ -29,6 +36,37 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.4 Safari/605.1.15"
 ]
 
+# Selectores de Éxito
+EXITO_CONFIG = {
+    "listing": {
+        "container": "article.productCard_productCard__M0677",
+        "link": "a[data-testid='product-link']",
+        "title": "h3.styles_name__qQJiK"
+    },
+    # Endpoints del storefront que devuelven resultados de búsqueda en JSON
+    "api": {
+        "endpoints": ["/api/graphql", "intelligent-search/product_search", "/api/catalog_system/pub/products/search"]
+    },
+    "product_page": {
+        "price_promotion": "p.priceSection_container-promotion_price-dashed__FJ7nI",
+        "price_current": "p.ProductPrice_container__price__XmMWA",
+        "specs_block": "div[data-fs-content-specification='true'] div[data-fs-specification-gray-block]",
+        "spec_name": "p[data-fs-title-specification='true']",
+        "spec_value": "p[data-fs-text-specification='true']",
+        "description": "div[data-fs-description-container='true']",
+        "title": "h1",
+        "seller": "div[data-fs-product-details-seller__content='true'] a"
+    }
+}
+
+# Título de la especificación -> campo del producto (gana la primera regla que coincida)
+REGLAS_ESPECIFICACIONES_EXITO = [
+    (("Capacidad de almacenamiento",), 'memoria_interna'),
+    (("Memoria del Sistema Ram", "Memoria RAM"), 'memoria_ram'),
+    (("Modelo",), 'modelo'),
+    (("Color",), 'color'),
+]
+
 def get_url_exito(dispositivo):
     dispositivo_formateado = dispositivo.replace(" ", "+").upper()
     return f"https://www.exito.com/s?q={dispositivo_formateado}&sort=score_desc&page=0"
@@ -38,32 +76,34 @@ async def scrape_exito():
     print(f"[INICIANDO] Scraper Exito para {len(DISPOSITIVOS)} dispositivos")
     print("=" * 60)
     
-    # Limpiar caché de Playwright al inicio
-    await limpiar_cache_playwright()
-    
     # Lista para almacenar archivos temporales
     archivos_temporales = []
     
-    # Procesar cada dispositivo por separado
-    for i, dispositivo in enumerate(DISPOSITIVOS):
-        print(f"\n[DEVICE {i+1}/{len(DISPOSITIVOS)}] Procesando: {dispositivo}")
-        print("=" * 50)
-        
-        # Procesar dispositivo individual
-        productos_dispositivo = await procesar_dispositivo_individual(dispositivo, fecha_scraping)
-        
-        if productos_dispositivo:
-            # Guardar Excel temporal para este dispositivo
-            archivo_temporal = await guardar_excel_temporal(productos_dispositivo, dispositivo, i+1)
-            if archivo_temporal:
-                archivos_temporales.append(archivo_temporal)
-                print(f"[SAVE] Archivo temporal guardado: {archivo_temporal}")
-        else:
-            print(f"[WARN] No se encontraron productos para {dispositivo}")
+    # Los navegadores se lanzan una sola vez y se comparten entre dispositivos
+    await iniciar_pool()
+    try:
+        # Procesar cada dispositivo por separado
+        for i, dispositivo in enumerate(DISPOSITIVOS):
+            print(f"\n[DEVICE {i+1}/{len(DISPOSITIVOS)}] Procesando: {dispositivo}")
+            print("=" * 50)
+        
+            # Procesar dispositivo individual
+            productos_dispositivo = await procesar_dispositivo_individual(dispositivo, fecha_scraping)
+        
+            if productos_dispositivo:
+                # Guardar Excel temporal para este dispositivo
+                archivo_temporal = await guardar_excel_temporal(productos_dispositivo, dispositivo, i+1)
+                if archivo_temporal:
+                    archivos_temporales.append(archivo_temporal)
+                    print(f"[SAVE] Archivo temporal guardado: {archivo_temporal}")
+            else:
+                print(f"[WARN] No se encontraron productos para {dispositivo}")
         
-        # Liberar memoria explícitamente
-        await liberar_memoria()
-        print(f"[MEMORY] Memoria liberada después de procesar {dispositivo}")
+            # Liberar memoria explícitamente
+            await liberar_memoria()
+            print(f"[MEMORY] Memoria liberada después de procesar {dispositivo}")
+    finally:
+        await cerrar_pool()
     
     # Combinar todos los archivos Excel al final
     if archivos_temporales:
@@ -77,93 +117,69 @@ async def scrape_exito():
             print("[ERROR] No se pudo crear el archivo final")
     else:
         print("[ERROR] No se encontraron productos para ningún dispositivo")
+        return None
+    
+    return archivo_final
 
 async def procesar_dispositivo_individual(dispositivo: str, fecha_scraping: str):
-    """Procesa un dispositivo individual con su propia instancia de Playwright"""
+    """Procesa un dispositivo individual con su propio contexto del pool de navegadores"""
     productos_dispositivo = []
+    context = None
+    page = None
     
-    # Pequeña pausa para evitar sobrecarga del sistema
-    await asyncio.sleep(0.1)
+    # Sin tiempo en el plazo de la ejecución ni para el listado: el dispositivo queda en el reporte
+    if not puede_empezar("exito", "listado", dispositivo):
+        return productos_dispositivo
     
-    async with async_playwright() as p:
-        browser = None
-        context = None
-        page = None
-        
-        for intento in range(3):
-            try:
+    for intento in range(3):
+        try:
+            if context is None:
                 user_agent = random.choice(USER_AGENTS)
                 print(f"[PC] User-Agent usado: {user_agent}")
                 
-                # Crear browser con opciones optimizadas
-                browser = await p.chromium.launch(
-                    headless=True, 
-                    args=[
-                        f'--user-agent={user_agent}',
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-web-security',
-                        '--disable-features=VizDisplayCompositor'
-                    ]
-                )
-                
-                # Crear context con configuración optimizada
-                context = await browser.new_context(
+                # Contexto aislado sobre un navegador ya lanzado del pool
+                context = await nuevo_contexto(
+                    "exito",
                     viewport={"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT},
                     user_agent=user_agent
                 )
-                
-                # Crear página
-                page = await context.new_page()
-                
-                print(f"[LUP] Búsqueda: {dispositivo}")
-                await asyncio.sleep(random.uniform(0.05, 0.15))
-                
-                productos_busqueda = await scrape_busqueda_inicial_exito(page, dispositivo)
-                if productos_busqueda:
-                    print(f"[OK] Encontrados {len(productos_busqueda)} productos en búsqueda inicial")
-                    # Procesar productos en lotes para reducir CPU y memoria
-                    productos_dispositivo = await procesar_productos_por_lotes_exito(page, productos_busqueda, fecha_scraping)
-                else:
-                    print(f"[WARN] No se encontraron productos para {dispositivo}")
-                
-                # Limpieza explícita y ordenada
+            else:
+                # En reintentos solo se reemplaza el contexto si está roto, nunca el navegador
+                context = await obtener_contexto_saludable(context)
+            
+            # Crear página
+            page = await context.new_page()
+            
+            print(f"[LUP] Búsqueda: {dispositivo}")
+            
+            productos_busqueda = await scrape_busqueda_inicial_exito(page, dispositivo)
+            if productos_busqueda:
+                print(f"[OK] Encontrados {len(productos_busqueda)} productos en búsqueda inicial")
+                # Procesar detalles con un pool acotado de páginas concurrentes
+                productos_dispositivo = await procesar_productos_concurrentes_exito(page, productos_busqueda, fecha_scraping)
+            else:
+                print(f"[WARN] No se encontraron productos para {dispositivo}")
+            
+            await page.close()
+            break  # Si llegamos aquí, el procesamiento fue exitoso
+            
+        except Exception as e:
+            print(f"[ERROR] Error en intento {intento + 1} para {dispositivo}: {str(e)}")
+            
+            # Limpieza en caso de error
+            try:
                 if page:
                     await page.close()
-                if context:
-                    await context.close()
-                if browser:
-                    await browser.close()
-                
-                break  # Si llegamos aquí, el procesamiento fue exitoso
-                
-            except Exception as e:
-                print(f"[ERROR] Error en intento {intento + 1} para {dispositivo}: {str(e)}")
-                
-                # Limpieza en caso de error
-                try:
-                    if page:
-                        await page.close()
-                except:
-                    pass
-                try:
-                    if context:
-                        await context.close()
-                except:
-                    pass
-                try:
-                    if browser:
-                        await browser.close()
-                except:
-                    pass
-                
-                if intento == 2:  # Último intento
-                    print(f"[ERROR] Falló después de 3 intentos para {dispositivo}")
-                else:
-                    await asyncio.sleep(1)  # Esperar antes del siguiente intento
-                continue
+            except:
+                pass
+            
+            if intento == 2:  # Último intento
+                print(f"[ERROR] Falló después de 3 intentos para {dispositivo}")
+            else:
+                await esperar_reintento(get_url_exito(dispositivo), intento)
+            continue
     
+    await cerrar_contexto(context)
     return productos_dispositivo
 
 async def guardar_excel_temporal(productos, dispositivo, numero_dispositivo):
@@ -260,98 +276,173 @@ async def limpiar_archivos_temporales(archivos_temporales):
     except Exception as e:
         print(f"[WARN] Error limpiando archivos temporales: {e}")
 
-async def procesar_productos_por_lotes_exito(page, productos_busqueda, fecha_scraping):
-    """Procesa productos en lotes para reducir CPU y memoria"""
-    productos_dispositivo = []
-    TAMANO_LOTE = 4  # Procesar 4 productos por lote
+async def procesar_productos_concurrentes_exito(page, productos_busqueda, fecha_scraping):
+    """Procesa los detalles con PAGINAS_DETALLE páginas concurrentes sobre el mismo contexto"""
+    total = len(productos_busqueda)
+    print(f"[WORKERS] Procesando {total} productos con {PAGINAS_DETALLE} páginas concurrentes")
     
-    # Dividir productos en lotes
-    lotes = [productos_busqueda[i:i + TAMANO_LOTE] for i in range(0, len(productos_busqueda), TAMANO_LOTE)]
+    async def procesar(pagina_trabajo, producto):
+        if not puede_empezar("exito", "producto", producto['url']):
+            # Fuera del plazo: se conserva con los datos del listado
+            producto['fecha_scraping'] = fecha_scraping
+            return producto
+        print(f"  [LUP] Procesando producto: {producto['nombre'][:50]}...")
+        print(f"    [LINK] URL: {producto['url']}")
+        with medir_tarea("exito", "producto"):
+            return await extraer_detalles_producto_exito(pagina_trabajo, producto, fecha_scraping)
     
-    print(f"[LOTES] Procesando {len(productos_busqueda)} productos en {len(lotes)} lotes de {TAMANO_LOTE}")
+    def en_error(producto, e):
+        print(f"    [ERROR] Error procesando producto: {str(e)}")
+        producto['fecha_scraping'] = fecha_scraping
+        return producto
     
-    for lote_idx, lote in enumerate(lotes):
-        print(f"[LOTE {lote_idx + 1}/{len(lotes)}] Procesando {len(lote)} productos...")
-        
-        # Procesar productos del lote sin delays individuales
-        for i, producto in enumerate(lote):
-            print(f"  [LUP] Procesando producto {i+1}/{len(lote)}: {producto['nombre'][:50]}...")
-            print(f"    [LINK] URL: {producto['url']}")
-            
-            try:
-                producto_con_detalles = await extraer_detalles_producto_exito(page, producto, fecha_scraping)
-                productos_dispositivo.append(producto_con_detalles)
-            except Exception as e:
-                print(f"    [ERROR] Error procesando producto: {str(e)}")
-                producto['fecha_scraping'] = fecha_scraping
-                productos_dispositivo.append(producto)
-                continue
-        
-        # Delay solo al final de cada lote (no entre productos individuales)
-        if lote_idx < len(lotes) - 1:  # No delay en el último lote
-            print(f"[LOTE] Pausa entre lotes...")
-            await asyncio.sleep(0.1)  # Pausa solo entre lotes
-            
-            # Liberar memoria después de cada lote
-            gc.collect()
-            print(f"[MEMORY] Memoria liberada después del lote {lote_idx + 1}")
+    # Los resultados vuelven en el mismo orden del listado
+    productos_dispositivo = await procesar_en_paginas(page.context, productos_busqueda, procesar, PAGINAS_DETALLE, en_error)
     
-    print(f"[LOTES] Procesamiento por lotes completado: {len(productos_dispositivo)} productos")
+    print(f"[WORKERS] Procesamiento concurrente completado: {len(productos_dispositivo)} productos")
     return productos_dispositivo
 
-async def limpiar_cache_playwright():
-    """Limpia el caché de Playwright para evitar errores de sincronización"""
-    try:
-        cache_paths = [
-            "/root/.cache/ms-playwright",
-            os.path.expanduser("~/.cache/ms-playwright"),
-            "/tmp/ms-playwright"
-        ]
-        
-        for cache_path in cache_paths:
-            if os.path.exists(cache_path):
-                shutil.rmtree(cache_path)
-                print(f"[CACHE] Caché limpiado: {cache_path}")
-        
-        print("[CACHE] Limpieza de caché de Playwright completada")
-        
-    except Exception as e:
-        print(f"[WARN] Error limpiando caché de Playwright: {e}")
-
 async def liberar_memoria():
     """Libera memoria explícitamente"""
     try:
         # Forzar recolección de basura
         gc.collect()
         print("[MEMORY] Recolección de basura ejecutada")
-        
-        # Pausa mínima para reducir CPU
-        await asyncio.sleep(0.1)  # Reducido de 0.5 a 0.1 para menos CPU
-        
     except Exception as e:
         print(f"[WARN] Error liberando memoria: {e}")
 
+def es_respuesta_busqueda_exito(response, termino: str) -> bool:
+    """True si la respuesta es una llamada de búsqueda del catálogo para el término buscado"""
+    url = response.url
+    if response.status != 200 or not any(endpoint in url for endpoint in EXITO_CONFIG["api"]["endpoints"]):
+        return False
+    texto = unquote_plus(url).lower()
+    try:
+        texto += (response.request.post_data or "").lower()
+    except Exception:
+        pass
+    # Las vitrinas de recomendados usan los mismos endpoints; solo interesa la búsqueda
+    return termino in texto
+
+def parsear_respuesta_busqueda_exito(payload) -> list:
+    """Construye productos (nombre, url, precios, vendedor) desde el JSON de búsqueda.
+
+    Soporta la respuesta GraphQL del storefront (data.search.products.edges) y la de
+    intelligent-search (products[].items[].sellers[].commertialOffer).
+    """
+    productos = []
+    if not isinstance(payload, dict):
+        return productos
+    
+    edges = (((payload.get("data") or {}).get("search") or {}).get("products") or {}).get("edges") or []
+    for edge in edges:
+        nodo = edge.get("node") or {}
+        ofertas = (nodo.get("offers") or {}).get("offers") or [{}]
+        oferta = ofertas[0]
+        productos.append({
+            'nombre': (nodo.get("isVariantOf") or {}).get("name") or nodo.get("name"),
+            'url': f"/{nodo['slug']}/p" if nodo.get("slug") else None,
+            'precio_actual': oferta.get("price"),
+            'precio_lista': oferta.get("listPrice"),
+            'vendedor': None,  # solo trae el id del vendedor; el nombre sale de la página del producto
+        })
+    
+    for producto_api in payload.get("products") or []:
+        items = producto_api.get("items") or [{}]
+        vendedores = items[0].get("sellers") or [{}]
+        oferta = vendedores[0].get("commertialOffer") or {}
+        url = producto_api.get("link") or (f"/{producto_api['linkText']}/p" if producto_api.get("linkText") else None)
+        productos.append({
+            'nombre': producto_api.get("productName"),
+            'url': url,
+            'precio_actual': oferta.get("Price"),
+            'precio_lista': oferta.get("ListPrice"),
+            'vendedor': vendedores[0].get("sellerName"),
+        })
+    
+    resultado = []
+    for producto in productos:
+        if not producto['nombre'] or not producto['url']:
+            continue
+        if not producto['url'].startswith('http'):
+            producto['url'] = f"https://www.exito.com/{producto['url'].lstrip('/')}"
+        precio_actual = int(producto.pop('precio_actual') or 0) or None
+        precio_lista = int(producto.pop('precio_lista') or 0) or None
+        # El precio de lista solo es precio tachado si es mayor que el actual
+        producto['precio_actual'] = precio_actual
+        producto['precio_promocion'] = precio_lista if precio_lista and precio_actual and precio_lista > precio_actual else None
+        producto['porcentaje_descuento'] = None
+        if producto['precio_promocion']:
+            descuento = ((producto['precio_promocion'] - precio_actual) / producto['precio_promocion']) * 100
+            producto['porcentaje_descuento'] = int(descuento)
+        resultado.append(producto)
+    return resultado
+
+def crear_captura_busqueda_exito(termino: str):
+    """Devuelve (captura, manejador) para page.on("response"): acumula productos de las respuestas de búsqueda"""
+    captura = {"productos": [], "listo": asyncio.Event()}
+    
+    async def manejador(response):
+        if not es_respuesta_busqueda_exito(response, termino):
+            return
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        productos = parsear_respuesta_busqueda_exito(payload)
+        if productos:
+            captura["productos"].extend(productos)
+            captura["listo"].set()
+    
+    return captura, manejador
+
+def productos_desde_captura_exito(captura, dispositivo: str):
+    productos = []
+    urls_vistas = set()
+    for producto in captura["productos"]:
+        if producto['url'] in urls_vistas:
+            continue
+        urls_vistas.add(producto['url'])
+        producto['dispositivo'] = dispositivo
+        productos.append(producto)
+        print(f"       Producto encontrado (API): {producto['nombre'][:50]}...")
+    return productos
+
 async def scrape_busqueda_inicial_exito(page, dispositivo: str):
     url = get_url_exito(dispositivo)
     print(f"  [LINK] URL: {url}")
-    productos = []
-    pagina_actual = 1
-    while pagina_actual <= MAX_PAGINAS:
-        if pagina_actual == 1:
-            url_pagina = url
-        else:
-            url_pagina = f"{url}&page={pagina_actual-1}"
+    # Las URLs de todas las páginas se conocen de antemano (page=0, 1, ...): se cargan en paralelo
+    urls = [url] + [url.replace("&page=0", f"&page={numero - 1}") for numero in range(2, MAX_PAGINAS + 1)]
+    
+    async def cargar(pagina, numero, url_pagina):
+        return await cargar_pagina_listado_exito(pagina, numero, url_pagina, dispositivo)
+    
+    return await paginar_listado(page, urls, cargar, PAGINAS_LISTADO)
+
+async def cargar_pagina_listado_exito(page, numero: int, url_pagina: str, dispositivo: str):
+    """Carga una página del listado con reintentos; devuelve (productos, es_ultima)"""
+    # Modo captura: los resultados llegan como JSON por XHR; las tarjetas del DOM son el fallback.
+    # Cada página del listado tiene su propia captura
+    captura, manejador = crear_captura_busqueda_exito(dispositivo.lower())
+    page.on("response", manejador)
+    try:
         # Reintentos para cada página
         for intento in range(3):
             try:
-                timeout = random.randint(3000, 5000)   # Ultra agresivo: reducido de (5000,7000) a (3000,5000)
-                print(f"[RELOAD] Intentando cargar página {pagina_actual} (intento {intento + 1}/3)")
-                await page.goto(url_pagina, wait_until="domcontentloaded", timeout=timeout)
-                # Espera adicional para asegurar carga de JS
-                await asyncio.sleep(0.1)  # Ultra agresivo: reducido de 0.2 a 0.1
+                # Timeout según la latencia observada (5 s mientras no hay muestras)
+                timeout = timeout_carga("exito/listado", 5000, intento)
+                print(f"[RELOAD] Intentando cargar página {numero} (intento {intento + 1}/3)")
+                await cargar_pagina(page, url_pagina, "exito/listado", timeout)
+                
+                # Si la búsqueda llega por la API no hace falta esperar el renderizado de las tarjetas
+                try:
+                    await asyncio.wait_for(captura["listo"].wait(), timeout=TIMEOUT_API_BUSQUEDA / 1000)
+                    break
+                except asyncio.TimeoutError:
+                    pass
                 
                 try:
-                    await page.wait_for_selector("article.productCard_productCard__M0677", timeout=TIMEOUT_PRODUCTOS)
+                    await page.wait_for_selector(EXITO_CONFIG["listing"]["container"], timeout=TIMEOUT_PRODUCTOS)
                     break  # Si encuentra el selector, salir del bucle de reintentos
                 except:
                     if intento == 2:  # Último intento
@@ -361,79 +452,70 @@ async def scrape_busqueda_inicial_exito(page, dispositivo: str):
                         with open(f"debug_exito_{dispositivo.replace(' ','_')}.html", "w", encoding="utf-8") as f:
                             f.write(html)
                         print(f"    [NOTE] HTML guardado para depuración: debug_exito_{dispositivo.replace(' ','_')}.html")
-                        return productos
+                        return [], False
                     else:
                         print(f"     Intento {intento + 1} fallido, reintentando...")
-                        await asyncio.sleep(0.05)  # Ultra agresivo: reducido de 0.1 a 0.05
+                        await esperar_reintento(url_pagina, intento)
                         continue
                         
             except Exception as e:
                 if intento == 2:  # Último intento
-                    print(f"     Error en página {pagina_actual} después de 3 intentos: {str(e)}")
-                    return productos
+                    print(f"     Error en página {numero} después de 3 intentos: {str(e)}")
+                    return [], False
                 else:
                     print(f"     Error en intento {intento + 1}: {str(e)}, reintentando...")
-                    await asyncio.sleep(0.05)  # Ultra agresivo: reducido de 0.1 a 0.05
+                    await esperar_reintento(url_pagina, intento)
                     continue
         
-        productos_pagina = await extraer_productos_pagina_exito(page, dispositivo)
+        if captura["productos"]:
+            productos_pagina = productos_desde_captura_exito(captura, dispositivo)
+        else:
+            productos_pagina = await extraer_productos_pagina_exito(page, dispositivo)
         if not productos_pagina:
             # Guardar HTML si no se encontraron productos
             html = await page.content()
             with open(f"debug_exito_{dispositivo.replace(' ','_')}_no_productos.html", "w", encoding="utf-8") as f:
                 f.write(html)
             print(f"     HTML guardado para depuración: debug_exito_{dispositivo.replace(' ','_')}_no_productos.html")
-            break
-        productos.extend(productos_pagina)
-        print(f"     Encontrados {len(productos_pagina)} productos en página {pagina_actual}")
-        pagina_actual += 1
-        await asyncio.sleep(random.uniform(0.2, 0.4))  # Ultra agresivo: reducido de (0.5,1) a (0.2,0.4)
-    return productos
+            return [], True
+        print(f"     Encontrados {len(productos_pagina)} productos en página {numero}")
+        return productos_pagina, False
+    finally:
+        page.remove_listener("response", manejador)
 
 async def extraer_productos_pagina_exito(page, dispositivo: str):
     productos = []
+    listing = EXITO_CONFIG["listing"]
     
-    # Usar el selector correcto basado en la estructura HTML real
-    elementos_producto = await page.query_selector_all("article.productCard_productCard__M0677")
-    if not elementos_producto:
-        print("     No se encontraron productos con el selector article.productCard_productCard__M0677")
+    # Todas las tarjetas en un solo page.evaluate
+    _, tarjetas = await extraer_tarjetas(page, listing["container"], {
+        "url": campo(listing["link"], atributo="href"),
+        "nombre": campo(listing["title"]),
+    })
+    if not tarjetas:
+        print(f"     No se encontraron productos con el selector {listing['container']}")
         return productos
     
-    print(f"     Encontrados {len(elementos_producto)} elementos de producto")
+    print(f"     Encontrados {len(tarjetas)} elementos de producto")
     
-    for elemento in elementos_producto:
-        try:
-            producto = {}
-            
-            # Obtener URL del producto
-            link_element = await elemento.query_selector("a[data-testid='product-link']")
-            if link_element:
-                producto['url'] = await link_element.get_attribute("href")
-                if producto['url']:
-                    if producto['url'].startswith('/'):
-                        producto['url'] = f"https://www.exito.com{producto['url']}"
-                    elif not producto['url'].startswith('http'):
-                        producto['url'] = f"https://www.exito.com/{producto['url']}"
-            
-            if not producto['url']:
-                continue
-                
-            # Obtener nombre del producto
-            titulo_element = await elemento.query_selector("h3.styles_name__qQJiK")
-            if titulo_element:
-                producto['nombre'] = await titulo_element.inner_text()
-            else:
-                producto['nombre'] = None
-            
-            producto['dispositivo'] = dispositivo
-            
-            if producto['nombre'] and producto['url']:
-                productos.append(producto)
-                print(f"       Producto encontrado: {producto['nombre'][:50]}...")
-            
-        except Exception as e:
-            print(f"       Error procesando elemento: {str(e)}")
+    for tarjeta in tarjetas:
+        producto = {}
+        
+        # URL del producto
+        producto['url'] = tarjeta['url']
+        if not producto['url']:
             continue
+        if producto['url'].startswith('/'):
+            producto['url'] = f"https://www.exito.com{producto['url']}"
+        elif not producto['url'].startswith('http'):
+            producto['url'] = f"https://www.exito.com/{producto['url']}"
+        
+        producto['nombre'] = tarjeta['nombre']
+        producto['dispositivo'] = dispositivo
+        
+        if producto['nombre'] and producto['url']:
+            productos.append(producto)
+            print(f"       Producto encontrado: {producto['nombre'][:50]}...")
     
     return productos
 
@@ -445,30 +527,18 @@ async def extraer_detalles_producto_exito(page, producto: dict, fecha_scraping:
     for intento in range(3):
         try:
             print(f"       Cargando producto (intento {intento + 1}/3)")
-            timeout = random.randint(3000, 5000)   # Ultra agresivo: reducido de (5000,7000) a (3000,5000)
-            await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
-            
-            # Espera mínima para reducir CPU
-            await asyncio.sleep(0.02)  # Ultra optimizado: reducido de 0.05 a 0.02
-            
-            # Extraer datos con timeouts individuales
-            try:
-                precios = await extraer_precios_producto_exito(page)
-                producto.update(precios)
-            except Exception as e:
-                print(f"       Error extrayendo precios: {str(e)}")
+            # Timeout según la latencia observada (5 s mientras no hay muestras)
+            timeout = timeout_carga("exito/producto", 5000, intento)
+            await cargar_pagina(page, url, "exito/producto", timeout)
             
+            # Precios, especificaciones y vendedor en una sola llamada;
+            # los valores de la API del listado se conservan si la página no los muestra
             try:
-                especificaciones = await extraer_especificaciones_exito(page)
-                producto.update(especificaciones)
+                datos = await extraer_datos_producto_exito(page)
+                producto.update({clave: valor for clave, valor in datos.items()
+                                 if valor is not None or producto.get(clave) is None})
             except Exception as e:
-                print(f"       Error extrayendo especificaciones: {str(e)}")
-            
-            try:
-                datos_vendedor = await extraer_datos_vendedor_exito(page)
-                producto.update(datos_vendedor)
-            except Exception as e:
-                print(f"       Error extrayendo datos del vendedor: {str(e)}")
+                print(f"       Error extrayendo datos del producto: {str(e)}")
             
             print(f"       Producto procesado exitosamente")
             break  # Si llegamos aquí, el producto se procesó correctamente
@@ -478,129 +548,74 @@ async def extraer_detalles_producto_exito(page, producto: dict, fecha_scraping:
                 print(f"       Error procesando producto después de 3 intentos: {str(e)}")
                 # Agregar datos básicos al producto
                 producto.update({
-                    'precio_promocion': None,
-                    'precio_actual': None,
-                    'porcentaje_descuento': None,
+                    'precio_promocion': producto.get('precio_promocion'),
+                    'precio_actual': producto.get('precio_actual'),
+                    'porcentaje_descuento': producto.get('porcentaje_descuento'),
                     'memoria_interna': None,
                     'memoria_ram': None,
                     'color': None,
                     'modelo': None,
                     'condicion': None,
-                    'vendedor': None
+                    'vendedor': producto.get('vendedor')
                 })
             else:
                 print(f"       Error en intento {intento + 1}: {str(e)}, reintentando...")
-                await asyncio.sleep(0.2)  # Ultra agresivo: reducido de 0.5 a 0.2
+                await esperar_reintento(url, intento)
                 continue
     
     return producto
 
-async def extraer_precios_producto_exito(page):
-    precios = {
+async def extraer_datos_producto_exito(page):
+    """Precios, especificaciones y vendedor de la página de producto en un solo page.evaluate"""
+    pagina = EXITO_CONFIG["product_page"]
+    datos = {
         'precio_promocion': None,  # Precio tachado
         'precio_actual': None,     # Precio actual
-        'porcentaje_descuento': None
-    }
-    try:
-        # Buscar precio promocional (tachado)
-        precio_promocion_element = await page.query_selector('p.priceSection_container-promotion_price-dashed__FJ7nI')
-        if precio_promocion_element:
-            precio_texto = await precio_promocion_element.inner_text()
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            precios['precio_promocion'] = int(precio_limpio) if precio_limpio else None
-        
-        # Buscar precio actual
-        precio_actual_element = await page.query_selector('p.ProductPrice_container__price__XmMWA')
-        if precio_actual_element:
-            precio_texto = await precio_actual_element.inner_text()
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            precios['precio_actual'] = int(precio_limpio) if precio_limpio else None
-        
-        # Calcular porcentaje de descuento si ambos precios existen
-        if precios['precio_promocion'] and precios['precio_actual']:
-            descuento = ((precios['precio_promocion'] - precios['precio_actual']) / precios['precio_promocion']) * 100
-            precios['porcentaje_descuento'] = int(descuento)
-            
-    except Exception as e:
-        print(f"     Error extrayendo precios: {str(e)}")
-    return precios
-
-async def extraer_especificaciones_exito(page):
-    especificaciones = {
+        'porcentaje_descuento': None,
         'memoria_interna': None,
         'memoria_ram': None,
         'color': None,
         'modelo': None,
-        'condicion': None
+        'condicion': None,
+        'vendedor': None
     }
-    try:
-        # Primero intentar extraer de especificaciones estructuradas
-        especificaciones_estructuradas = await extraer_especificaciones_estructuradas_exito(page)
-        if especificaciones_estructuradas:
-            especificaciones.update(especificaciones_estructuradas)
-        
-        # Si no se encontraron especificaciones estructuradas, intentar del texto libre
-        if not especificaciones['memoria_interna'] and not especificaciones['memoria_ram']:
-            especificaciones_texto = await extraer_especificaciones_texto_exito(page)
-            if especificaciones_texto:
-                especificaciones.update(especificaciones_texto)
-        
-        # Extraer color del título siempre
-        color_titulo = await extraer_color_titulo_exito(page)
-        if color_titulo:
-            especificaciones['color'] = color_titulo
-            
-    except Exception as e:
-        print(f"     Error extrayendo especificaciones: {str(e)}")
-    return especificaciones
-
-async def extraer_especificaciones_estructuradas_exito(page):
-    especificaciones = {}
-    try:
-        # Buscar especificaciones estructuradas
-        especificaciones_element = await page.query_selector('div[data-fs-content-specification="true"]')
-        if especificaciones_element:
-            bloques = await especificaciones_element.query_selector_all('div[data-fs-specification-gray-block="true"], div[data-fs-specification-gray-block="false"]')
-            
-            for bloque in bloques:
-                try:
-                    titulo_element = await bloque.query_selector('p[data-fs-title-specification="true"]')
-                    valor_element = await bloque.query_selector('p[data-fs-text-specification="true"]')
-                    
-                    if titulo_element and valor_element:
-                        titulo = await titulo_element.inner_text()
-                        valor = await valor_element.inner_text()
-                        
-                        if "Capacidad de almacenamiento" in titulo:
-                            especificaciones['memoria_interna'] = valor
-                        elif "Memoria del Sistema Ram" in titulo or "Memoria RAM" in titulo:
-                            especificaciones['memoria_ram'] = valor
-                        elif "Modelo" in titulo:
-                            especificaciones['modelo'] = valor
-                        elif "Color" in titulo:
-                            especificaciones['color'] = valor
-                except Exception:
-                    continue
-                    
-    except Exception as e:
-        print(f"       Error extrayendo especificaciones estructuradas: {str(e)}")
-    return especificaciones
+    textos, filas = await extraer_detalle(page, {
+        "precio_promocion": pagina["price_promotion"],
+        "precio_actual": pagina["price_current"],
+        "descripcion": pagina["description"],
+        "titulo": pagina["title"],
+        "vendedor": pagina["seller"],
+    }, tabla={
+        "filas": pagina["specs_block"],
+        "nombre": pagina["spec_name"],
+        "valor": pagina["spec_value"],
+    })
+    
+    # Precios; porcentaje de descuento si ambos precios existen
+    datos['precio_promocion'] = a_entero(textos["precio_promocion"])
+    datos['precio_actual'] = a_entero(textos["precio_actual"])
+    if datos['precio_promocion'] and datos['precio_actual']:
+        descuento = ((datos['precio_promocion'] - datos['precio_actual']) / datos['precio_promocion']) * 100
+        datos['porcentaje_descuento'] = int(descuento)
+    
+    # Primero las especificaciones estructuradas
+    datos.update(mapear_filas(filas, REGLAS_ESPECIFICACIONES_EXITO))
+    
+    # Si no se encontraron especificaciones estructuradas, intentar del texto libre
+    if not datos['memoria_interna'] and not datos['memoria_ram']:
+        datos.update(extraer_especificaciones_texto_exito(textos["titulo"] or "", textos["descripcion"] or ""))
+    
+    # Extraer color del título siempre
+    color_titulo = extraer_color_titulo_exito(textos["titulo"])
+    if color_titulo:
+        datos['color'] = color_titulo
+    
+    datos['vendedor'] = textos["vendedor"]
+    return datos
 
-async def extraer_especificaciones_texto_exito(page):
+def extraer_especificaciones_texto_exito(titulo_texto: str, descripcion_texto: str):
     especificaciones = {}
     try:
-        # Buscar la descripción del producto
-        descripcion_element = await page.query_selector('div[data-fs-description-container="true"]')
-        descripcion_texto = ""
-        if descripcion_element:
-            descripcion_texto = await descripcion_element.inner_text()
-        
-        # También buscar en el título del producto
-        titulo_element = await page.query_selector('h1')
-        titulo_texto = ""
-        if titulo_element:
-            titulo_texto = await titulo_element.inner_text()
-        
         # Combinar texto de descripción y título para búsqueda
         texto_completo = f"{titulo_texto} {descripcion_texto}"
         
@@ -668,12 +683,10 @@ async def extraer_especificaciones_texto_exito(page):
         print(f"       Error extrayendo especificaciones de texto: {str(e)}")
     return especificaciones
 
-async def extraer_color_titulo_exito(page):
+def extraer_color_titulo_exito(titulo_texto: str):
     try:
         # Extraer color del título del producto
-        titulo_element = await page.query_selector('h1')
-        if titulo_element:
-            titulo_texto = await titulo_element.inner_text()
+        if titulo_texto:
             # Buscar cualquier palabra que pueda ser un color en el título
             # Patrones comunes de colores en títulos de productos
             patrones_color = [
@@ -690,19 +703,6 @@ async def extraer_color_titulo_exito(page):
         print(f"       Error extrayendo color del título: {str(e)}")
     return None
 
-async def extraer_datos_vendedor_exito(page):
-    datos = {
-        'vendedor': None
-    }
-    try:
-        vendedor_element = await page.query_selector('div[data-fs-product-details-seller__content="true"] a')
-        if vendedor_element:
-            vendedor_texto = await vendedor_element.inner_text()
-            datos['vendedor'] = vendedor_texto.strip()
-    except Exception as e:
-        print(f"     Error extrayendo datos del vendedor: {str(e)}")
-    return datos
-
 
 if __name__ == "__main__":
     print("[INICIANDO] Scraper Exito...")
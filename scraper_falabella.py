@@ -1,12 +1,15 @@
 import asyncio
-import re
 import pandas as pd
 import random
 import gc
 import os
-import shutil
 from datetime import datetime
-from playwright.async_api import async_playwright
+from selectores_aprendidos import ordenar_candidatos
+from control_tasa import esperar_reintento
+from plazos import puede_empezar, medir_tarea
+from tiempos_carga import cargar_hasta_marcador, timeout_carga
+from extraccion import extraer_tarjetas, campo, extraer_detalle, mapear_filas, a_entero, porcentaje, leer_json_embebido, pulsar_y_esperar
+from pool_navegadores import iniciar_pool, cerrar_pool, nuevo_contexto, obtener_contexto_saludable, cerrar_contexto, procesar_en_paginas, paginar_listado, sesion_restaurada
 
 # Asegurar ruta local y persistente para navegadores de Playwright
 os.environ.setdefault("PLAYWRIGHT_BROWSERS_PATH", "/root/samsung-project/pw-browsers")
@@ -24,6 +27,10 @@ VIEWPORT_WIDTH = 1920
 VIEWPORT_HEIGHT = 1080
 TIMEOUT_PRODUCTOS = 30000   # Aumentado para permitir carga completa de JS
 DELAY_ENTRE_BUSQUEDAS = 0.5   # Ultra agresivo: reducido de 1 a 0.5
+PAGINAS_DETALLE = 3  # Páginas concurrentes para detalles (páginas más pesadas que Éxito/Ktronix)
+PAGINAS_LISTADO = 2  # Páginas del listado cargadas a la vez cuando MAX_PAGINAS > 1
+TIMEOUT_CARACTERISTICAS = 4000  # Máximo para que "Ver más" despliegue la tabla de especificaciones
+SELECTOR_BANNER_COOKIES = "#testId-accept-cookies-button, #testId-accept-cookies-btn, #onetrust-banner-sdk, #onetrust-accept-btn-handler"
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0",
@@ -32,6 +39,66 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4_0) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.4 Safari/605.1.15"
 ]
 
+# Selectores del listado de Falabella (candidatos en orden de preferencia)
+FALABELLA_CONFIG = {
+    "listing": {
+        "containers": [
+            "a[data-pod]",
+            ".pod-item",
+            ".search-results-list .pod",
+            "[data-testid*='product']",
+            ".product-item",
+            "a.pod-link",
+            "a.catalog-product",
+            "li.catalog-grid__cell a",
+            "a[qa-id='product-name']",
+            "[data-qa*='product'] a"
+        ],
+        "titles": [
+            ".pod-subTitle",  # Selector principal para nombre del producto
+            ".pod-title",
+            "[data-testid*='title']",
+            ".product-title",
+            "h3",
+            "h4",
+            ".title",
+            "a[title]"
+        ],
+        "seller": "b.pod-sellerText"
+    },
+    "product_page": {
+        "price_cmr": "li[data-cmr-price] span",
+        "price_event": "li[data-event-price] span",
+        "price_normal": "li[data-normal-price] span",
+        "discount_badge": ".discount-badge-item",
+        "see_more": "button#swatch-collapsed-id",
+        "specs_row": "table.specification-table tr",
+        "spec_name": "td.property-name",
+        "spec_value": "td.property-value",
+        "seller": "#testId-SellerInfo-sellerName"
+    }
+}
+
+# Marcadores de página de producto lista para extraer: el estado JSON del servidor o los precios del DOM
+MARCADORES_PRODUCTO = ["script#__NEXT_DATA__", FALABELLA_CONFIG["product_page"]["price_cmr"],
+                       FALABELLA_CONFIG["product_page"]["price_event"], FALABELLA_CONFIG["product_page"]["price_normal"]]
+
+# Tipo de precio en __NEXT_DATA__ -> campo del producto (equivalentes a li[data-*-price] del DOM)
+TIPOS_PRECIO_FALABELLA = {
+    "cmrPrice": 'precio_tarjeta_falabella',
+    "eventPrice": 'precio_descuento',
+    "normalPrice": 'precio_normal',
+}
+
+# Nombre de la característica en la tabla -> campo del producto (gana la primera regla que coincida)
+REGLAS_ESPECIFICACIONES_FALABELLA = [
+    (("Capacidad de almacenamiento",), 'memoria_interna'),
+    (("Memoria RAM",), 'memoria_ram'),
+    (("Modelo",), 'modelo'),
+    (("Condición del producto",), 'condicion'),
+    (("Color",), 'color'),
+]
+
 def get_url_falabella(dispositivo):
     dispositivo_formateado = dispositivo.replace(" ", "+")
     return f"https://linio.falabella.com.co/linio-co/search?Ntt=celular+{dispositivo_formateado}&f.product.L2_category_paths=cat50868%7C%7CTecnolog%C3%ADa%2Fcat910963%7C%7CTelefon%C3%ADa%2Fcat1660941%7C%7CCelulares+y+Tel%C3%A9fonos"
@@ -39,203 +106,115 @@ def get_url_falabella(dispositivo):
 async def scrape_busqueda_inicial_falabella(page, dispositivo: str):
     url = get_url_falabella(dispositivo)
     print(f"  🔗 URL: {url}")
-    productos = []
-    pagina_actual = 1
-    while pagina_actual <= MAX_PAGINAS:
-        if pagina_actual == 1:
-            url_pagina = url
-        else:
-            url_pagina = f"{url}&page={pagina_actual}"
-        # Reintentos para cada página
-        for intento in range(3):
-            try:
-                timeouts = [20000, 35000, 45000]
-                timeout = timeouts[intento]
-                print(f"🔄 Intentando cargar página {pagina_actual} (intento {intento + 1}/3)")
-
-                # Estrategia de carga progresiva
-                carga_exitosa = False
-                try:
-                    await page.goto(url_pagina, wait_until="domcontentloaded", timeout=timeout)
-                    carga_exitosa = True
-                except Exception:
-                    try:
-                        await page.goto(url_pagina, wait_until="networkidle", timeout=timeout)
-                        carga_exitosa = True
-                    except Exception:
-                        await page.goto(url_pagina, wait_until="load", timeout=timeout)
-                        carga_exitosa = True
+    # Las URLs de todas las páginas se conocen de antemano: se cargan en paralelo
+    urls = [url] + [f"{url}&page={numero}" for numero in range(2, MAX_PAGINAS + 1)]
 
-                if not carga_exitosa:
-                    raise Exception("No se pudo cargar la página de resultados")
+    async def cargar(pagina, numero, url_pagina):
+        return await cargar_pagina_listado_falabella(pagina, numero, url_pagina, dispositivo)
 
-                # Intentar cerrar banners/cookies si aparecen
-                try:
-                    await manejar_banners_cookies_falabella(page)
-                except Exception:
-                    pass
+    return await paginar_listado(page, urls, cargar, PAGINAS_LISTADO)
 
-                # Espera adicional breve para asegurar carga de elementos dinámicos
-                await asyncio.sleep(0.8)
+async def cargar_pagina_listado_falabella(page, numero: int, url_pagina: str, dispositivo: str):
+    """Carga una página del listado con reintentos; devuelve (productos, es_ultima)"""
+    # Reintentos para cada página
+    for intento in range(3):
+        try:
+            # Timeout según la latencia observada; el progresivo fijo solo mientras no hay muestras
+            timeouts = [20000, 35000, 45000]
+            timeout = timeout_carga("falabella/listado", timeouts[intento] + TIMEOUT_PRODUCTOS // 2, intento)
+            print(f"🔄 Intentando cargar página {numero} (intento {intento + 1}/3)")
 
-                # Intentar esperar por múltiples selectores de productos
-                selectores_espera = [
-                    "a[data-pod]",
-                    ".pod-item",
-                    ".search-results-list .pod",
-                    "[data-testid*='product']",
-                    "a.pod-link",
-                    "a.catalog-product",
-                    "li.catalog-grid__cell a",
-                    "a[qa-id='product-name']",
-                    "[data-qa*='product'] a"
-                ]
+            # Una sola navegación hasta la primera tarjeta; todos los selectores de tarjetas en una sola
+            # espera y el ganador se prueba primero la próxima vez
+            selector = await cargar_hasta_marcador(page, url_pagina, "falabella/listado",
+                                                   FALABELLA_CONFIG["listing"]["containers"], timeout)
 
-                elemento_encontrado = False
-                for selector in selectores_espera:
-                    try:
-                        await page.wait_for_selector(selector, timeout=TIMEOUT_PRODUCTOS // 2)
-                        elemento_encontrado = True
-                        break
-                    except Exception:
-                        continue
+            # Intentar cerrar banners/cookies si aparecen; con la sesión guardada solo si el
+            # consentimiento caducó y el banner volvió a salir (una consulta en vez de recorrer todos)
+            try:
+                if not sesion_restaurada(page.context) or await hay_banner_cookies_falabella(page):
+                    await manejar_banners_cookies_falabella(page)
+            except Exception:
+                pass
 
-                if elemento_encontrado:
-                    break  # Si encuentra algún selector, salir del bucle de reintentos
-                else:
-                    if intento == 2:
-                        raise Exception("No se encontraron elementos de productos")
-                    print(f"    ⚠️ No se encontraron elementos; reintentando con mayor timeout...")
-                    await asyncio.sleep(0.5)
-                    continue
+            if selector:
+                break  # Si encuentra algún selector, salir del bucle de reintentos
+            else:
+                if intento == 2:
+                    raise Exception("No se encontraron elementos de productos")
+                print(f"    ⚠️ No se encontraron elementos; reintentando con mayor timeout...")
+                await esperar_reintento(url_pagina, intento)
+                continue
 
-            except Exception as e:
-                if intento == 2:  # Último intento
-                    print(f"    ❌ Error en página {pagina_actual} después de 3 intentos: {str(e)}")
-                    # Guardar HTML para depuración
-                    try:
-                        html = await page.content()
-                        with open(f"debug_falabella_{dispositivo.replace(' ','_')}.html", "w", encoding="utf-8") as f:
-                            f.write(html)
-                        print(f"    📝 HTML guardado para depuración: debug_falabella_{dispositivo.replace(' ','_')}.html")
-                    except Exception:
-                        pass
-                    return productos
-                else:
-                    print(f"    ⚠️ Error en intento {intento + 1}: {str(e)}, reintentando...")
-                    await asyncio.sleep(0.6)
-                    continue
-        
-        productos_pagina = await extraer_productos_pagina_falabella(page, dispositivo)
-        if not productos_pagina:
-            # Guardar HTML si no se encontraron productos
-            html = await page.content()
-            with open(f"debug_falabella_{dispositivo.replace(' ','_')}_no_productos.html", "w", encoding="utf-8") as f:
-                f.write(html)
-            print(f"    📝 HTML guardado para depuración: debug_falabella_{dispositivo.replace(' ','_')}_no_productos.html")
-            break
-        productos.extend(productos_pagina)
-        print(f"    📊 Encontrados {len(productos_pagina)} productos en página {pagina_actual}")
-        pagina_actual += 1
-        await asyncio.sleep(random.uniform(0.05, 0.15))  # Ultra agresivo: reducido de (0.1,0.3) a (0.05,0.15)
-    return productos
+        except Exception as e:
+            if intento == 2:  # Último intento
+                print(f"    ❌ Error en página {numero} después de 3 intentos: {str(e)}")
+                # Guardar HTML para depuración
+                try:
+                    html = await page.content()
+                    with open(f"debug_falabella_{dispositivo.replace(' ','_')}.html", "w", encoding="utf-8") as f:
+                        f.write(html)
+                    print(f"    📝 HTML guardado para depuración: debug_falabella_{dispositivo.replace(' ','_')}.html")
+                except Exception:
+                    pass
+                return [], False
+            else:
+                print(f"    ⚠️ Error en intento {intento + 1}: {str(e)}, reintentando...")
+                await esperar_reintento(url_pagina, intento)
+                continue
+    
+    productos_pagina = await extraer_productos_pagina_falabella(page, dispositivo)
+    if not productos_pagina:
+        # Guardar HTML si no se encontraron productos
+        html = await page.content()
+        with open(f"debug_falabella_{dispositivo.replace(' ','_')}_no_productos.html", "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"    📝 HTML guardado para depuración: debug_falabella_{dispositivo.replace(' ','_')}_no_productos.html")
+        return [], True
+    print(f"    📊 Encontrados {len(productos_pagina)} productos en página {numero}")
+    return productos_pagina, False
 
 async def extraer_productos_pagina_falabella(page, dispositivo: str):
     productos = []
+    listing = FALABELLA_CONFIG["listing"]
     
-    # Intentar múltiples selectores para encontrar productos
-    selectores_productos = [
-        "a[data-pod]",
-        ".pod-item",
-        ".search-results-list .pod",
-        "[data-testid*='product']",
-        ".product-item",
-        "a.pod-link",
-        "a.catalog-product",
-        "li.catalog-grid__cell a",
-        "a[qa-id='product-name']",
-        "[data-qa*='product'] a"
-    ]
-    
-    elementos_producto = []
-    for selector in selectores_productos:
-        elementos = await page.query_selector_all(selector)
-        if elementos:
-            elementos_producto = elementos
-            print(f"    🔍 Encontrados {len(elementos_producto)} elementos con selector: {selector}")
-            break
+    # Todas las tarjetas en un solo page.evaluate; el contenedor es el propio enlace
+    # Mismo orden que la espera del listado: primero el selector que ganó la última vez
+    contenedores = ordenar_candidatos("falabella/listado", listing["containers"])
+    selector, tarjetas = await extraer_tarjetas(page, contenedores, {
+        "url": campo(":scope", atributo="href"),
+        "nombre": campo(*listing["titles"]),
+        "nombre_atributo": campo(":scope", atributo="title"),
+        "vendedor": campo(listing["seller"]),
+    })
     
-    if not elementos_producto:
+    if not tarjetas:
         print("    ⚠️ No se encontraron productos con ningún selector")
         return productos
+    print(f"    🔍 Encontrados {len(tarjetas)} elementos con selector: {selector}")
     
-    for elemento in elementos_producto:
-        try:
-            producto = {}
-            
-            # Obtener URL del producto
-            producto['url'] = await elemento.get_attribute("href")
-            if not producto['url']:
-                continue
-                
-            # Asegurar que la URL sea completa
-            if producto['url'].startswith('/'):
-                producto['url'] = f"https://www.falabella.com.co{producto['url']}"
-            elif not producto['url'].startswith('http'):
-                producto['url'] = f"https://www.falabella.com.co/{producto['url']}"      
-            # Obtener nombre del producto usando múltiples selectores
-            selectores_titulo = [
-                '.pod-subTitle',  # Selector principal para nombre del producto
-                '.pod-title',
-                '[data-testid*="title"]',
-                '.product-title',
-                'h3',
-                'h4',
-                '.title',
-                'a[title]'
-            ]
-            
-            producto['nombre'] = None
-            for selector in selectores_titulo:
-                titulo_element = await elemento.query_selector(selector)
-                if titulo_element:
-                    try:
-                        nombre_texto = await titulo_element.inner_text()
-                        if nombre_texto and nombre_texto.strip():
-                            producto['nombre'] = nombre_texto.strip()
-                            break
-                    except:
-                        continue
-            
-            # Si no se encontró con selectores, intentar obtener el atributo title
-            if not producto['nombre']:
-                try:
-                    titulo_attr = await elemento.get_attribute('title')
-                    if titulo_attr and titulo_attr.strip():
-                        producto['nombre'] = titulo_attr.strip()
-                except:
-                    pass
-            
-            # Obtener vendedor desde el listado
-            vendedor_element = await elemento.query_selector('b.pod-sellerText')
-            if vendedor_element:
-                try:
-                    vendedor_texto = await vendedor_element.inner_text()
-                    producto['vendedor'] = vendedor_texto.strip()
-                except:
-                    producto['vendedor'] = None
-            else:
-                producto['vendedor'] = None
-            
-            producto['dispositivo'] = dispositivo
-            
-            if producto['nombre'] and producto['url']:
-                productos.append(producto)
-                print(f"      ✅ Producto encontrado: {producto['nombre'][:50]}...")
-            
-        except Exception as e:
-            print(f"      ⚠️ Error procesando elemento: {str(e)}")
+    for tarjeta in tarjetas:
+        producto = {}
+        
+        # Obtener URL del producto
+        producto['url'] = tarjeta['url']
+        if not producto['url']:
             continue
+            
+        # Asegurar que la URL sea completa
+        if producto['url'].startswith('/'):
+            producto['url'] = f"https://www.falabella.com.co{producto['url']}"
+        elif not producto['url'].startswith('http'):
+            producto['url'] = f"https://www.falabella.com.co/{producto['url']}"
+        
+        # Si no se encontró con selectores, usar el atributo title
+        producto['nombre'] = tarjeta['nombre'] or tarjeta['nombre_atributo']
+        producto['vendedor'] = tarjeta['vendedor']
+        producto['dispositivo'] = dispositivo
+        
+        if producto['nombre'] and producto['url']:
+            productos.append(producto)
+            print(f"      ✅ Producto encontrado: {producto['nombre'][:50]}...")
     
     return productos
 
@@ -248,64 +227,30 @@ async def extraer_detalles_producto_falabella(page, producto: dict, fecha_scrapi
         try:
             print(f"🔄 Cargando producto (intento {intento + 1}/3)")
             
-            # Timeout progresivo más agresivo
+            # Timeout según la latencia observada; el progresivo fijo solo mientras no hay muestras
             timeouts = [10000, 15000, 20000]
-            timeout = timeouts[intento]
-            
-            # Estrategia de carga múltiple
-            carga_exitosa = False
-            
-            # Método 1: domcontentloaded (más rápido)
-            try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
-                await asyncio.sleep(0.5)
-                carga_exitosa = True
-                print(f"    ✅ Carga exitosa con domcontentloaded")
-            except Exception as e1:
-                print(f"    ⚠️ domcontentloaded falló: {str(e1)[:50]}...")
-                
-                # Método 2: networkidle (más lento pero más completo)
-                try:
-                    await page.goto(url, wait_until="networkidle", timeout=timeout)
-                    await asyncio.sleep(0.3)
-                    carga_exitosa = True
-                    print(f"    ✅ Carga exitosa con networkidle")
-                except Exception as e2:
-                    print(f"    ⚠️ networkidle falló: {str(e2)[:50]}...")
-                    
-                    # Método 3: load (fallback básico)
-                    try:
-                        await page.goto(url, wait_until="load", timeout=timeout)
-                        await asyncio.sleep(0.5)
-                        carga_exitosa = True
-                        print(f"    ✅ Carga exitosa con load")
-                    except Exception as e3:
-                        print(f"    ❌ Todos los métodos de carga fallaron")
-                        raise e3
-            
-            if not carga_exitosa:
-                raise Exception("No se pudo cargar la página con ningún método")
+            timeout = timeout_carga("falabella/producto", timeouts[intento], intento)
             
-            # Extraer datos con timeouts individuales
-            try:
-                precios = await extraer_precios_producto_falabella(page)
-                producto.update(precios)
-            except Exception as e:
-                print(f"      ⚠️ Error extrayendo precios: {str(e)}")
+            # Una sola navegación: en cuanto el estado JSON o los precios están en el DOM se extrae
+            marcador = await cargar_hasta_marcador(page, url, "falabella/producto", MARCADORES_PRODUCTO, timeout,
+                                                   estado="attached")
+            if not marcador:
+                raise Exception("No apareció el estado JSON ni los precios del producto")
+            print(f"    ✅ Producto listo ({marcador})")
             
-            try:
-                especificaciones = await extraer_especificaciones_falabella(page)
-                producto.update(especificaciones)
-            except Exception as e:
-                print(f"      ⚠️ Error extrayendo especificaciones: {str(e)}")
+            # Camino rápido: el estado JSON del servidor ya trae precios y especificaciones,
+            # no hace falta esperar el renderizado del cliente
+            datos_json = await extraer_datos_next_data_falabella(page, producto.get('vendedor'))
+            if datos_json:
+                producto.update(datos_json)
+                print(f"      ✅ Producto procesado desde __NEXT_DATA__")
+                break
             
+            # Sin estado JSON: precios, especificaciones y vendedor del DOM en una sola llamada
             try:
-                # Pasar el vendedor del listado si está disponible
-                vendedor_listado = producto.get('vendedor')
-                datos_vendedor = await extraer_datos_vendedor_falabella(page, vendedor_listado)
-                producto.update(datos_vendedor)
+                producto.update(await extraer_datos_producto_falabella(page, producto.get('vendedor')))
             except Exception as e:
-                print(f"      ⚠️ Error extrayendo datos del vendedor: {str(e)}")
+                print(f"      ⚠️ Error extrayendo datos del producto: {str(e)}")
             
             print(f"      ✅ Producto procesado exitosamente")
             break  # Si llegamos aquí, el producto se procesó correctamente
@@ -315,22 +260,14 @@ async def extraer_detalles_producto_falabella(page, producto: dict, fecha_scrapi
                 print(f"      ❌ Error procesando producto después de 3 intentos: {str(e)}")
                 print(f"      🔄 Intentando extracción básica sin cargar página completa...")
                 
-                # Estrategia de fallback: intentar extraer datos básicos sin carga completa
+                # Sin volver a navegar: lo que haya llegado del último intento puede traer los precios
                 try:
-                    # Intentar cargar solo el HTML básico
-                    await page.goto(url, wait_until="domcontentloaded", timeout=5000)
-                    await asyncio.sleep(0.2)
-                    
-                    # Intentar extraer solo precios básicos
-                    try:
-                        precios_basicos = await extraer_precios_basicos_falabella(page)
-                        producto.update(precios_basicos)
-                        print(f"      ✅ Datos básicos extraídos exitosamente")
-                    except:
-                        print(f"      ⚠️ No se pudieron extraer datos básicos")
-                    
+                    datos_basicos = await extraer_datos_producto_falabella(page, producto.get('vendedor'))
+                    producto.update({clave: datos_basicos[clave] for clave in
+                                     ('precio_tarjeta_falabella', 'precio_descuento', 'precio_normal', 'porcentaje_descuento')})
+                    print(f"      ✅ Datos básicos extraídos exitosamente")
                 except:
-                    print(f"      ❌ Fallback también falló")
+                    print(f"      ⚠️ No se pudieron extraer datos básicos")
                 
                 # Agregar datos básicos al producto
                 producto.update({
@@ -347,149 +284,102 @@ async def extraer_detalles_producto_falabella(page, producto: dict, fecha_scrapi
                 })
             else:
                 print(f"⚠️ Error en intento {intento + 1}: {str(e)}, reintentando...")
-                await asyncio.sleep(0.5)  # Pausa más larga entre reintentos
+                await esperar_reintento(url, intento)
                 continue
     
     return producto
 
-async def extraer_precios_producto_falabella(page):
-    precios = {
-        'precio_tarjeta_falabella': None,  # data-cmr-price (más bajo)
-        'precio_descuento': None,          # data-event-price (intermedio)
-        'precio_normal': None,              # data-normal-price (original tachado)
-        'porcentaje_descuento': None
-    }
-    try:
-        # Buscar precio con tarjeta Falabella (data-cmr-price) - el más bajo, exclusivo con tarjeta CMR
-        precio_tarjeta_element = await page.query_selector('li[data-cmr-price] span')
-        if precio_tarjeta_element:
-            precio_texto = await precio_tarjeta_element.inner_text()
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            precios['precio_tarjeta_falabella'] = int(precio_limpio) if precio_limpio else None
-        
-        # Buscar precio con descuento (data-event-price) - precio intermedio con descuento
-        precio_descuento_element = await page.query_selector('li[data-event-price] span')
-        if precio_descuento_element:
-            precio_texto = await precio_descuento_element.inner_text()
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            precios['precio_descuento'] = int(precio_limpio) if precio_limpio else None
-        
-        # Buscar precio normal (data-normal-price) - precio normal/tachado sin descuento
-        precio_normal_element = await page.query_selector('li[data-normal-price] span')
-        if precio_normal_element:
-            precio_texto = await precio_normal_element.inner_text()
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            precios['precio_normal'] = int(precio_limpio) if precio_limpio else None
-        
-        # Buscar porcentaje de descuento en .discount-badge-item
-        descuento_element = await page.query_selector('.discount-badge-item')
-        if descuento_element:
-            descuento_texto = await descuento_element.inner_text()
-            match = re.search(r'(\d+)%', descuento_texto)
-            if match:
-                precios['porcentaje_descuento'] = int(match.group(1))
-            else:
-                # Buscar el signo negativo
-                match = re.search(r'-(\d+)%', descuento_texto)
-                if match:
-                    precios['porcentaje_descuento'] = int(match.group(1))
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo precios: {str(e)}")
-    return precios
-
-async def extraer_precios_basicos_falabella(page):
-    """Extrae precios básicos con timeouts más cortos para páginas problemáticas"""
-    precios = {
+def parsear_next_data_falabella(estado: dict, vendedor_listado=None):
+    """Mapea el JSON de __NEXT_DATA__ a los campos del producto; None si no trae precios"""
+    producto_data = estado.get("props", {}).get("pageProps", {}).get("productData")
+    if not producto_data:
+        return None
+    variantes = producto_data.get("variants") or [{}]
+    variante = variantes[0]
+    precios = variante.get("prices") or producto_data.get("prices")
+    if not precios:
+        return None
+    
+    datos = {
         'precio_tarjeta_falabella': None,
         'precio_descuento': None,
         'precio_normal': None,
-        'porcentaje_descuento': None
-    }
-    try:
-        # Buscar precios con timeouts más cortos
-        selectores_precio = [
-            ('li[data-cmr-price] span', 'precio_tarjeta_falabella'),
-            ('li[data-event-price] span', 'precio_descuento'),
-            ('li[data-normal-price] span', 'precio_normal'),
-            ('.discount-badge-item', 'porcentaje_descuento')
-        ]
-        
-        for selector, campo in selectores_precio:
-            try:
-                elemento = await page.query_selector(selector)
-                if elemento:
-                    texto = await elemento.inner_text()
-                    if campo == 'porcentaje_descuento':
-                        match = re.search(r'(\d+)%', texto)
-                        if match:
-                            precios[campo] = int(match.group(1))
-                    else:
-                        precio_limpio = re.sub(r'[^\d]', '', texto)
-                        if precio_limpio:
-                            precios[campo] = int(precio_limpio)
-            except:
-                continue
-                
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo precios básicos: {str(e)}")
-    return precios
-
-async def extraer_especificaciones_falabella(page):
-    especificaciones = {
+        'porcentaje_descuento': None,
         'memoria_interna': None,
         'memoria_ram': None,
         'color': None,
         'modelo': None,
-        'condicion': None
+        'condicion': None,
+        'vendedor': vendedor_listado
     }
+    for precio in precios:
+        campo_precio = TIPOS_PRECIO_FALABELLA.get(precio.get("type"))
+        valor = precio.get("price")
+        if isinstance(valor, list):
+            valor = valor[0] if valor else None
+        if not campo_precio or valor is None or datos[campo_precio] is not None:
+            continue
+        datos[campo_precio] = int(valor) if isinstance(valor, (int, float)) else a_entero(valor)
+    
+    badge = variante.get("discountBadge") or producto_data.get("discountBadge") or {}
+    datos['porcentaje_descuento'] = porcentaje(badge.get("label"))
+    
+    especificaciones = (producto_data.get("attributes") or {}).get("specifications") or producto_data.get("specifications") or []
+    filas = [[spec.get("name") or "", spec.get("value") or ""] for spec in especificaciones]
+    datos.update(mapear_filas(filas, REGLAS_ESPECIFICACIONES_FALABELLA))
+    
+    if not vendedor_listado:
+        ofertas = variante.get("offerings") or [{}]
+        datos['vendedor'] = ofertas[0].get("sellerName") or producto_data.get("sellerName")
+    return datos
+
+async def extraer_datos_next_data_falabella(page, vendedor_listado=None):
+    """Lee el estado __NEXT_DATA__ incrustado por el servidor; None si falta o no trae precios"""
     try:
-        # Botón para expandir y mostrar más especificaciones ("Ver más")
-        boton_ver_mas = await page.query_selector('button#swatch-collapsed-id')
-        if boton_ver_mas:
-            await boton_ver_mas.click()
-            await asyncio.sleep(random.uniform(0.05, 0.15))  # Ultra agresivo: reducido de (0.1,0.3) a (0.05,0.15)
-        
-        # Filas de la tabla de especificaciones
-        filas = await page.query_selector_all('table.specification-table tr')
-        for fila in filas:
-            try:
-                # Nombre de la característica (ej. "Memoria RAM", "Modelo")
-                nombre_element = await fila.query_selector('td.property-name')
-                # Valor de la característica (ej. "8 GB", "Galaxy S24")
-                valor_element = await fila.query_selector('td.property-value')
-                if nombre_element and valor_element:
-                    nombre = await nombre_element.inner_text()
-                    valor = await valor_element.inner_text()
-                    if "Capacidad de almacenamiento" in nombre:
-                        especificaciones['memoria_interna'] = valor
-                    elif "Memoria RAM" in nombre:
-                        especificaciones['memoria_ram'] = valor
-                    elif "Modelo" in nombre:
-                        especificaciones['modelo'] = valor
-                    elif "Condición del producto" in nombre:
-                        especificaciones['condicion'] = valor
-                    elif "Color" in nombre:
-                        especificaciones['color'] = valor
-            except Exception:
-                continue
+        estado = await leer_json_embebido(page, "__NEXT_DATA__")
+        return parsear_next_data_falabella(estado, vendedor_listado) if estado else None
     except Exception as e:
-        print(f"    ⚠️ Error extrayendo especificaciones: {str(e)}")
-    return especificaciones
+        print(f"      ⚠️ No se pudo leer __NEXT_DATA__: {str(e)}")
+        return None
 
-async def extraer_datos_vendedor_falabella(page, vendedor_listado=None):
+async def extraer_datos_producto_falabella(page, vendedor_listado=None):
+    """Precios, especificaciones y vendedor de la página de producto en un solo page.evaluate"""
+    pagina = FALABELLA_CONFIG["product_page"]
     datos = {
+        'precio_tarjeta_falabella': None,  # data-cmr-price (más bajo)
+        'precio_descuento': None,          # data-event-price (intermedio)
+        'precio_normal': None,             # data-normal-price (original tachado)
+        'porcentaje_descuento': None,
+        'memoria_interna': None,
+        'memoria_ram': None,
+        'color': None,
+        'modelo': None,
+        'condicion': None,
         'vendedor': vendedor_listado  # Usar vendedor del listado si está disponible
     }
-    try:
-        # Si no se encontró vendedor en el listado, intentar obtenerlo de la página del producto
-        if not vendedor_listado:
-            # Nombre del vendedor dentro de la página del producto
-            vendedor_element = await page.query_selector('#testId-SellerInfo-sellerName')
-            if vendedor_element:
-                vendedor_texto = await vendedor_element.inner_text()
-                datos['vendedor'] = vendedor_texto.strip()
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo datos del vendedor: {str(e)}")
+    # "Ver más": se espera a que la tabla se despliegue antes de leerla, no una pausa fija
+    await pulsar_y_esperar(page, pagina["see_more"], pagina["specs_row"], TIMEOUT_CARACTERISTICAS)
+    textos, filas = await extraer_detalle(page, {
+        "precio_tarjeta_falabella": pagina["price_cmr"],
+        "precio_descuento": pagina["price_event"],
+        "precio_normal": pagina["price_normal"],
+        "descuento": pagina["discount_badge"],
+        "vendedor": pagina["seller"],
+    }, tabla={
+        "filas": pagina["specs_row"],
+        "nombre": pagina["spec_name"],
+        "valor": pagina["spec_value"],
+    })
+    
+    for campo_precio in ('precio_tarjeta_falabella', 'precio_descuento', 'precio_normal'):
+        datos[campo_precio] = a_entero(textos[campo_precio])
+    datos['porcentaje_descuento'] = porcentaje(textos["descuento"])
+    
+    datos.update(mapear_filas(filas, REGLAS_ESPECIFICACIONES_FALABELLA))
+    
+    # Si no se encontró vendedor en el listado, usar el de la página del producto
+    if not vendedor_listado:
+        datos['vendedor'] = textos["vendedor"]
     return datos
 
 async def scrape_falabella():
@@ -500,26 +390,31 @@ async def scrape_falabella():
     # Lista para almacenar archivos temporales
     archivos_temporales = []
     
-    # Procesar cada dispositivo por separado
-    for i, dispositivo in enumerate(DISPOSITIVOS):
-        print(f"\n[DEVICE {i+1}/{len(DISPOSITIVOS)}] Procesando: {dispositivo}")
-        print("=" * 50)
+    # Los navegadores se lanzan una sola vez y se comparten entre dispositivos
+    await iniciar_pool()
+    try:
+        # Procesar cada dispositivo por separado
+        for i, dispositivo in enumerate(DISPOSITIVOS):
+            print(f"\n[DEVICE {i+1}/{len(DISPOSITIVOS)}] Procesando: {dispositivo}")
+            print("=" * 50)
         
-        # Procesar dispositivo individual
-        productos_dispositivo = await procesar_dispositivo_individual_falabella(dispositivo, fecha_scraping)
+            # Procesar dispositivo individual
+            productos_dispositivo = await procesar_dispositivo_individual_falabella(dispositivo, fecha_scraping)
         
-        if productos_dispositivo:
-            # Guardar Excel temporal para este dispositivo
-            archivo_temporal = await guardar_excel_temporal_falabella(productos_dispositivo, dispositivo, i+1)
-            if archivo_temporal:
-                archivos_temporales.append(archivo_temporal)
-                print(f"[SAVE] Archivo temporal guardado: {archivo_temporal}")
-        else:
-            print(f"[WARN] No se encontraron productos para {dispositivo}")
+            if productos_dispositivo:
+                # Guardar Excel temporal para este dispositivo
+                archivo_temporal = await guardar_excel_temporal_falabella(productos_dispositivo, dispositivo, i+1)
+                if archivo_temporal:
+                    archivos_temporales.append(archivo_temporal)
+                    print(f"[SAVE] Archivo temporal guardado: {archivo_temporal}")
+            else:
+                print(f"[WARN] No se encontraron productos para {dispositivo}")
         
-        # Liberar memoria explícitamente
-        await liberar_memoria_falabella()
-        print(f"[MEMORY] Memoria liberada después de procesar {dispositivo}")
+            # Liberar memoria explícitamente
+            await liberar_memoria_falabella()
+            print(f"[MEMORY] Memoria liberada después de procesar {dispositivo}")
+    finally:
+        await cerrar_pool()
     
     # Combinar todos los archivos Excel al final
     if archivos_temporales:
@@ -533,39 +428,29 @@ async def scrape_falabella():
             print("[ERROR] No se pudo crear el archivo final")
     else:
         print("[ERROR] No se encontraron productos para ningún dispositivo")
+        return None
+    
+    return archivo_final
 
 async def procesar_dispositivo_individual_falabella(dispositivo: str, fecha_scraping: str):
-    """Procesa un dispositivo individual con su propia instancia de Playwright"""
+    """Procesa un dispositivo individual con su propio contexto del pool de navegadores"""
     productos_dispositivo = []
+    context = None
+    page = None
     
-    # Pequeña pausa para evitar sobrecarga del sistema
-    await asyncio.sleep(0.1)
+    # Sin tiempo en el plazo de la ejecución ni para el listado: el dispositivo queda en el reporte
+    if not puede_empezar("falabella", "listado", dispositivo):
+        return productos_dispositivo
     
-    async with async_playwright() as p:
-        browser = None
-        context = None
-        page = None
-        
-        for intento in range(3):
-            try:
+    for intento in range(3):
+        try:
+            if context is None:
                 user_agent = random.choice(USER_AGENTS)
                 print(f"🖥️ User-Agent usado: {user_agent}")
                 
-                # Crear browser con opciones optimizadas
-                browser = await p.chromium.launch(
-                    headless=True, 
-                    args=[
-                        f'--user-agent={user_agent}',
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-web-security',
-                        '--disable-features=VizDisplayCompositor'
-                    ]
-                )
-                
-                # Crear context con configuración optimizada
-                context = await browser.new_context(
+                # Contexto aislado sobre un navegador ya lanzado del pool
+                context = await nuevo_contexto(
+                    "falabella",
                     viewport={"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT},
                     user_agent=user_agent,
                     locale="es-CO",
@@ -574,63 +459,49 @@ async def procesar_dispositivo_individual_falabella(dispositivo: str, fecha_scra
                         "Upgrade-Insecure-Requests": "1"
                     }
                 )
-                
-                # Crear página
-                page = await context.new_page()
-                # Timeouts por defecto más holgados
-                try:
-                    page.set_default_navigation_timeout(45000)
-                    page.set_default_timeout(45000)
-                except Exception:
-                    pass
-                
-                print(f"🔍 Búsqueda: {dispositivo}")
-                await asyncio.sleep(random.uniform(0.05, 0.15))
-                
-                productos_busqueda = await scrape_busqueda_inicial_falabella(page, dispositivo)
-                if productos_busqueda:
-                    print(f"✅ Encontrados {len(productos_busqueda)} productos en búsqueda inicial")
-                    # Procesar productos en lotes para reducir CPU y memoria
-                    productos_dispositivo = await procesar_productos_por_lotes_falabella(page, productos_busqueda, fecha_scraping)
-                else:
-                    print(f"⚠️ No se encontraron productos para {dispositivo}")
-                
-                # Limpieza explícita y ordenada
+            else:
+                # En reintentos solo se reemplaza el contexto si está roto, nunca el navegador
+                context = await obtener_contexto_saludable(context)
+            
+            # Crear página
+            page = await context.new_page()
+            # Timeouts por defecto más holgados
+            try:
+                page.set_default_navigation_timeout(45000)
+                page.set_default_timeout(45000)
+            except Exception:
+                pass
+            
+            print(f"🔍 Búsqueda: {dispositivo}")
+            
+            productos_busqueda = await scrape_busqueda_inicial_falabella(page, dispositivo)
+            if productos_busqueda:
+                print(f"✅ Encontrados {len(productos_busqueda)} productos en búsqueda inicial")
+                # Procesar detalles con un pool acotado de páginas concurrentes
+                productos_dispositivo = await procesar_productos_concurrentes_falabella(page, productos_busqueda, fecha_scraping)
+            else:
+                print(f"⚠️ No se encontraron productos para {dispositivo}")
+            
+            await page.close()
+            break  # Si llegamos aquí, el procesamiento fue exitoso
+            
+        except Exception as e:
+            print(f"❌ Error en intento {intento + 1} para {dispositivo}: {str(e)}")
+            
+            # Limpieza en caso de error
+            try:
                 if page:
                     await page.close()
-                if context:
-                    await context.close()
-                if browser:
-                    await browser.close()
-                
-                break  # Si llegamos aquí, el procesamiento fue exitoso
-                
-            except Exception as e:
-                print(f"❌ Error en intento {intento + 1} para {dispositivo}: {str(e)}")
-                
-                # Limpieza en caso de error
-                try:
-                    if page:
-                        await page.close()
-                except:
-                    pass
-                try:
-                    if context:
-                        await context.close()
-                except:
-                    pass
-                try:
-                    if browser:
-                        await browser.close()
-                except:
-                    pass
-                
-                if intento == 2:  # Último intento
-                    print(f"❌ Falló después de 3 intentos para {dispositivo}")
-                else:
-                    await asyncio.sleep(1)  # Esperar antes del siguiente intento
-                continue
+            except:
+                pass
+            
+            if intento == 2:  # Último intento
+                print(f"❌ Falló después de 3 intentos para {dispositivo}")
+            else:
+                await esperar_reintento(get_url_falabella(dispositivo), intento)
+            continue
     
+    await cerrar_contexto(context)
     return productos_dispositivo
 
 async def guardar_excel_temporal_falabella(productos, dispositivo, numero_dispositivo):
@@ -727,64 +598,40 @@ async def limpiar_archivos_temporales_falabella(archivos_temporales):
     except Exception as e:
         print(f"[WARN] Error limpiando archivos temporales: {e}")
 
-async def procesar_productos_por_lotes_falabella(page, productos_busqueda, fecha_scraping):
-    """Procesa productos en lotes para reducir CPU y memoria"""
-    productos_dispositivo = []
-    TAMANO_LOTE = 4  # Procesar 4 productos por lote
-    fallos_consecutivos = 0
-    MAX_FALLOS_CONSECUTIVOS = 3  # Saltar lote si hay muchos fallos seguidos
+async def procesar_productos_concurrentes_falabella(page, productos_busqueda, fecha_scraping):
+    """Procesa los detalles con PAGINAS_DETALLE páginas concurrentes sobre el mismo contexto"""
+    total = len(productos_busqueda)
+    print(f"[WORKERS] Procesando {total} productos con {PAGINAS_DETALLE} páginas concurrentes")
     
-    # Dividir productos en lotes
-    lotes = [productos_busqueda[i:i + TAMANO_LOTE] for i in range(0, len(productos_busqueda), TAMANO_LOTE)]
+    async def procesar(pagina_trabajo, producto):
+        if not puede_empezar("falabella", "producto", producto['url']):
+            # Fuera del plazo: se conserva con los datos del listado
+            producto['fecha_scraping'] = fecha_scraping
+            return producto
+        print(f"  🔍 Procesando producto: {producto['nombre'][:50]}...")
+        print(f"    🔗 URL: {producto['url']}")
+        with medir_tarea("falabella", "producto"):
+            return await extraer_detalles_producto_falabella(pagina_trabajo, producto, fecha_scraping)
     
-    print(f"[LOTES] Procesando {len(productos_busqueda)} productos en {len(lotes)} lotes de {TAMANO_LOTE}")
+    def en_error(producto, e):
+        print(f"    ❌ Error procesando producto: {str(e)}")
+        producto['fecha_scraping'] = fecha_scraping
+        return producto
     
-    for lote_idx, lote in enumerate(lotes):
-        print(f"[LOTE {lote_idx + 1}/{len(lotes)}] Procesando {len(lote)} productos...")
-        
-        # Verificar si hay demasiados fallos consecutivos
-        if fallos_consecutivos >= MAX_FALLOS_CONSECUTIVOS:
-            print(f"[SKIP] Demasiados fallos consecutivos ({fallos_consecutivos}), saltando lote...")
-            fallos_consecutivos = 0  # Resetear contador
-            continue
-        
-        fallos_lote = 0
-        
-        # Procesar productos del lote sin delays individuales
-        for i, producto in enumerate(lote):
-            print(f"  🔍 Procesando producto {i+1}/{len(lote)}: {producto['nombre'][:50]}...")
-            print(f"    🔗 URL: {producto['url']}")
-            
-            try:
-                producto_con_detalles = await extraer_detalles_producto_falabella(page, producto, fecha_scraping)
-                productos_dispositivo.append(producto_con_detalles)
-                fallos_consecutivos = 0  # Resetear contador de fallos
-            except Exception as e:
-                print(f"    ❌ Error procesando producto: {str(e)}")
-                producto['fecha_scraping'] = fecha_scraping
-                productos_dispositivo.append(producto)
-                fallos_lote += 1
-                fallos_consecutivos += 1
-                continue
-        
-        # Actualizar contador de fallos consecutivos
-        if fallos_lote == len(lote):
-            print(f"[WARN] Todos los productos del lote fallaron")
-        else:
-            fallos_consecutivos = 0  # Resetear si al menos uno funcionó
-        
-        # Delay solo al final de cada lote (no entre productos individuales)
-        if lote_idx < len(lotes) - 1:  # No delay en el último lote
-            print(f"[LOTE] Pausa entre lotes...")
-            await asyncio.sleep(0.1)  # Pausa solo entre lotes
-            
-            # Liberar memoria después de cada lote
-            gc.collect()
-            print(f"[MEMORY] Memoria liberada después del lote {lote_idx + 1}")
+    # Los resultados vuelven en el mismo orden del listado
+    productos_dispositivo = await procesar_en_paginas(page.context, productos_busqueda, procesar, PAGINAS_DETALLE, en_error)
     
-    print(f"[LOTES] Procesamiento por lotes completado: {len(productos_dispositivo)} productos")
+    print(f"[WORKERS] Procesamiento concurrente completado: {len(productos_dispositivo)} productos")
     return productos_dispositivo
 
+async def hay_banner_cookies_falabella(page) -> bool:
+    """Comprueba con una sola consulta si hay un banner de cookies visible."""
+    try:
+        banner = await page.query_selector(SELECTOR_BANNER_COOKIES)
+        return bool(banner) and await banner.is_visible()
+    except Exception:
+        return False
+
 async def manejar_banners_cookies_falabella(page):
     """Intenta cerrar banners de cookies o consentimientos comunes en Falabella/Linio."""
     posibles_selectores = [
@@ -802,40 +649,21 @@ async def manejar_banners_cookies_falabella(page):
             boton = await page.query_selector(selector)
             if boton:
                 await boton.click()
-                await asyncio.sleep(0.2)
+                # El banner se da por cerrado cuando el botón desaparece
+                try:
+                    await boton.wait_for_element_state("hidden", timeout=2000)
+                except Exception:
+                    pass
                 break
         except Exception:
             continue
 
-async def limpiar_cache_playwright():
-    """Limpia el caché de Playwright para evitar errores de sincronización"""
-    try:
-        cache_paths = [
-            "/root/.cache/ms-playwright",
-            os.path.expanduser("~/.cache/ms-playwright"),
-            "/tmp/ms-playwright"
-        ]
-        
-        for cache_path in cache_paths:
-            if os.path.exists(cache_path):
-                shutil.rmtree(cache_path)
-                print(f"[CACHE] Caché limpiado: {cache_path}")
-        
-        print("[CACHE] Limpieza de caché de Playwright completada")
-        
-    except Exception as e:
-        print(f"[WARN] Error limpiando caché de Playwright: {e}")
-
 async def liberar_memoria_falabella():
     """Libera memoria explícitamente"""
     try:
         # Forzar recolección de basura
         gc.collect()
         print("[MEMORY] Recolección de basura ejecutada")
-        
-        # Pausa mínima para reducir CPU
-        await asyncio.sleep(0.1)  # Reducido de 0.5 a 0.1 para menos CPU
-        
     except Exception as e:
         print(f"[WARN] Error liberando memoria: {e}")
 
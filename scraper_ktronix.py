@@ -4,9 +4,14 @@ import pandas as pd
 import random
 import gc
 import os
-import shutil
 from datetime import datetime
-from playwright.async_api import async_playwright
+from bs4 import BeautifulSoup
+from cliente_http import obtener_html
+from control_tasa import esperar_reintento
+from plazos import puede_empezar, medir_tarea
+from tiempos_carga import cargar_hasta_marcador, timeout_carga
+from extraccion import extraer_tarjetas, campo, extraer_detalle, mapear_filas, a_entero, porcentaje
+from pool_navegadores import iniciar_pool, cerrar_pool, nuevo_contexto, obtener_contexto_saludable, cerrar_contexto, procesar_en_paginas, paginar_listado
 
 # Configuración
 DISPOSITIVOS = [
@@ -21,6 +26,9 @@ VIEWPORT_WIDTH = 1920
 VIEWPORT_HEIGHT = 1080
 TIMEOUT_PRODUCTOS = 8000
 DELAY_ENTRE_BUSQUEDAS = 0.5
+PAGINAS_DETALLE = 4  # Páginas concurrentes para detalles de producto
+PAGINAS_LISTADO = 3  # Páginas del listado cargadas a la vez cuando MAX_PAGINAS > 1
+HTTP_DIRECTO = True  # Detalles por HTTP + parseo de HTML; Playwright solo como respaldo
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0",
@@ -45,13 +53,28 @@ KTRONIX_CONFIG = {
         "specs_container": ".new-container__table__classifications___type__item",
         "spec_name": ".new-container__table__classifications___type__item_feature",
         "spec_value": ".new-container__table__classifications___type__item_result",
-        "benefits": ".badges_item_text"
+        "price_original": [".price-original", ".price-before", ".old-price", ".price-tachado", ".price-crossed"],
+        "price_discount": [".price-discount", ".price-sale", ".price-promo", ".price-offer"],
+        "benefits": ".badges_item_text",
+        "title": "h1"
     },
     "defaults": {
         "seller": "Ktronix"
     }
 }
 
+# Marcadores de página de producto lista para extraer (basta con que estén en el DOM)
+MARCADORES_PRODUCTO = [KTRONIX_CONFIG["product_page"]["price_main"], KTRONIX_CONFIG["product_page"]["title"]]
+
+# Nombre de la característica en la tabla -> campo del producto (gana la primera regla que coincida)
+REGLAS_ESPECIFICACIONES_KTRONIX = [
+    (("Capacidad de almacenamiento", "Memoria interna", "Almacenamiento"), 'memoria_interna'),
+    (("Memoria RAM", "RAM", "Memoria del sistema"), 'memoria_ram'),
+    (("Modelo", "Versión"), 'modelo'),
+    (("Color", "Colores"), 'color'),
+    (("Condición", "Estado"), 'condicion'),
+]
+
 def get_url_ktronix(dispositivo):
     # URLs específicas para cada dispositivo
     urls_dispositivos = {
@@ -67,182 +90,146 @@ def get_url_ktronix(dispositivo):
 async def scrape_busqueda_inicial_ktronix(page, dispositivo: str):
     url = get_url_ktronix(dispositivo)
     print(f"  🔗 URL: {url}")
-    productos = []
-    pagina_actual = 1
+    # Las URLs de todas las páginas se conocen de antemano: se cargan en paralelo
+    urls = [url] + [f"{url}&page={numero}" for numero in range(2, MAX_PAGINAS + 1)]
     
-    while pagina_actual <= MAX_PAGINAS:
-        if pagina_actual == 1:
-            url_pagina = url
-        else:
-            url_pagina = f"{url}&page={pagina_actual}"
-        
-        # Reintentos para cada página
-        for intento in range(3):
-            try:
-                timeout = random.randint(5000, 8000)
-                print(f"🔄 Intentando cargar página {pagina_actual} (intento {intento + 1}/3)")
-                await page.goto(url_pagina, wait_until="networkidle", timeout=timeout)
-                # Espera adicional para asegurar carga de JS
-                await asyncio.sleep(1.0)
-                
-                try:
-                    # Intentar esperar por el contenedor de productos
-                    await page.wait_for_selector(KTRONIX_CONFIG["listing"]["container"], timeout=TIMEOUT_PRODUCTOS)
-                    break  # Si encuentra el selector, salir del bucle de reintentos
-                except:
-                    if intento == 2:  # Último intento
-                        print(f"    ❌ No se encontraron elementos de productos después de 3 intentos")
-                        # Guardar HTML para depuración
-                        html = await page.content()
-                        with open(f"debug_ktronix_{dispositivo.replace(' ','_')}.html", "w", encoding="utf-8") as f:
-                            f.write(html)
-                        print(f"    📝 HTML guardado para depuración: debug_ktronix_{dispositivo.replace(' ','_')}.html")
-                        return productos
-                    else:
-                        print(f"    ⚠️ Intento {intento + 1} fallido, reintentando...")
-                        await asyncio.sleep(0.05)
-                        continue
-                        
-            except Exception as e:
+    async def cargar(pagina, numero, url_pagina):
+        return await cargar_pagina_listado_ktronix(pagina, numero, url_pagina, dispositivo)
+    
+    return await paginar_listado(page, urls, cargar, PAGINAS_LISTADO)
+
+async def cargar_pagina_listado_ktronix(page, numero: int, url_pagina: str, dispositivo: str):
+    """Carga una página del listado con reintentos; devuelve (productos, es_ultima)"""
+    # Reintentos para cada página
+    for intento in range(3):
+        try:
+            # Timeout según la latencia observada del listado (por defecto el de antes: carga + TIMEOUT_PRODUCTOS)
+            timeout = timeout_carga("ktronix/listado", 8000 + TIMEOUT_PRODUCTOS, intento)
+            print(f"🔄 Intentando cargar página {numero} (intento {intento + 1}/3)")
+            # Una sola navegación hasta que aparezcan las tarjetas (networkidle no llega con los anuncios)
+            if await cargar_hasta_marcador(page, url_pagina, "ktronix/listado",
+                                           [KTRONIX_CONFIG["listing"]["container"]], timeout):
+                break  # Si encuentra el selector, salir del bucle de reintentos
+            else:
                 if intento == 2:  # Último intento
-                    print(f"    ❌ Error en página {pagina_actual} después de 3 intentos: {str(e)}")
-                    return productos
+                    print(f"    ❌ No se encontraron elementos de productos después de 3 intentos")
+                    # Guardar HTML para depuración
+                    html = await page.content()
+                    with open(f"debug_ktronix_{dispositivo.replace(' ','_')}.html", "w", encoding="utf-8") as f:
+                        f.write(html)
+                    print(f"    📝 HTML guardado para depuración: debug_ktronix_{dispositivo.replace(' ','_')}.html")
+                    return [], False
                 else:
-                    print(f"    ⚠️ Error en intento {intento + 1}: {str(e)}, reintentando...")
-                    await asyncio.sleep(0.2)
+                    print(f"    ⚠️ Intento {intento + 1} fallido, reintentando...")
+                    await esperar_reintento(url_pagina, intento)
                     continue
-        
-        productos_pagina = await extraer_productos_pagina_ktronix(page, dispositivo)
-        if not productos_pagina:
-            # Guardar HTML si no se encontraron productos
-            html = await page.content()
-            with open(f"debug_ktronix_{dispositivo.replace(' ','_')}_no_productos.html", "w", encoding="utf-8") as f:
-                f.write(html)
-            print(f"    📝 HTML guardado para depuración: debug_ktronix_{dispositivo.replace(' ','_')}_no_productos.html")
-            break
-        productos.extend(productos_pagina)
-        print(f"    📊 Encontrados {len(productos_pagina)} productos en página {pagina_actual}")
-        pagina_actual += 1
-        await asyncio.sleep(random.uniform(0.05, 0.15))
-    return productos
+                    
+        except Exception as e:
+            if intento == 2:  # Último intento
+                print(f"    ❌ Error en página {numero} después de 3 intentos: {str(e)}")
+                return [], False
+            else:
+                print(f"    ⚠️ Error en intento {intento + 1}: {str(e)}, reintentando...")
+                await esperar_reintento(url_pagina, intento)
+                continue
+    
+    productos_pagina = await extraer_productos_pagina_ktronix(page, dispositivo)
+    if not productos_pagina:
+        # Guardar HTML si no se encontraron productos
+        html = await page.content()
+        with open(f"debug_ktronix_{dispositivo.replace(' ','_')}_no_productos.html", "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"    📝 HTML guardado para depuración: debug_ktronix_{dispositivo.replace(' ','_')}_no_productos.html")
+        return [], True
+    print(f"    📊 Encontrados {len(productos_pagina)} productos en página {numero}")
+    return productos_pagina, False
 
 async def extraer_productos_pagina_ktronix(page, dispositivo: str):
     productos = []
+    listing = KTRONIX_CONFIG["listing"]
     
-    # Usar el selector de contenedor de productos de Ktronix
-    elementos_producto = await page.query_selector_all(KTRONIX_CONFIG["listing"]["container"])
+    # Todas las tarjetas en un solo page.evaluate usando los selectores de Ktronix
+    _, tarjetas = await extraer_tarjetas(page, listing["container"], {
+        "url": campo(listing["link"], atributo="href"),
+        "nombre": campo(listing["title"]),
+        "precio": campo(listing["price"]),
+    })
     
-    if not elementos_producto:
+    if not tarjetas:
         print("    ⚠️ No se encontraron productos con el selector de Ktronix")
         return productos
     
-    print(f"    🔍 Encontrados {len(elementos_producto)} elementos de producto")
+    print(f"    🔍 Encontrados {len(tarjetas)} elementos de producto")
     
-    for elemento in elementos_producto:
-        try:
-            producto = {}
-            
-            # Obtener URL del producto usando el selector de Ktronix
-            link_element = await elemento.query_selector(KTRONIX_CONFIG["listing"]["link"])
-            if link_element:
-                producto['url'] = await link_element.get_attribute("href")
-                if producto['url']:
-                    if producto['url'].startswith('/'):
-                        producto['url'] = f"{KTRONIX_CONFIG['base_url']}{producto['url']}"
-                    elif not producto['url'].startswith('http'):
-                        producto['url'] = f"{KTRONIX_CONFIG['base_url']}/{producto['url']}"
-            
-            if not producto['url']:
-                continue
-                
-            # Obtener nombre del producto usando el selector de Ktronix
-            titulo_element = await elemento.query_selector(KTRONIX_CONFIG["listing"]["title"])
-            if titulo_element:
-                producto['nombre'] = await titulo_element.inner_text()
-            else:
-                producto['nombre'] = None
-            
-            # Obtener precio del listado si está disponible
-            precio_element = await elemento.query_selector(KTRONIX_CONFIG["listing"]["price"])
-            if precio_element:
-                precio_texto = await precio_element.inner_text()
-                precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-                producto['precio_listado'] = int(precio_limpio) if precio_limpio else None
-            else:
-                producto['precio_listado'] = None
-            
-            producto['dispositivo'] = dispositivo
-            producto['vendedor'] = KTRONIX_CONFIG["defaults"]["seller"]
-            
-            if producto['nombre'] and producto['url']:
-                productos.append(producto)
-                print(f"      ✅ Producto encontrado: {producto['nombre'][:50]}...")
-            
-        except Exception as e:
-            print(f"      ⚠️ Error procesando elemento: {str(e)}")
+    for tarjeta in tarjetas:
+        producto = {}
+        
+        # Asegurar que la URL sea completa
+        producto['url'] = tarjeta['url']
+        if not producto['url']:
             continue
+        if producto['url'].startswith('/'):
+            producto['url'] = f"{KTRONIX_CONFIG['base_url']}{producto['url']}"
+        elif not producto['url'].startswith('http'):
+            producto['url'] = f"{KTRONIX_CONFIG['base_url']}/{producto['url']}"
+        
+        producto['nombre'] = tarjeta['nombre']
+        
+        # Precio del listado si está disponible
+        precio_limpio = re.sub(r'[^\d]', '', tarjeta['precio'] or '')
+        producto['precio_listado'] = int(precio_limpio) if precio_limpio else None
+        
+        producto['dispositivo'] = dispositivo
+        producto['vendedor'] = KTRONIX_CONFIG["defaults"]["seller"]
+        
+        if producto['nombre'] and producto['url']:
+            productos.append(producto)
+            print(f"      ✅ Producto encontrado: {producto['nombre'][:50]}...")
     
     return productos
 
-async def extraer_detalles_producto_ktronix(page, producto: dict, fecha_scraping: str):
+async def extraer_detalles_http_ktronix(producto: dict, fecha_scraping: str):
+    """Camino rápido: la página se renderiza en servidor. Devuelve el producto o None si hay que usar el navegador"""
+    producto['fecha_scraping'] = fecha_scraping
+    datos = await extraer_datos_http_ktronix(producto['url'])
+    if not datos:
+        print(f"    ↪️ HTML sin los marcadores esperados, usando el navegador")
+        return None
+    producto.update(datos)
+    print(f"      ✅ Producto procesado por HTTP (sin navegador)")
+    return producto
+
+async def extraer_detalles_producto_ktronix(page, producto: dict, fecha_scraping: str, probar_http: bool = True):
     url = producto['url']
     producto['fecha_scraping'] = fecha_scraping
     
+    # Camino rápido: el navegador solo si el HTML servido no trae los marcadores
+    if HTTP_DIRECTO and probar_http:
+        detalle = await extraer_detalles_http_ktronix(producto, fecha_scraping)
+        if detalle:
+            return detalle
+    
     # Reintentos para cargar la página del producto
     for intento in range(3):
         try:
             print(f"🔄 Cargando producto (intento {intento + 1}/3)")
             
-            # Timeout progresivo
+            # Timeout según la latencia observada; el progresivo fijo solo mientras no hay muestras
             timeouts = [10000, 15000, 20000]
-            timeout = timeouts[intento]
+            timeout = timeout_carga("ktronix/producto", timeouts[intento], intento)
             
-            # Estrategia de carga múltiple
-            carga_exitosa = False
+            # Una sola navegación: en cuanto el precio o el título están en el DOM se extrae
+            marcador = await cargar_hasta_marcador(page, url, "ktronix/producto", MARCADORES_PRODUCTO, timeout,
+                                                   estado="attached")
+            if not marcador:
+                raise Exception("No apareció el precio ni el título del producto")
+            print(f"    ✅ Producto listo ({marcador})")
             
-            # Método 1: domcontentloaded (más rápido)
+            # Precios y especificaciones en una sola llamada
             try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
-                await asyncio.sleep(0.5)
-                carga_exitosa = True
-                print(f"    ✅ Carga exitosa con domcontentloaded")
-            except Exception as e1:
-                print(f"    ⚠️ domcontentloaded falló: {str(e1)[:50]}...")
-                
-                # Método 2: networkidle (más lento pero más completo)
-                try:
-                    await page.goto(url, wait_until="networkidle", timeout=timeout)
-                    await asyncio.sleep(0.3)
-                    carga_exitosa = True
-                    print(f"    ✅ Carga exitosa con networkidle")
-                except Exception as e2:
-                    print(f"    ⚠️ networkidle falló: {str(e2)[:50]}...")
-                    
-                    # Método 3: load (fallback básico)
-                    try:
-                        await page.goto(url, wait_until="load", timeout=timeout)
-                        await asyncio.sleep(0.5)
-                        carga_exitosa = True
-                        print(f"    ✅ Carga exitosa con load")
-                    except Exception as e3:
-                        print(f"    ❌ Todos los métodos de carga fallaron")
-                        raise e3
-            
-            if not carga_exitosa:
-                raise Exception("No se pudo cargar la página con ningún método")
-            
-            # Extraer datos con timeouts individuales
-            try:
-                precios = await extraer_precios_producto_ktronix(page)
-                producto.update(precios)
+                producto.update(await extraer_datos_producto_ktronix(page))
             except Exception as e:
-                print(f"      ⚠️ Error extrayendo precios: {str(e)}")
-            
-            try:
-                especificaciones = await extraer_especificaciones_ktronix(page)
-                producto.update(especificaciones)
-            except Exception as e:
-                print(f"      ⚠️ Error extrayendo especificaciones: {str(e)}")
+                print(f"      ⚠️ Error extrayendo datos del producto: {str(e)}")
             
             print(f"      ✅ Producto procesado exitosamente")
             break  # Si llegamos aquí, el producto se procesó correctamente
@@ -252,22 +239,14 @@ async def extraer_detalles_producto_ktronix(page, producto: dict, fecha_scraping
                 print(f"      ❌ Error procesando producto después de 3 intentos: {str(e)}")
                 print(f"      🔄 Intentando extracción básica sin cargar página completa...")
                 
-                # Estrategia de fallback: intentar extraer datos básicos sin carga completa
+                # Sin volver a navegar: lo que haya llegado del último intento puede traer los precios
                 try:
-                    # Intentar cargar solo el HTML básico
-                    await page.goto(url, wait_until="domcontentloaded", timeout=5000)
-                    await asyncio.sleep(0.2)
-                    
-                    # Intentar extraer solo precios básicos
-                    try:
-                        precios_basicos = await extraer_precios_basicos_ktronix(page)
-                        producto.update(precios_basicos)
-                        print(f"      ✅ Datos básicos extraídos exitosamente")
-                    except:
-                        print(f"      ⚠️ No se pudieron extraer datos básicos")
-                    
+                    datos_basicos = await extraer_datos_producto_ktronix(page)
+                    producto.update({clave: datos_basicos[clave] for clave in
+                                     ('precio_ktronix', 'precio_descuento', 'precio_normal', 'porcentaje_descuento')})
+                    print(f"      ✅ Datos básicos extraídos exitosamente")
                 except:
-                    print(f"      ❌ Fallback también falló")
+                    print(f"      ⚠️ No se pudieron extraer datos básicos")
                 
                 # Agregar datos básicos al producto
                 producto.update({
@@ -284,177 +263,117 @@ async def extraer_detalles_producto_ktronix(page, producto: dict, fecha_scraping
                 })
             else:
                 print(f"⚠️ Error en intento {intento + 1}: {str(e)}, reintentando...")
-                await asyncio.sleep(0.5)
+                await esperar_reintento(url, intento)
                 continue
     
     return producto
 
-async def extraer_precios_producto_ktronix(page):
-    precios = {
-        'precio_ktronix': None,      # Precio principal
-        'precio_descuento': None,    # Precio con descuento
-        'precio_normal': None,       # Precio original tachado
-        'porcentaje_descuento': None
+def selectores_producto_ktronix():
+    """Textos y tabla a leer de la página de producto (mismos selectores para DOM y HTML)"""
+    pagina = KTRONIX_CONFIG["product_page"]
+    textos = {
+        "precio_ktronix": pagina["price_main"],
+        "precio_normal": pagina["price_original"],
+        "precio_descuento": pagina["price_discount"],
+        "beneficios": pagina["benefits"],
+        "titulo": pagina["title"],
     }
-    try:
-        # Buscar precio principal usando el selector específico de Ktronix
-        precio_main_element = await page.query_selector(KTRONIX_CONFIG["product_page"]["price_main"])
-        if precio_main_element:
-            precio_texto = await precio_main_element.inner_text()
-            print(f"    📊 Precio texto crudo: '{precio_texto}'")
-            
-            # Limpiar el precio removiendo todo excepto números
-            precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-            if precio_limpio:
-                precios['precio_ktronix'] = int(precio_limpio)
-                print(f"    ✅ Precio extraído: ${precios['precio_ktronix']:,}")
-            else:
-                print(f"    ⚠️ No se pudo extraer precio de: '{precio_texto}'")
-        
-        # Buscar precio tachado (precio original)
-        precio_tachado_selectors = [
-            '.price-original',
-            '.price-before',
-            '.old-price',
-            '.price-tachado',
-            '.price-crossed'
-        ]
-        
-        for selector in precio_tachado_selectors:
-            precio_element = await page.query_selector(selector)
-            if precio_element:
-                precio_texto = await precio_element.inner_text()
-                precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-                if precio_limpio:
-                    precios['precio_normal'] = int(precio_limpio)
-                    break
-        
-        # Buscar precio con descuento
-        precio_descuento_selectors = [
-            '.price-discount',
-            '.price-sale',
-            '.price-promo',
-            '.price-offer'
-        ]
-        
-        for selector in precio_descuento_selectors:
-            precio_element = await page.query_selector(selector)
-            if precio_element:
-                precio_texto = await precio_element.inner_text()
-                precio_limpio = re.sub(r'[^\d]', '', precio_texto)
-                if precio_limpio:
-                    precios['precio_descuento'] = int(precio_limpio)
-                    break
-        
-        # Calcular porcentaje de descuento si tenemos ambos precios
-        if precios['precio_normal'] and precios['precio_ktronix']:
-            descuento = ((precios['precio_normal'] - precios['precio_ktronix']) / precios['precio_normal']) * 100
-            precios['porcentaje_descuento'] = int(descuento)
-        
-        # Buscar porcentaje de descuento en badges o elementos especiales
-        badges_element = await page.query_selector(KTRONIX_CONFIG["product_page"]["benefits"])
-        if badges_element:
-            badges_texto = await badges_element.inner_text()
-            match = re.search(r'(\d+)%', badges_texto)
-            if match:
-                precios['porcentaje_descuento'] = int(match.group(1))
-            
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo precios: {str(e)}")
-    return precios
-
-async def extraer_precios_basicos_ktronix(page):
-    """Extrae precios básicos con timeouts más cortos para páginas problemáticas"""
-    precios = {
-        'precio_ktronix': None,
-        'precio_descuento': None,
-        'precio_normal': None,
-        'porcentaje_descuento': None
+    tabla = {
+        "filas": pagina["specs_container"],
+        "nombre": pagina["spec_name"],
+        "valor": pagina["spec_value"],
     }
-    try:
-        # Buscar precios con timeouts más cortos
-        selectores_precio = [
-            ('#js-original_price', 'precio_ktronix'),
-            ('.price-discount', 'precio_descuento'),
-            ('.price-original', 'precio_normal'),
-            (KTRONIX_CONFIG["product_page"]["benefits"], 'porcentaje_descuento')
-        ]
-        
-        for selector, campo in selectores_precio:
-            try:
-                elemento = await page.query_selector(selector)
-                if elemento:
-                    texto = await elemento.inner_text()
-                    if campo == 'porcentaje_descuento':
-                        match = re.search(r'(\d+)%', texto)
-                        if match:
-                            precios[campo] = int(match.group(1))
-                    else:
-                        precio_limpio = re.sub(r'[^\d]', '', texto)
-                        if precio_limpio:
-                            precios[campo] = int(precio_limpio)
-            except:
-                continue
-                
-    except Exception as e:
-        print(f"    ⚠️ Error extrayendo precios básicos: {str(e)}")
-    return precios
+    return textos, tabla
 
-async def extraer_especificaciones_ktronix(page):
-    especificaciones = {
+def mapear_datos_producto_ktronix(textos: dict, filas: list):
+    """Convierte los textos y filas de la página de producto en los campos del producto"""
+    datos = {
+        'precio_ktronix': None,      # Precio principal
+        'precio_descuento': None,    # Precio con descuento
+        'precio_normal': None,       # Precio original tachado
+        'porcentaje_descuento': None,
         'memoria_interna': None,
         'memoria_ram': None,
         'color': None,
         'modelo': None,
         'condicion': None
     }
+    
+    # Precios
+    if textos["precio_ktronix"]:
+        print(f"    📊 Precio texto crudo: '{textos['precio_ktronix']}'")
+    datos['precio_ktronix'] = a_entero(textos["precio_ktronix"])
+    if datos['precio_ktronix']:
+        print(f"    ✅ Precio extraído: ${datos['precio_ktronix']:,}")
+    datos['precio_normal'] = a_entero(textos["precio_normal"])
+    datos['precio_descuento'] = a_entero(textos["precio_descuento"])
+    
+    # Calcular porcentaje de descuento si tenemos ambos precios; el badge tiene prioridad
+    if datos['precio_normal'] and datos['precio_ktronix']:
+        descuento = ((datos['precio_normal'] - datos['precio_ktronix']) / datos['precio_normal']) * 100
+        datos['porcentaje_descuento'] = int(descuento)
+    datos['porcentaje_descuento'] = porcentaje(textos["beneficios"]) or datos['porcentaje_descuento']
+    
+    # Especificaciones de la tabla
+    datos.update(mapear_filas(filas, REGLAS_ESPECIFICACIONES_KTRONIX))
+    
+    # Si no se encontraron especificaciones estructuradas, intentar extraer del título
+    if not any(datos[campo_spec] for campo_spec in ('memoria_interna', 'memoria_ram', 'color', 'modelo', 'condicion')) and textos["titulo"]:
+        datos.update(extraer_especificaciones_texto_ktronix(textos["titulo"]))
+    
+    # Condición por defecto
+    if not datos['condicion']:
+        datos['condicion'] = "Nuevo"
+    return datos
+
+async def extraer_datos_producto_ktronix(page):
+    """Precios y especificaciones de la página de producto en un solo page.evaluate"""
+    textos, tabla = selectores_producto_ktronix()
+    textos, filas = await extraer_detalle(page, textos, tabla=tabla)
+    return mapear_datos_producto_ktronix(textos, filas)
+
+def parsear_html_producto_ktronix(html: str):
+    """Extrae los campos del producto del HTML servido (sin ejecutar JS).
+
+    Devuelve None si faltan los marcadores esperados (precio principal), señal de que
+    la página necesita el navegador.
+    """
+    sopa = BeautifulSoup(html, "html.parser")
+    selectores, tabla = selectores_producto_ktronix()
+    
+    textos = {}
+    for nombre, candidatos in selectores.items():
+        textos[nombre] = None
+        for selector in [candidatos] if isinstance(candidatos, str) else candidatos:
+            nodo = sopa.select_one(selector)
+            texto = nodo.get_text(" ", strip=True) if nodo else None
+            if texto:
+                textos[nombre] = texto
+                break
+    if not a_entero(textos["precio_ktronix"]):
+        return None
+    
+    filas = []
+    for fila in sopa.select(tabla["filas"]):
+        nombre = fila.select_one(tabla["nombre"])
+        valor = fila.select_one(tabla["valor"])
+        if nombre and valor:
+            filas.append([nombre.get_text(" ", strip=True), valor.get_text(" ", strip=True)])
+    return mapear_datos_producto_ktronix(textos, filas)
+
+async def extraer_datos_http_ktronix(url: str):
+    """Camino rápido sin navegador: GET con conexión keep-alive + parseo del HTML; None si hay que escalar"""
     try:
-        # Buscar especificaciones usando los selectores de Ktronix
-        specs_elements = await page.query_selector_all(KTRONIX_CONFIG["product_page"]["specs_container"])
-        
-        for spec_element in specs_elements:
-            try:
-                # Nombre de la característica
-                nombre_element = await spec_element.query_selector(KTRONIX_CONFIG["product_page"]["spec_name"])
-                # Valor de la característica
-                valor_element = await spec_element.query_selector(KTRONIX_CONFIG["product_page"]["spec_value"])
-                
-                if nombre_element and valor_element:
-                    nombre = await nombre_element.inner_text()
-                    valor = await valor_element.inner_text()
-                    
-                    # Mapear características específicas
-                    if "Capacidad de almacenamiento" in nombre or "Memoria interna" in nombre or "Almacenamiento" in nombre:
-                        especificaciones['memoria_interna'] = valor
-                    elif "Memoria RAM" in nombre or "RAM" in nombre or "Memoria del sistema" in nombre:
-                        especificaciones['memoria_ram'] = valor
-                    elif "Modelo" in nombre or "Versión" in nombre:
-                        especificaciones['modelo'] = valor
-                    elif "Color" in nombre or "Colores" in nombre:
-                        especificaciones['color'] = valor
-                    elif "Condición" in nombre or "Estado" in nombre:
-                        especificaciones['condicion'] = valor
-                        
-            except Exception:
-                continue
-        
-        # Si no se encontraron especificaciones estructuradas, intentar extraer del título
-        if not any(especificaciones.values()):
-            titulo_element = await page.query_selector('h1')
-            if titulo_element:
-                titulo_texto = await titulo_element.inner_text()
-                especificaciones_texto = await extraer_especificaciones_texto_ktronix(titulo_texto)
-                especificaciones.update(especificaciones_texto)
-        
-        # Condición por defecto
-        if not especificaciones['condicion']:
-            especificaciones['condicion'] = "Nuevo"
-            
+        estado_http, html = await obtener_html(url, user_agent=USER_AGENTS[0])
     except Exception as e:
-        print(f"    ⚠️ Error extrayendo especificaciones: {str(e)}")
-    return especificaciones
+        print(f"    ⚠️ Descarga HTTP falló: {str(e)[:50]}...")
+        return None
+    if estado_http != 200:
+        print(f"    ⚠️ Descarga HTTP devolvió {estado_http}")
+        return None
+    return parsear_html_producto_ktronix(html)
 
-async def extraer_especificaciones_texto_ktronix(titulo_texto):
+def extraer_especificaciones_texto_ktronix(titulo_texto):
     """Extrae especificaciones del texto del título cuando no hay especificaciones estructuradas"""
     especificaciones = {}
     try:
@@ -528,32 +447,34 @@ async def scrape_ktronix():
     print(f"🚀 Iniciando scraper Ktronix para {len(DISPOSITIVOS)} dispositivos")
     print("=" * 60)
     
-    # Limpiar caché de Playwright al inicio
-    await limpiar_cache_playwright()
-    
     # Lista para almacenar archivos temporales
     archivos_temporales = []
     
-    # Procesar cada dispositivo por separado
-    for i, dispositivo in enumerate(DISPOSITIVOS):
-        print(f"\n[DEVICE {i+1}/{len(DISPOSITIVOS)}] Procesando: {dispositivo}")
-        print("=" * 50)
-        
-        # Procesar dispositivo individual
-        productos_dispositivo = await procesar_dispositivo_individual_ktronix(dispositivo, fecha_scraping)
-        
-        if productos_dispositivo:
-            # Guardar Excel temporal para este dispositivo
-            archivo_temporal = await guardar_excel_temporal_ktronix(productos_dispositivo, dispositivo, i+1)
-            if archivo_temporal:
-                archivos_temporales.append(archivo_temporal)
-                print(f"[SAVE] Archivo temporal guardado: {archivo_temporal}")
-        else:
-            print(f"[WARN] No se encontraron productos para {dispositivo}")
+    # Los navegadores se lanzan una sola vez y se comparten entre dispositivos
+    await iniciar_pool()
+    try:
+        # Procesar cada dispositivo por separado
+        for i, dispositivo in enumerate(DISPOSITIVOS):
+            print(f"\n[DEVICE {i+1}/{len(DISPOSITIVOS)}] Procesando: {dispositivo}")
+            print("=" * 50)
+        
+            # Procesar dispositivo individual
+            productos_dispositivo = await procesar_dispositivo_individual_ktronix(dispositivo, fecha_scraping)
+        
+            if productos_dispositivo:
+                # Guardar Excel temporal para este dispositivo
+                archivo_temporal = await guardar_excel_temporal_ktronix(productos_dispositivo, dispositivo, i+1)
+                if archivo_temporal:
+                    archivos_temporales.append(archivo_temporal)
+                    print(f"[SAVE] Archivo temporal guardado: {archivo_temporal}")
+            else:
+                print(f"[WARN] No se encontraron productos para {dispositivo}")
         
-        # Liberar memoria explícitamente
-        await liberar_memoria_ktronix()
-        print(f"[MEMORY] Memoria liberada después de procesar {dispositivo}")
+            # Liberar memoria explícitamente
+            await liberar_memoria_ktronix()
+            print(f"[MEMORY] Memoria liberada después de procesar {dispositivo}")
+    finally:
+        await cerrar_pool()
     
     # Combinar todos los archivos Excel al final
     if archivos_temporales:
@@ -567,93 +488,69 @@ async def scrape_ktronix():
             print("[ERROR] No se pudo crear el archivo final")
     else:
         print("[ERROR] No se encontraron productos para ningún dispositivo")
+        return None
+    
+    return archivo_final
 
 async def procesar_dispositivo_individual_ktronix(dispositivo: str, fecha_scraping: str):
-    """Procesa un dispositivo individual con su propia instancia de Playwright"""
+    """Procesa un dispositivo individual con su propio contexto del pool de navegadores"""
     productos_dispositivo = []
+    context = None
+    page = None
     
-    # Pequeña pausa para evitar sobrecarga del sistema
-    await asyncio.sleep(0.1)
+    # Sin tiempo en el plazo de la ejecución ni para el listado: el dispositivo queda en el reporte
+    if not puede_empezar("ktronix", "listado", dispositivo):
+        return productos_dispositivo
     
-    async with async_playwright() as p:
-        browser = None
-        context = None
-        page = None
-        
-        for intento in range(3):
-            try:
+    for intento in range(3):
+        try:
+            if context is None:
                 user_agent = random.choice(USER_AGENTS)
                 print(f"🖥️ User-Agent usado: {user_agent}")
                 
-                # Crear browser con opciones optimizadas
-                browser = await p.chromium.launch(
-                    headless=True, 
-                    args=[
-                        f'--user-agent={user_agent}',
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-web-security',
-                        '--disable-features=VizDisplayCompositor'
-                    ]
-                )
-                
-                # Crear context con configuración optimizada
-                context = await browser.new_context(
+                # Contexto aislado sobre un navegador ya lanzado del pool
+                context = await nuevo_contexto(
+                    "ktronix",
                     viewport={"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT},
                     user_agent=user_agent
                 )
-                
-                # Crear página
-                page = await context.new_page()
-                
-                print(f"🔍 Búsqueda: {dispositivo}")
-                await asyncio.sleep(random.uniform(0.05, 0.15))
-                
-                productos_busqueda = await scrape_busqueda_inicial_ktronix(page, dispositivo)
-                if productos_busqueda:
-                    print(f"✅ Encontrados {len(productos_busqueda)} productos en búsqueda inicial")
-                    # Procesar productos en lotes para reducir CPU y memoria
-                    productos_dispositivo = await procesar_productos_por_lotes_ktronix(page, productos_busqueda, fecha_scraping)
-                else:
-                    print(f"⚠️ No se encontraron productos para {dispositivo}")
-                
-                # Limpieza explícita y ordenada
+            else:
+                # En reintentos solo se reemplaza el contexto si está roto, nunca el navegador
+                context = await obtener_contexto_saludable(context)
+            
+            # Crear página
+            page = await context.new_page()
+            
+            print(f"🔍 Búsqueda: {dispositivo}")
+            
+            productos_busqueda = await scrape_busqueda_inicial_ktronix(page, dispositivo)
+            if productos_busqueda:
+                print(f"✅ Encontrados {len(productos_busqueda)} productos en búsqueda inicial")
+                # Procesar detalles con un pool acotado de páginas concurrentes
+                productos_dispositivo = await procesar_productos_concurrentes_ktronix(page, productos_busqueda, fecha_scraping)
+            else:
+                print(f"⚠️ No se encontraron productos para {dispositivo}")
+            
+            await page.close()
+            break  # Si llegamos aquí, el procesamiento fue exitoso
+            
+        except Exception as e:
+            print(f"❌ Error en intento {intento + 1} para {dispositivo}: {str(e)}")
+            
+            # Limpieza en caso de error
+            try:
                 if page:
                     await page.close()
-                if context:
-                    await context.close()
-                if browser:
-                    await browser.close()
-                
-                break  # Si llegamos aquí, el procesamiento fue exitoso
-                
-            except Exception as e:
-                print(f"❌ Error en intento {intento + 1} para {dispositivo}: {str(e)}")
-                
-                # Limpieza en caso de error
-                try:
-                    if page:
-                        await page.close()
-                except:
-                    pass
-                try:
-                    if context:
-                        await context.close()
-                except:
-                    pass
-                try:
-                    if browser:
-                        await browser.close()
-                except:
-                    pass
-                
-                if intento == 2:  # Último intento
-                    print(f"❌ Falló después de 3 intentos para {dispositivo}")
-                else:
-                    await asyncio.sleep(1)  # Esperar antes del siguiente intento
-                continue
+            except:
+                pass
+            
+            if intento == 2:  # Último intento
+                print(f"❌ Falló después de 3 intentos para {dispositivo}")
+            else:
+                await esperar_reintento(KTRONIX_CONFIG["base_url"], intento)
+            continue
     
+    await cerrar_contexto(context)
     return productos_dispositivo
 
 async def guardar_excel_temporal_ktronix(productos, dispositivo, numero_dispositivo):
@@ -750,93 +647,45 @@ async def limpiar_archivos_temporales_ktronix(archivos_temporales):
     except Exception as e:
         print(f"[WARN] Error limpiando archivos temporales: {e}")
 
-async def procesar_productos_por_lotes_ktronix(page, productos_busqueda, fecha_scraping):
-    """Procesa productos en lotes para reducir CPU y memoria"""
-    productos_dispositivo = []
-    TAMANO_LOTE = 4  # Procesar 4 productos por lote
-    fallos_consecutivos = 0
-    MAX_FALLOS_CONSECUTIVOS = 3  # Saltar lote si hay muchos fallos seguidos
+async def procesar_productos_concurrentes_ktronix(page, productos_busqueda, fecha_scraping):
+    """Procesa los detalles con PAGINAS_DETALLE trabajadores concurrentes; cada uno abre su página del contexto
+    solo si algún producto no sale por HTTP"""
+    total = len(productos_busqueda)
+    print(f"[WORKERS] Procesando {total} productos con {PAGINAS_DETALLE} páginas concurrentes")
     
-    # Dividir productos en lotes
-    lotes = [productos_busqueda[i:i + TAMANO_LOTE] for i in range(0, len(productos_busqueda), TAMANO_LOTE)]
+    async def procesar(obtener_pagina, producto):
+        if not puede_empezar("ktronix", "producto", producto['url']):
+            # Fuera del plazo: se conserva con los datos del listado
+            producto['fecha_scraping'] = fecha_scraping
+            return producto
+        print(f"  🔍 Procesando producto: {producto['nombre'][:50]}...")
+        print(f"    🔗 URL: {producto['url']}")
+        with medir_tarea("ktronix", "producto"):
+            if HTTP_DIRECTO:
+                detalle = await extraer_detalles_http_ktronix(producto, fecha_scraping)
+                if detalle:
+                    return detalle
+            # Solo se abre una página de Chromium cuando el producto escala al navegador
+            return await extraer_detalles_producto_ktronix(await obtener_pagina(), producto, fecha_scraping, probar_http=False)
     
-    print(f"[LOTES] Procesando {len(productos_busqueda)} productos en {len(lotes)} lotes de {TAMANO_LOTE}")
+    def en_error(producto, e):
+        print(f"    ❌ Error procesando producto: {str(e)}")
+        producto['fecha_scraping'] = fecha_scraping
+        return producto
     
-    for lote_idx, lote in enumerate(lotes):
-        print(f"[LOTE {lote_idx + 1}/{len(lotes)}] Procesando {len(lote)} productos...")
-        
-        # Verificar si hay demasiados fallos consecutivos
-        if fallos_consecutivos >= MAX_FALLOS_CONSECUTIVOS:
-            print(f"[SKIP] Demasiados fallos consecutivos ({fallos_consecutivos}), saltando lote...")
-            fallos_consecutivos = 0  # Resetear contador
-            continue
-        
-        fallos_lote = 0
-        
-        # Procesar productos del lote sin delays individuales
-        for i, producto in enumerate(lote):
-            print(f"  🔍 Procesando producto {i+1}/{len(lote)}: {producto['nombre'][:50]}...")
-            print(f"    🔗 URL: {producto['url']}")
-            
-            try:
-                producto_con_detalles = await extraer_detalles_producto_ktronix(page, producto, fecha_scraping)
-                productos_dispositivo.append(producto_con_detalles)
-                fallos_consecutivos = 0  # Resetear contador de fallos
-            except Exception as e:
-                print(f"    ❌ Error procesando producto: {str(e)}")
-                producto['fecha_scraping'] = fecha_scraping
-                productos_dispositivo.append(producto)
-                fallos_lote += 1
-                fallos_consecutivos += 1
-                continue
-        
-        # Actualizar contador de fallos consecutivos
-        if fallos_lote == len(lote):
-            print(f"[WARN] Todos los productos del lote fallaron")
-        else:
-            fallos_consecutivos = 0  # Resetear si al menos uno funcionó
-        
-        # Delay solo al final de cada lote (no entre productos individuales)
-        if lote_idx < len(lotes) - 1:  # No delay en el último lote
-            print(f"[LOTE] Pausa entre lotes...")
-            await asyncio.sleep(0.1)  # Pausa solo entre lotes
-            
-            # Liberar memoria después de cada lote
-            gc.collect()
-            print(f"[MEMORY] Memoria liberada después del lote {lote_idx + 1}")
+    # Los resultados vuelven en el mismo orden del listado
+    productos_dispositivo = await procesar_en_paginas(page.context, productos_busqueda, procesar, PAGINAS_DETALLE, en_error,
+                                                     bajo_demanda=True)
     
-    print(f"[LOTES] Procesamiento por lotes completado: {len(productos_dispositivo)} productos")
+    print(f"[WORKERS] Procesamiento concurrente completado: {len(productos_dispositivo)} productos")
     return productos_dispositivo
 
-async def limpiar_cache_playwright():
-    """Limpia el caché de Playwright para evitar errores de sincronización"""
-    try:
-        cache_paths = [
-            "/root/.cache/ms-playwright",
-            os.path.expanduser("~/.cache/ms-playwright"),
-            "/tmp/ms-playwright"
-        ]
-        
-        for cache_path in cache_paths:
-            if os.path.exists(cache_path):
-                shutil.rmtree(cache_path)
-                print(f"[CACHE] Caché limpiado: {cache_path}")
-        
-        print("[CACHE] Limpieza de caché de Playwright completada")
-        
-    except Exception as e:
-        print(f"[WARN] Error limpiando caché de Playwright: {e}")
-
 async def liberar_memoria_ktronix():
     """Libera memoria explícitamente"""
     try:
         # Forzar recolección de basura
         gc.collect()
         print("[MEMORY] Recolección de basura ejecutada")
-        
-        # Pausa mínima para reducir CPU
-        await asyncio.sleep(0.1)
-        
     except Exception as e:
         print(f"[WARN] Error liberando memoria: {e}")
 
@@ -0,0 +1,111 @@
+import json
+import os
+
+# Selectores candidatos "en carrera": en lugar de esperar cada candidato uno tras otro con su
+# propio timeout, se espera una sola vez al selector combinado ("a, b, c") y luego se mira cuál
+# coincidió. El ganador por retailer y tipo de página se guarda en data/ y se prueba primero en
+# la siguiente ejecución; un cambio de maquetación cuesta milisegundos y no timeouts apilados.
+ARCHIVO_SELECTORES = os.path.join("data", "selectores.json")
+
+# Con visible=true el candidato solo cuenta si alguno de sus elementos se ve (mismo criterio que
+# state="visible" de Playwright: caja no vacía y sin visibility:hidden); si no, basta con que exista
+JS_PRIMER_SELECTOR = """
+([candidatos, visible]) => {
+    const seVe = (el) => el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden';
+    for (const selector of candidatos) {
+        try {
+            const elementos = document.querySelectorAll(selector);
+            if (visible ? Array.from(elementos).some(seVe) : elementos.length > 0) return selector;
+        } catch (e) {}
+    }
+    return null;
+}
+"""
+
+# clave -> {"ganador": selector, "conteos": {selector: [aciertos, fallos]}}
+_aprendidos = None
+_cambios = {}  # mismo formato, solo lo ocurrido en este proceso (para unirlo con el archivo)
+
+
+def _leer_archivo() -> dict:
+    try:
+        with open(ARCHIVO_SELECTORES, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cargar() -> dict:
+    global _aprendidos
+    if _aprendidos is None:
+        _aprendidos = _leer_archivo()
+    return _aprendidos
+
+
+def ordenar_candidatos(clave: str, candidatos: list) -> list:
+    """Candidatos con el último ganador primero; el resto conserva su orden de preferencia"""
+    ganador = _cargar().get(clave, {}).get("ganador")
+    if ganador in candidatos:
+        return [ganador] + [selector for selector in candidatos if selector != ganador]
+    return list(candidatos)
+
+
+def _contar(clave: str, selector: str, posicion: int):
+    for destino in (_cargar(), _cambios):
+        conteos = destino.setdefault(clave, {}).setdefault("conteos", {})
+        conteos.setdefault(selector, [0, 0])[posicion] += 1
+
+
+def registrar_selector(clave: str, candidatos: list, selector):
+    """Anota el selector que coincidió (acierto) y, si no era el ganador anterior, un fallo para este"""
+    anterior = _cargar().get(clave, {}).get("ganador")
+    if anterior and anterior != selector and anterior in candidatos:
+        _contar(clave, anterior, 1)
+    if selector is None:
+        return
+    _contar(clave, selector, 0)
+    if selector != anterior:
+        print(f"[SELECTORES] {clave}: nuevo selector ganador {selector!r} (antes {anterior!r})")
+    for destino in (_aprendidos, _cambios):
+        destino.setdefault(clave, {})["ganador"] = selector
+
+
+async def esperar_primero(page, clave: str, candidatos: list, timeout: float, estado: str = "visible"):
+    """Espera a que aparezca cualquiera de los candidatos en una sola espera.
+
+    Devuelve el selector que coincidió (en orden de preferencia aprendido) o None si ninguno
+    apareció dentro del timeout. Con estado="attached" basta con que esté en el DOM (p. ej. un <script>).
+    """
+    candidatos = ordenar_candidatos(clave, candidatos)
+    try:
+        await page.wait_for_selector(", ".join(candidatos), timeout=timeout, state=estado)
+    except Exception:
+        registrar_selector(clave, candidatos, None)
+        return None
+    selector = await page.evaluate(JS_PRIMER_SELECTOR, [candidatos, estado == "visible"])
+    registrar_selector(clave, candidatos, selector)
+    return selector
+
+
+def guardar_selectores():
+    """Une lo aprendido en este proceso con el archivo (otros procesos pueden haberlo actualizado)"""
+    if not _cambios:
+        return
+    guardados = _leer_archivo()
+    for clave, cambios in _cambios.items():
+        destino = guardados.setdefault(clave, {})
+        if "ganador" in cambios:
+            destino["ganador"] = cambios["ganador"]
+        conteos = destino.setdefault("conteos", {})
+        for selector, (aciertos, fallos) in cambios.get("conteos", {}).items():
+            previo = conteos.get(selector, [0, 0])
+            conteos[selector] = [previo[0] + aciertos, previo[1] + fallos]
+    try:
+        os.makedirs(os.path.dirname(ARCHIVO_SELECTORES), exist_ok=True)
+        temporal = f"{ARCHIVO_SELECTORES}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(guardados, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, ARCHIVO_SELECTORES)
+        _cambios.clear()
+    except OSError as e:
+        print(f"[SELECTORES] No se pudo guardar {ARCHIVO_SELECTORES}: {e}")
@@ -0,0 +1,269 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+from datetime import datetime
+
+import control_tasa
+import perfiles_navegador
+import plazos
+import scraper_completo
+import scraper_exito
+import scraper_falabella
+import scraper_ktronix
+from dimensionamiento import calcular_dimensionamiento, procesos_automaticos
+from pool_navegadores import iniciar_pool, cerrar_pool
+
+# Supervisor multiproceso: reparte unidades de trabajo (retailer, dispositivo) entre procesos,
+# cada uno con su propio event loop y su navegador. Así el parseo, pandas y to_excel de un
+# proceso no compiten por el mismo núcleo con el driver de Playwright de los demás.
+# Los resultados vuelven al proceso padre por una cola a medida que termina cada unidad.
+NAVEGADORES_POR_PROCESO = 1
+MAX_INTENTOS_UNIDAD = 2  # una unidad fallida se reintenta en otro proceso
+INTERVALO_SUPERVISION = 1.0  # segundos entre comprobaciones de procesos caídos
+TIMEOUT_CIERRE = 30  # segundos de espera para que los procesos cierren su navegador
+
+# Retailers que se pueden repartir por dispositivo:
+# (módulo, procesar dispositivo, guardar Excel temporal, combinar temporales)
+UNIDADES_DISPOSITIVO = {
+    "ktronix": (scraper_ktronix, scraper_ktronix.procesar_dispositivo_individual_ktronix,
+                scraper_ktronix.guardar_excel_temporal_ktronix, scraper_ktronix.combinar_archivos_excel_ktronix),
+    "falabella": (scraper_falabella, scraper_falabella.procesar_dispositivo_individual_falabella,
+                  scraper_falabella.guardar_excel_temporal_falabella, scraper_falabella.combinar_archivos_excel_falabella),
+    "exito": (scraper_exito, scraper_exito.procesar_dispositivo_individual,
+              scraper_exito.guardar_excel_temporal, scraper_exito.combinar_archivos_excel),
+}
+# MercadoLibre recolecta variaciones de todos los dispositivos antes de procesarlas:
+# se ejecuta entero como una sola unidad
+
+
+def crear_unidades(retailers: list, fecha_scraping: str) -> list:
+    unidades = []
+    for retailer in retailers:
+        if retailer in UNIDADES_DISPOSITIVO:
+            modulo = UNIDADES_DISPOSITIVO[retailer][0]
+            dispositivos = list(enumerate(modulo.DISPOSITIVOS))
+        else:
+            dispositivos = [(0, None)]
+        for indice, dispositivo in dispositivos:
+            unidades.append({
+                "id": len(unidades),
+                "retailer": retailer,
+                "dispositivo": dispositivo,
+                "indice": indice,
+                "fecha_scraping": fecha_scraping,
+                "intentos": 0,
+                "excluidos": set(),  # procesos en los que ya falló
+            })
+    return unidades
+
+
+def _nombre_unidad(unidad: dict) -> str:
+    return f"{unidad['retailer']}/{unidad['dispositivo']}" if unidad["dispositivo"] else unidad["retailer"]
+
+
+async def _ejecutar_unidad(ranura: int, unidad: dict) -> dict:
+    inicio = time.monotonic()
+    resultado = {"id": unidad["id"], "ranura": ranura, "archivo": None, "productos": 0, "error": None}
+    try:
+        if unidad["retailer"] in UNIDADES_DISPOSITIVO:
+            _, procesar, guardar, _ = UNIDADES_DISPOSITIVO[unidad["retailer"]]
+            productos = await procesar(unidad["dispositivo"], unidad["fecha_scraping"])
+            if productos:
+                resultado["productos"] = len(productos)
+                resultado["archivo"] = await guardar(productos, unidad["dispositivo"], unidad["indice"] + 1)
+                # Solo un guardado fallido es un error; un dispositivo sin productos termina bien sin archivo
+                if not resultado["archivo"]:
+                    resultado["error"] = "no se pudo guardar"
+        else:
+            # scrape_completo devuelve None cuando no encontró productos (los errores de guardado lanzan)
+            resultado["archivo"] = await scraper_completo.scrape_completo()
+    except Exception as e:
+        resultado["error"] = f"{type(e).__name__}: {e}"
+    resultado["duracion"] = time.monotonic() - inicio
+    # Lo que no cupo en el plazo viaja con el resultado para el reporte del padre
+    resultado["omitidos"] = plazos.tomar_omitidos()
+    return resultado
+
+
+async def _bucle_trabajador(ranura: int, cola_unidades, cola_resultados, procesos: int, paginas: dict):
+    control_tasa.dividir_ritmo(procesos)
+    for retailer, numero in paginas.items():
+        UNIDADES_DISPOSITIVO[retailer][0].PAGINAS_DETALLE = numero
+    if perfiles_navegador.PERFIL_PERSISTENTE:
+        # Chromium no permite abrir el mismo user_data_dir desde dos procesos
+        perfiles_navegador.DIRECTORIO_PERFILES = f"{perfiles_navegador.DIRECTORIO_PERFILES}_{ranura}"
+
+    await iniciar_pool(NAVEGADORES_POR_PROCESO)
+    try:
+        while True:
+            unidad = await asyncio.to_thread(cola_unidades.get)
+            if unidad is None:
+                break
+            print(f"[PROCESO {ranura}] Iniciando {_nombre_unidad(unidad)}")
+            cola_resultados.put(await _ejecutar_unidad(ranura, unidad))
+    finally:
+        await cerrar_pool()
+
+
+def _trabajador(ranura: int, cola_unidades, cola_resultados, procesos: int, paginas: dict):
+    """Punto de entrada de cada proceso: un event loop y un navegador propios"""
+    asyncio.run(_bucle_trabajador(ranura, cola_unidades, cola_resultados, procesos, paginas))
+
+
+def _lanzar_trabajador(contexto, ranura: int, cola_resultados, procesos: int, paginas: dict) -> dict:
+    cola_unidades = contexto.Queue()
+    proceso = contexto.Process(
+        target=_trabajador,
+        args=(ranura, cola_unidades, cola_resultados, procesos, paginas),
+        name=f"scraper-{ranura}",
+    )
+    proceso.start()
+    return {"proceso": proceso, "cola": cola_unidades, "unidad": None}
+
+
+def _asignar(pendientes: list, trabajadores: dict):
+    """Da una unidad pendiente a cada proceso libre, evitando los procesos donde ya falló"""
+    for ranura, trabajador in trabajadores.items():
+        if trabajador["unidad"] is not None or not trabajador["proceso"].is_alive():
+            continue
+        for unidad in pendientes:
+            # Si falló en todos los procesos, cualquiera puede reintentarla
+            if ranura not in unidad["excluidos"] or len(unidad["excluidos"]) >= len(trabajadores):
+                pendientes.remove(unidad)
+                unidad["intentos"] += 1
+                trabajador["unidad"] = unidad
+                trabajador["cola"].put(unidad)
+                break
+
+
+def supervisar(retailers: list, procesos: int = None, limites: dict = None) -> int:
+    """Ejecuta los retailers repartidos en varios procesos y combina sus archivos por retailer.
+
+    procesos: número de procesos (None = uno por CPU según dimensionamiento).
+    limites: {retailer: páginas de detalle por proceso} que sustituyen a las calculadas.
+    Devuelve 0 si todos los retailers generaron su archivo final (o no encontraron productos)
+    y 1 si alguno falló.
+    """
+    fecha_scraping = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    unidades = crear_unidades(retailers, fecha_scraping)
+    procesos = max(1, min(procesos or procesos_automaticos(), len(unidades)))
+
+    # Las páginas calculadas para toda la máquina se reparten entre los procesos
+    dimension = calcular_dimensionamiento(retailers)
+    paginas = {retailer: max(1, numero // procesos) for retailer, numero in dimension["paginas"].items()
+               if retailer in UNIDADES_DISPOSITIVO}
+    paginas.update(limites or {})
+
+    print(f"[SUPERVISOR] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {len(unidades)} unidades "
+          f"en {procesos} procesos ({', '.join(retailers)})")
+    print(f"[SUPERVISOR] Páginas de detalle por proceso: "
+          f"{', '.join(f'{retailer}={numero}' for retailer, numero in paginas.items()) or '-'}")
+    print("=" * 60)
+    inicio = time.monotonic()
+
+    contexto = multiprocessing.get_context("spawn")
+    cola_resultados = contexto.Queue()
+    trabajadores = {ranura: _lanzar_trabajador(contexto, ranura, cola_resultados, procesos, paginas)
+                    for ranura in range(procesos)}
+    pendientes = list(unidades)
+    resultados = {}  # id de unidad -> resultado final
+
+    def registrar(unidad: dict, resultado: dict):
+        nombre = _nombre_unidad(unidad)
+        plazos.agregar_omitidos(resultado.get("omitidos", []))
+        if resultado["error"] is None:
+            detalle = resultado["productos"] or ("archivo" if resultado["archivo"] else "sin productos")
+            print(f"[SUPERVISOR] ✅ {nombre}: {detalle} "
+                  f"(proceso {resultado['ranura']}, {resultado['duracion']:.1f}s)")
+            resultados[unidad["id"]] = resultado
+        elif unidad["intentos"] < MAX_INTENTOS_UNIDAD:
+            print(f"[SUPERVISOR] ⚠️ {nombre} falló en el proceso {resultado['ranura']} "
+                  f"({resultado['error']}), se reintenta en otro proceso")
+            unidad["excluidos"].add(resultado["ranura"])
+            pendientes.insert(0, unidad)
+        else:
+            print(f"[SUPERVISOR] ❌ {nombre} falló tras {unidad['intentos']} intentos: {resultado['error']}")
+            resultados[unidad["id"]] = resultado
+
+    try:
+        while len(resultados) < len(unidades):
+            # Las unidades que ya no caben en el plazo de su retailer no se empiezan
+            for unidad in list(pendientes):
+                if not plazos.puede_empezar(unidad["retailer"], "listado", _nombre_unidad(unidad)):
+                    pendientes.remove(unidad)
+                    resultados[unidad["id"]] = {"id": unidad["id"], "ranura": None, "archivo": None, "productos": 0,
+                                                "error": "omitida por plazo", "duracion": 0.0}
+            if len(resultados) == len(unidades):
+                break
+            _asignar(pendientes, trabajadores)
+            try:
+                resultado = cola_resultados.get(timeout=INTERVALO_SUPERVISION)
+            except queue.Empty:
+                resultado = None
+            if resultado is not None:
+                trabajador = trabajadores[resultado["ranura"]]
+                if trabajador["unidad"] is not None and trabajador["unidad"]["id"] == resultado["id"]:
+                    unidad, trabajador["unidad"] = trabajador["unidad"], None
+                    registrar(unidad, resultado)
+                elif resultado["error"] is None and resultado["id"] not in resultados:
+                    # Resultado de un proceso que murió justo después de enviarlo: vale aunque ya se reencoló
+                    unidad = unidades[resultado["id"]]
+                    if unidad in pendientes:
+                        pendientes.remove(unidad)
+                    registrar(unidad, resultado)
+
+            # Un proceso caído (OOM killer, crash de Chromium) pierde su unidad: se relanza la ranura
+            for ranura, trabajador in list(trabajadores.items()):
+                if trabajador["proceso"].is_alive():
+                    continue
+                codigo = trabajador["proceso"].exitcode
+                print(f"[SUPERVISOR] Proceso {ranura} terminó con código {codigo}, relanzando")
+                unidad = trabajador["unidad"]
+                trabajadores[ranura] = _lanzar_trabajador(contexto, ranura, cola_resultados, procesos, paginas)
+                if unidad is not None:
+                    registrar(unidad, {"id": unidad["id"], "ranura": ranura, "archivo": None, "productos": 0,
+                                       "error": f"proceso terminado (código {codigo})", "duracion": 0.0})
+    finally:
+        for trabajador in trabajadores.values():
+            if trabajador["proceso"].is_alive():
+                trabajador["cola"].put(None)
+        for trabajador in trabajadores.values():
+            trabajador["proceso"].join(TIMEOUT_CIERRE)
+            if trabajador["proceso"].is_alive():
+                trabajador["proceso"].terminate()
+
+    # Combinar los temporales de cada retailer en el orden de sus dispositivos
+    print("\n" + "=" * 60)
+    print(f"[SUPERVISOR] Resumen ({time.monotonic() - inicio:.1f}s en total)")
+    codigo_salida = 0
+    for retailer in retailers:
+        unidades_retailer = [unidad for unidad in unidades if unidad["retailer"] == retailer]
+        archivos = [resultados[unidad["id"]]["archivo"] for unidad in unidades_retailer
+                    if resultados[unidad["id"]]["archivo"]]
+        if retailer in UNIDADES_DISPOSITIVO and archivos:
+            combinar = UNIDADES_DISPOSITIVO[retailer][3]
+            archivo_final = asyncio.run(combinar(archivos))
+        else:
+            archivo_final = archivos[0] if archivos else None
+        fallidas = [_nombre_unidad(unidad) for unidad in unidades_retailer
+                    if resultados[unidad["id"]]["error"] not in (None, "omitida por plazo")]
+        omitidas = [_nombre_unidad(unidad) for unidad in unidades_retailer
+                    if resultados[unidad["id"]]["error"] == "omitida por plazo"]
+        vacias = [_nombre_unidad(unidad) for unidad in unidades_retailer
+                  if resultados[unidad["id"]]["error"] is None and not resultados[unidad["id"]]["archivo"]]
+        # Sin productos en ninguna unidad no es un fallo: no hay nada que combinar
+        todas_vacias = len(vacias) == len(unidades_retailer)
+        estado = "OK" if archivo_final or todas_vacias else "ERROR"
+        detalle = archivo_final or ("sin productos" if todas_vacias else "sin archivo final")
+        if vacias and not todas_vacias:
+            detalle += f" (sin productos: {', '.join(vacias)})"
+        if fallidas:
+            detalle += f" (fallaron: {', '.join(fallidas)})"
+        if omitidas:
+            detalle += f" (omitidas por plazo: {', '.join(omitidas)})"
+        print(f"  [{estado}] {retailer}: {detalle}")
+        if estado == "ERROR":
+            codigo_salida = 1
+    plazos.guardar_reporte_plazo()
+    return codigo_salida
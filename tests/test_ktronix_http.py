@@ -0,0 +1,60 @@
+import asyncio
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("requests")
+pytest.importorskip("pandas")
+pytest.importorskip("playwright")
+
+from cliente_http import obtener_html
+from scraper_ktronix import parsear_html_producto_ktronix
+
+# Camino rápido de Ktronix (obtener_html + parsear_html_producto_ktronix) contra copias
+# guardadas de páginas de producto servidas con http.server en local
+DIRECTORIO_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class _ManejadorSilencioso(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def servidor_local():
+    manejador = functools.partial(_ManejadorSilencioso, directory=DIRECTORIO_FIXTURES)
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), manejador)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _descargar(url: str):
+    return asyncio.run(obtener_html(url))
+
+
+def test_producto_servido_en_html(servidor_local):
+    estado_http, html = _descargar(f"{servidor_local}/ktronix_producto.html")
+    assert estado_http == 200
+
+    datos = parsear_html_producto_ktronix(html)
+    assert datos["precio_ktronix"] == 5399900
+    assert datos["precio_normal"] == 6299900
+    assert datos["porcentaje_descuento"] == 14
+    assert datos["memoria_interna"] == "256 GB"
+    assert datos["memoria_ram"] == "12 GB"
+    assert datos["modelo"] == "SM-S938B"
+    assert datos["color"] == "Titanio Negro"
+    assert datos["condicion"] == "Nuevo"
+
+
+def test_html_sin_precio_escala_al_navegador(servidor_local):
+    estado_http, html = _descargar(f"{servidor_local}/ktronix_producto_sin_precio.html")
+    assert estado_http == 200
+    assert parsear_html_producto_ktronix(html) is None
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import tiempos_carga
+
+# Timeouts derivados de la ventana de latencias (timeout_carga) cuando parte de las cargas
+# agota su timeout: el timeout no debe crecer ciclo a ciclo por el margen de seguridad
+
+
+@pytest.fixture
+def ventana_vacia(monkeypatch, tmp_path):
+    monkeypatch.setattr(tiempos_carga, "_latencias", {})
+    monkeypatch.setattr(tiempos_carga, "_nuevas", {})
+    monkeypatch.setattr(tiempos_carga, "_tiempos", {})
+    monkeypatch.setattr(tiempos_carga, "_estado", {"archivo": None})
+    monkeypatch.setattr(tiempos_carga, "DIRECTORIO_LOGS", str(tmp_path))
+
+
+def _simular(cargas: int, fraccion_agotadas: float, semilla: int = 7) -> list:
+    """Cargas sanas de ~2 s y una fracción fija de páginas muertas que agotan el timeout"""
+    aleatorio = random.Random(semilla)
+    timeouts = []
+    for _ in range(cargas):
+        timeout = tiempos_carga.timeout_carga("prueba/producto", 90000)
+        timeouts.append(timeout)
+        if aleatorio.random() < fraccion_agotadas:
+            tiempos_carga.registrar_tiempos("prueba/producto", "https://prueba/muerta", timeout / 1000, None, None,
+                                            timeout)
+        else:
+            duracion = aleatorio.uniform(1.5, 2.5)
+            tiempos_carga.registrar_tiempos("prueba/producto", "https://prueba/sana", 0.5, duracion - 0.5, "h1")
+    return timeouts
+
+
+def test_timeout_estable_con_fraccion_fija_de_agotadas(ventana_vacia):
+    timeouts = _simular(2000, 0.10)
+    # Pasado el arranque (timeout por defecto) el timeout queda acotado por las cargas sanas
+    estables = timeouts[tiempos_carga.MIN_MUESTRAS * 2:]
+    assert max(estables) <= 2.5 * tiempos_carga.MARGEN_SEGURIDAD * 1000
+    # Sin deriva: el final de la simulación no tiene timeouts mayores que el principio
+    assert max(estables[-500:]) <= max(estables[:500])
+
+
+def test_agotadas_suben_el_percentil_de_las_completas(ventana_vacia):
+    _simular(200, 0.03)
+    estadisticas = tiempos_carga.percentiles("prueba/producto")
+    completas = [muestra for muestra in tiempos_carga._latencias["prueba/producto"] if muestra is not None]
+    assert 0 < estadisticas["agotadas"] < 0.1
+    assert estadisticas["muestras"] == len(completas)
+    assert estadisticas["p95"] >= tiempos_carga._percentil(completas, 0.95)
+
+
+def test_todas_agotadas_usa_el_timeout_por_defecto(ventana_vacia):
+    _simular(50, 1.0)
+    assert tiempos_carga.percentiles("prueba/producto") is None
+    assert tiempos_carga.timeout_carga("prueba/producto", 90000) == 90000
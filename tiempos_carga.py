@@ -0,0 +1,241 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+from control_tasa import navegar, esperar_reintento, CircuitoAbierto
+from selectores_aprendidos import esperar_primero
+
+# Carga de páginas con una sola navegación: goto con wait_until="commit" (vuelve en cuanto llega
+# la respuesta) y después una espera al marcador del retailer (precio o título). En cuanto el dato
+# está en el DOM se extrae, sin esperar a load/networkidle, que en páginas con anuncios no llegan.
+# El tiempo de cada fase se registra por retailer y tipo de página en logs/ para ajustar los marcadores.
+#
+# Los timeouts salen de la latencia observada: cada clave guarda una ventana de las cargas
+# más recientes en data/latencias.json (compartida entre ejecuciones) y el timeout es su p95
+# (primer intento) o p99 (reintentos) por un margen de seguridad. Una carga que agota su timeout
+# entra en la ventana como null (agotada): no tiene duración, solo se sabe que fue más lenta que
+# las completas. Los percentiles se calculan sobre las completas corrigiendo la fracción por las
+# agotadas (p95 de todas = percentil 0.95 / (1 - agotadas) de las completas), así ni se sesgan a
+# la baja ni el valor del timeout vuelve a entrar en la ventana multiplicado por el margen.
+# Sin muestras suficientes se usa el timeout por defecto.
+DIRECTORIO_LOGS = "logs"
+TIMEOUT_MINIMO_MARCADOR = 2000  # ms que le quedan al marcador aunque el commit haya consumido el timeout
+ARCHIVO_LATENCIAS = os.path.join("data", "latencias.json")
+MUESTRAS_LATENCIA = 200  # ventana de cargas recientes por clave
+MIN_MUESTRAS = 10  # con menos muestras se usa el timeout por defecto
+MARGEN_SEGURIDAD = 1.5
+TIMEOUT_MINIMO_MS = 3000
+TIMEOUT_MAXIMO_MS = 120000
+
+_estado = {"archivo": None}
+_tiempos = {}  # clave -> {"commit": [s], "marcador": [s], "sin_marcador": n}
+_latencias = None  # clave -> [s o None si agotó el timeout] ventana de cargas recientes (incluye ejecuciones anteriores)
+_nuevas = {}  # clave -> [s] medidas en este proceso (para unirlas con el archivo)
+
+
+def _archivo() -> str:
+    if _estado["archivo"] is None:
+        os.makedirs(DIRECTORIO_LOGS, exist_ok=True)
+        _estado["archivo"] = os.path.join(
+            DIRECTORIO_LOGS, f"tiempos_carga_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.csv")
+        with open(_estado["archivo"], "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["fecha", "clave", "commit_s", "marcador_s", "total_s", "marcador", "url"])
+    return _estado["archivo"]
+
+
+def _leer_latencias() -> dict:
+    try:
+        with open(ARCHIVO_LATENCIAS, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cargar_latencias() -> dict:
+    global _latencias
+    if _latencias is None:
+        _latencias = _leer_latencias()
+    return _latencias
+
+
+def percentiles(clave: str):
+    """{"p50", "p95", "p99", "muestras", "agotadas"} de las cargas recientes de la clave, o None sin cargas completas.
+
+    Los percentiles (segundos) son los de todas las cargas suponiendo que las agotadas son las más
+    lentas; "muestras" cuenta las completas y "agotadas" es la fracción de la ventana que agotó el timeout.
+    """
+    ventana = _cargar_latencias().get(clave) or []
+    completas = [muestra for muestra in ventana if muestra is not None]
+    if not completas:
+        return None
+    agotadas = 1 - len(completas) / len(ventana)
+
+    def percentil(fraccion: float) -> float:
+        return _percentil(completas, min(1.0, fraccion / (1 - agotadas)))
+
+    return {"p50": percentil(0.5), "p95": percentil(0.95), "p99": percentil(0.99),
+            "muestras": len(completas), "agotadas": agotadas}
+
+
+def timeout_carga(clave: str, defecto_ms: float, intento: int = 0) -> int:
+    """Timeout (ms) para cargar una página de la clave según su latencia observada.
+
+    Primer intento: p95 x MARGEN_SEGURIDAD; reintentos: p99 x MARGEN_SEGURIDAD, doblando en cada
+    reintento adicional (una carga lenta pero sana termina y entra en la ventana).
+    Con menos de MIN_MUESTRAS devuelve defecto_ms.
+    """
+    estadisticas = percentiles(clave)
+    if not estadisticas or estadisticas["muestras"] < MIN_MUESTRAS:
+        return int(defecto_ms)
+    base = estadisticas["p95"] if intento == 0 else estadisticas["p99"] * 2 ** (intento - 1)
+    return int(min(TIMEOUT_MAXIMO_MS, max(TIMEOUT_MINIMO_MS, base * MARGEN_SEGURIDAD * 1000)))
+
+
+def _anotar_latencia(clave: str, segundos):
+    """Añade una carga a la ventana de la clave (segundos=None: agotó el timeout)"""
+    for destino in (_cargar_latencias(), _nuevas):
+        muestras = destino.setdefault(clave, [])
+        muestras.append(None if segundos is None else round(segundos, 2))
+        del muestras[:-MUESTRAS_LATENCIA]
+
+
+def _es_timeout(error: Exception) -> bool:
+    # playwright.async_api.TimeoutError no hereda del TimeoutError de Python
+    return isinstance(error, TimeoutError) or type(error).__name__ == "TimeoutError"
+
+
+def anotar_duracion(clave: str, segundos: float):
+    """Añade una duración a la ventana de la clave sin pasar por el CSV de fases (p. ej. tareas completas)"""
+    _anotar_latencia(clave, segundos)
+
+
+def registrar_tiempos(clave: str, url: str, commit: float, marcador, selector, timeout: float = None):
+    """Anota las fases de una carga (marcador=None si la navegación falló antes de esperarlo).
+
+    timeout (ms): la carga agotó ese timeout; entra en la ventana de latencias como agotada.
+    """
+    tiempos = _tiempos.setdefault(clave, {"commit": [], "marcador": [], "sin_marcador": 0})
+    tiempos["commit"].append(commit)
+    if selector:
+        tiempos["marcador"].append(marcador)
+        _anotar_latencia(clave, commit + marcador)
+    else:
+        tiempos["sin_marcador"] += 1
+        if timeout:
+            _anotar_latencia(clave, None)
+    try:
+        with open(_archivo(), "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow([
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"), clave, f"{commit:.2f}",
+                "" if marcador is None else f"{marcador:.2f}",
+                f"{commit + (marcador or 0):.2f}", selector or "", url,
+            ])
+    except OSError as e:
+        print(f"[CARGA] No se pudo escribir {_estado['archivo']}: {e}")
+
+
+async def cargar_hasta_marcador(page, url: str, clave: str, marcadores: list, timeout: float,
+                                estado: str = "visible"):
+    """Navega una sola vez y espera al primer marcador; devuelve el selector encontrado o None.
+
+    clave identifica retailer y tipo de página (p. ej. "ktronix/producto") para los tiempos y el
+    orden aprendido de los marcadores. Los errores de navegación se propagan como con navegar().
+    """
+    inicio = time.monotonic()
+    try:
+        await navegar(page, url, wait_until="commit", timeout=timeout)
+    except CircuitoAbierto:
+        raise  # no llegó a navegar: no es un tiempo de carga
+    except Exception as e:
+        registrar_tiempos(clave, url, time.monotonic() - inicio, None, None, timeout if _es_timeout(e) else None)
+        raise
+    commit = time.monotonic() - inicio
+    restante = max(TIMEOUT_MINIMO_MARCADOR, timeout - commit * 1000)
+    selector = await esperar_primero(page, clave, marcadores, restante, estado)
+    # Sin marcador es que se agotó el timeout
+    registrar_tiempos(clave, url, commit, time.monotonic() - inicio - commit, selector, timeout)
+    return selector
+
+
+async def cargar_con_reintentos(page, url: str, clave: str, marcadores: list, defecto_ms: float,
+                                intentos: int = 2, estado: str = "visible"):
+    """cargar_hasta_marcador con reintentos: p95 en el primer intento y p99 en los siguientes.
+
+    Devuelve el selector encontrado o None si ningún intento lo vio; el error del último
+    intento se propaga. Entre intentos se espera con esperar_reintento (backoff del dominio).
+    """
+    for intento in range(intentos):
+        timeout = timeout_carga(clave, defecto_ms, intento)
+        try:
+            selector = await cargar_hasta_marcador(page, url, clave, marcadores, timeout, estado)
+        except CircuitoAbierto:
+            raise
+        except Exception:
+            if intento == intentos - 1:
+                raise
+            selector = None
+        if selector or intento == intentos - 1:
+            return selector
+        await esperar_reintento(url, intento)
+    return None
+
+
+async def cargar_pagina(page, url: str, clave: str, timeout: float, wait_until: str = "domcontentloaded"):
+    """Navegación sin marcador (la página se lee en cuanto llega el evento); registra su tiempo igual"""
+    inicio = time.monotonic()
+    try:
+        respuesta = await navegar(page, url, wait_until=wait_until, timeout=timeout)
+    except CircuitoAbierto:
+        raise
+    except Exception as e:
+        registrar_tiempos(clave, url, time.monotonic() - inicio, None, None, timeout if _es_timeout(e) else None)
+        raise
+    registrar_tiempos(clave, url, time.monotonic() - inicio, 0.0, wait_until)
+    return respuesta
+
+
+def _percentil(valores: list, fraccion: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fraccion * len(ordenados)))]
+
+
+def imprimir_resumen_tiempos():
+    """Mediana y p90 de cada fase por clave; se llama al cerrar el pool"""
+    if not _tiempos:
+        return
+    print(f"[CARGA] Tiempos por fase (detalle en {_estado['archivo']}):")
+    for clave, tiempos in sorted(_tiempos.items()):
+        linea = f"  {clave}: {len(tiempos['commit'])} cargas"
+        for fase in ("commit", "marcador"):
+            if tiempos[fase]:
+                linea += (f", {fase} p50 {_percentil(tiempos[fase], 0.5):.1f}s"
+                          f" p90 {_percentil(tiempos[fase], 0.9):.1f}s")
+        if tiempos["sin_marcador"]:
+            linea += f", {tiempos['sin_marcador']} sin marcador"
+        estadisticas = percentiles(clave)
+        if estadisticas and estadisticas["muestras"] >= MIN_MUESTRAS:
+            linea += (f", próximo timeout {timeout_carga(clave, 0) / 1000:.1f}s"
+                      f" ({estadisticas['agotadas']:.0%} agotadas)")
+        print(linea)
+    _tiempos.clear()
+    _estado["archivo"] = None
+
+
+def guardar_latencias():
+    """Une las cargas medidas en este proceso con el archivo (otros procesos pueden haberlo actualizado)"""
+    if not _nuevas:
+        return
+    guardadas = _leer_latencias()
+    for clave, muestras in _nuevas.items():
+        guardadas[clave] = (guardadas.get(clave, []) + muestras)[-MUESTRAS_LATENCIA:]
+    try:
+        os.makedirs(os.path.dirname(ARCHIVO_LATENCIAS), exist_ok=True)
+        temporal = f"{ARCHIVO_LATENCIAS}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(guardadas, f)
+        os.replace(temporal, ARCHIVO_LATENCIAS)
+        _nuevas.clear()
+    except OSError as e:
+        print(f"[CARGA] No se pudo guardar {ARCHIVO_LATENCIAS}: {e}")